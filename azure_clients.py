@@ -4,19 +4,26 @@ Central Azure service client factory module.
 Provides cached client instances for Graph API, Resource Manager, Compute, and Cost Management.
 """
 
+import threading
 from functools import lru_cache
 
+import requests
+from azure.core.pipeline.transport import RequestsTransport
 from azure.identity import ClientSecretCredential
 from azure.mgmt.resource import ResourceManagementClient
 from azure.mgmt.compute import ComputeManagementClient
 from azure.mgmt.costmanagement import CostManagementClient
 from msgraph.core import GraphClient
+from msgraph.core.middleware.middleware import BaseMiddleware
 
 from config.settings import (
     AZURE_TENANT_ID,
     AZURE_CLIENT_ID,
     AZURE_CLIENT_SECRET,
     AZURE_SUBSCRIPTION_ID,
+    GRAPH_POOL_MAXSIZE,
+    GRAPH_MAX_INFLIGHT,
+    ARM_POOL_MAXSIZE,
 )
 
 
@@ -48,12 +55,68 @@ def get_credential() -> ClientSecretCredential:
     )
 
 
+class _GraphConcurrencyLimiter(BaseMiddleware):
+    """
+    Graph middleware capping the number of requests in flight across all threads.
+    
+    Added as the last middleware, so the slot is held only for the network call
+    itself, not while RetryHandler waits before retrying a throttled request.
+    """
+
+    def __init__(self, limit: int) -> None:
+        super().__init__()
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def send(self, request, **kwargs):
+        with self._semaphore:
+            return super().send(request, **kwargs)
+
+
+def _limit_graph_concurrency(client: GraphClient, limit: int) -> None:
+    """Appends _GraphConcurrencyLimiter to the Graph client middleware pipeline."""
+    pipeline = client.graph_session.get_adapter("https://graph.microsoft.com")
+    pipeline.add_middleware(_GraphConcurrencyLimiter(limit))
+
+
+def _resize_graph_pool(client: GraphClient, maxsize: int) -> None:
+    """
+    Resizes the urllib3 connection pool used by the Graph client.
+    
+    GraphClient mounts a middleware pipeline in which the last middleware
+    (an HTTPAdapter) sends the request using its own pool of default size 10.
+    With concurrent Graph calls above that size connections would be discarded
+    and re-opened (new TLS handshake), so the pool is sized to the expected concurrency.
+    """
+    pipeline = client.graph_session.get_adapter("https://graph.microsoft.com")
+    middleware = getattr(pipeline, "_first_middleware", None)
+    while middleware is not None and middleware.next is not None:
+        middleware = middleware.next
+    if middleware is not None:
+        middleware.init_poolmanager(middleware._pool_connections, maxsize)
+
+
+def _pooled_transport(maxsize: int) -> RequestsTransport:
+    """
+    Returns azure-core transport backed by a session with an enlarged connection pool.
+    
+    The default requests pool keeps 10 connections per host, which would cap
+    concurrent ARM calls made from worker threads.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=maxsize)
+    session.mount("https://", adapter)
+    return RequestsTransport(session=session, session_owner=False)
+
+
 @lru_cache(maxsize=1)
 def get_graph_client() -> GraphClient:
     """Returns Microsoft Graph API client for identity management operations."""
     credential = get_credential()
     scopes = ["https://graph.microsoft.com/.default"]
-    return GraphClient(credential=credential, scopes=scopes)
+    client = GraphClient(credential=credential, scopes=scopes)
+    _limit_graph_concurrency(client, GRAPH_MAX_INFLIGHT)
+    _resize_graph_pool(client, GRAPH_POOL_MAXSIZE)
+    return client
 
 
 @lru_cache(maxsize=1)
@@ -66,7 +129,9 @@ def get_resource_client() -> ResourceManagementClient:
     credential = get_credential()
     if "http://" in str(AZURE_SUBSCRIPTION_ID).lower():
         raise ValueError(f"Subscription ID must not contain http://: {AZURE_SUBSCRIPTION_ID}")
-    return ResourceManagementClient(credential, AZURE_SUBSCRIPTION_ID)
+    return ResourceManagementClient(
+        credential, AZURE_SUBSCRIPTION_ID, transport=_pooled_transport(ARM_POOL_MAXSIZE)
+    )
 
 
 @lru_cache(maxsize=1)
@@ -79,7 +144,9 @@ def get_compute_client() -> ComputeManagementClient:
     credential = get_credential()
     if "http://" in str(AZURE_SUBSCRIPTION_ID).lower():
         raise ValueError(f"Subscription ID must not contain http://: {AZURE_SUBSCRIPTION_ID}")
-    return ComputeManagementClient(credential, AZURE_SUBSCRIPTION_ID)
+    return ComputeManagementClient(
+        credential, AZURE_SUBSCRIPTION_ID, transport=_pooled_transport(ARM_POOL_MAXSIZE)
+    )
 
 
 @lru_cache(maxsize=1)
@@ -96,4 +163,6 @@ def get_cost_client() -> CostManagementClient:
     base_url = "https://management.azure.com"
     _validate_https_url(base_url)
     logger.info(f"[get_cost_client] Initializing CostManagementClient with base_url: {base_url}")
-    return CostManagementClient(credential=credential, base_url=base_url)
+    return CostManagementClient(
+        credential=credential, base_url=base_url, transport=_pooled_transport(ARM_POOL_MAXSIZE)
+    )
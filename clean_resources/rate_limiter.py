@@ -0,0 +1,45 @@
+# clean_resources/rate_limiter.py
+
+"""
+Thread-safe token bucket rate limiter with a separate bucket per key.
+"""
+
+import threading
+import time
+from typing import Dict, Hashable, Tuple
+
+
+class KeyedTokenBucket:
+    """
+    Token buckets keyed e.g. by (resource provider, region).
+
+    Each bucket holds up to `burst` tokens and refills at `rate_per_hour`.
+    acquire() blocks until a token for the key is available. A non-positive
+    rate disables limiting.
+    """
+
+    def __init__(self, rate_per_hour: float, burst: int) -> None:
+        self._rate = rate_per_hour / 3600.0
+        self._burst = float(max(1, burst))
+        self._buckets: Dict[Hashable, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: Hashable) -> float:
+        """Takes one token for `key`, waiting if needed. Returns seconds waited."""
+        if self._rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, updated_at = self._buckets.get(key, (self._burst, now))
+                tokens = min(self._burst, tokens + (now - updated_at) * self._rate)
+                if tokens >= 1.0:
+                    self._buckets[key] = (tokens - 1.0, now)
+                    return waited
+                self._buckets[key] = (tokens, now)
+                wait = (1.0 - tokens) / self._rate
+            # Czekamy poza lockiem - inne klucze nie są blokowane
+            time.sleep(wait)
+            waited += wait
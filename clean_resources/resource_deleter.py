@@ -6,17 +6,42 @@ Similar to AWS delete_resource functionality.
 """
 
 import logging
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
 from azure.mgmt.compute import ComputeManagementClient
 from azure.mgmt.network import NetworkManagementClient
 from azure.mgmt.resource import ResourceManagementClient
 from azure.mgmt.storage import StorageManagementClient
-from azure_clients import get_credential
-from config.settings import AZURE_SUBSCRIPTION_ID
+from azure_clients import get_credential, _pooled_transport
+from clean_resources.rate_limiter import KeyedTokenBucket
+from identity.rg_cache import RESOURCE_GROUP_CACHE
+from config.settings import (
+    AZURE_SUBSCRIPTION_ID, ARM_MAX_WORKERS, ARM_POOL_MAXSIZE, ARM_DELETE_RATE_PER_HOUR, ARM_DELETE_BURST,
+)
 
 logger = logging.getLogger(__name__)
 
 
+# Fale usuwania: zasób może blokować usunięcie zasobów z późniejszych fal
+# (VM trzyma NIC i dyski, NIC trzyma Public IP, NSG i podsieć VNet, podsieć VNet trzyma NSG)
+_WAVE_VMS = 0
+_WAVE_DEFAULT = 1
+_WAVE_NETWORKS = 2
+_WAVE_NETWORK_DEPENDENCIES = 3
+
+# Typy usuwane na końcu - odwołują się do nich NIC, podsieci VNet i inne zasoby sieciowe
+_NETWORK_DEPENDENCY_TYPES = ("networksecuritygroup", "publicipaddress")
+
+# Wspólny dla wszystkich RPC limit usunięć per (resource provider, region) - limity ARM są per subskrypcja
+_DELETE_LIMITER = KeyedTokenBucket(ARM_DELETE_RATE_PER_HOUR, ARM_DELETE_BURST)
+
+
+def exclude_resource_group(resources: List[Dict], resource_group_name: str) -> List[Dict]:
+    """Returns resources that do not belong to given Resource Group (name compared case-insensitively)."""
+    rg_key = resource_group_name.lower()
+    return [r for r in resources if (r.get("resource_group") or "").lower() != rg_key]
+
+
 class ResourceDeleter:
     """
     Deletes Azure resources based on resource type.
@@ -26,10 +51,19 @@ class ResourceDeleter:
     def __init__(self, cred=None, sub_id=None):
         cred = cred or get_credential()
         sub_id = sub_id or AZURE_SUBSCRIPTION_ID
-        self._compute_client = ComputeManagementClient(cred, sub_id)
-        self._network_client = NetworkManagementClient(cred, sub_id)
-        self._resource_client = ResourceManagementClient(cred, sub_id)
-        self._storage_client = StorageManagementClient(cred, sub_id)
+        # Usuwanie odbywa się z wielu wątków - pula połączeń musi to pomieścić
+        self._compute_client = ComputeManagementClient(
+            cred, sub_id, transport=_pooled_transport(ARM_POOL_MAXSIZE)
+        )
+        self._network_client = NetworkManagementClient(
+            cred, sub_id, transport=_pooled_transport(ARM_POOL_MAXSIZE)
+        )
+        self._resource_client = ResourceManagementClient(
+            cred, sub_id, transport=_pooled_transport(ARM_POOL_MAXSIZE)
+        )
+        self._storage_client = StorageManagementClient(
+            cred, sub_id, transport=_pooled_transport(ARM_POOL_MAXSIZE)
+        )
     
     def delete_resource(self, resource: Dict) -> str:
         """
@@ -53,7 +87,7 @@ class ResourceDeleter:
         try:
             # Delete based on service type or resource type
             if service == "vm" or "virtualmachine" in resource_type.lower():
-                logger.info(f"Deleting VM: {resource_name} in resource group {resource_group}")
+                logger.info("Deleting VM: %s in resource group %s", resource_name, resource_group)
                 self._compute_client.virtual_machines.begin_delete(
                     resource_group, resource_name
                 ).wait()
@@ -61,35 +95,35 @@ class ResourceDeleter:
             
             elif service == "network" or "network" in resource_type.lower():
                 if "networkinterface" in resource_type.lower():
-                    logger.info(f"Deleting Network Interface: {resource_name} in resource group {resource_group}")
+                    logger.info("Deleting Network Interface: %s in resource group %s", resource_name, resource_group)
                     self._network_client.network_interfaces.begin_delete(
                         resource_group, resource_name
                     ).wait()
                     return f"Deleted Network Interface: {resource_name}"
                 
                 elif "publicipaddress" in resource_type.lower():
-                    logger.info(f"Deleting Public IP: {resource_name} in resource group {resource_group}")
+                    logger.info("Deleting Public IP: %s in resource group %s", resource_name, resource_group)
                     self._network_client.public_ip_addresses.begin_delete(
                         resource_group, resource_name
                     ).wait()
                     return f"Deleted Public IP: {resource_name}"
                 
                 elif "virtualnetwork" in resource_type.lower():
-                    logger.info(f"Deleting Virtual Network: {resource_name} in resource group {resource_group}")
+                    logger.info("Deleting Virtual Network: %s in resource group %s", resource_name, resource_group)
                     self._network_client.virtual_networks.begin_delete(
                         resource_group, resource_name
                     ).wait()
                     return f"Deleted Virtual Network: {resource_name}"
                 
                 elif "networksecuritygroup" in resource_type.lower():
-                    logger.info(f"Deleting Network Security Group: {resource_name} in resource group {resource_group}")
+                    logger.info("Deleting Network Security Group: %s in resource group %s", resource_name, resource_group)
                     self._network_client.network_security_groups.begin_delete(
                         resource_group, resource_name
                     ).wait()
                     return f"Deleted Network Security Group: {resource_name}"
             
             elif service == "storage" or "storage" in resource_type.lower():
-                logger.info(f"Deleting Storage Account: {resource_name} in resource group {resource_group}")
+                logger.info("Deleting Storage Account: %s in resource group %s", resource_name, resource_group)
                 self._storage_client.storage_accounts.begin_delete(
                     resource_group, resource_name
                 ).wait()
@@ -97,7 +131,7 @@ class ResourceDeleter:
             
             else:
                 # Generic deletion using Resource Management Client
-                logger.info(f"Deleting resource: {resource_name} ({resource_type}) in resource group {resource_group}")
+                logger.info("Deleting resource: %s (%s) in resource group %s", resource_name, resource_type, resource_group)
                 self._resource_client.resources.begin_delete_by_id(
                     resource_id, "2021-04-01"  # API version
                 ).wait()
@@ -107,4 +141,93 @@ class ResourceDeleter:
             error_msg = f"Error deleting {resource_type} {resource_name}: {e}"
             logger.error(error_msg, exc_info=True)
             return error_msg
-
+    
+    def begin_delete_resource_group(self, resource_group_name: str) -> bool:
+        """
+        Starts deletion of Resource Group if it exists (without waiting for completion).
+        
+        ARM cascades the deletion to all resources in the group.
+        
+        Returns:
+            True if deletion was accepted, False if RG does not exist or on error.
+        """
+        try:
+            # Istnienie RG znane z create_group - bez dodatkowego zapytania do ARM
+            exists = RESOURCE_GROUP_CACHE.get(resource_group_name) or self._resource_client.resource_groups.check_existence(
+                resource_group_name
+            )
+            if not exists:
+                logger.info("Resource Group %s does not exist", resource_group_name)
+                return False
+            
+            logger.info("Deleting Resource Group: %s (this will delete all resources in the RG)", resource_group_name)
+            # ARM przyjmuje usunięcie od razu (202 Accepted) - wywołujący nie czeka na zakończenie
+            poller = self._resource_client.resource_groups.begin_delete(resource_group_name)
+            RESOURCE_GROUP_CACHE.pop(resource_group_name)
+            poller.add_done_callback(
+                lambda _: logger.info("Resource Group %s deletion finished", resource_group_name)
+            )
+            logger.info("Deletion of Resource Group %s accepted, continuing in background", resource_group_name)
+            return True
+        except Exception as e:
+            logger.warning("Error deleting Resource Group %s: %s", resource_group_name, e, exc_info=True)
+            return False
+    
+    def delete_resources(self, resources: List[Dict], max_workers: int = ARM_MAX_WORKERS) -> List[Tuple[Dict, str]]:
+        """
+        Deletes many resources concurrently, in dependency-ordered waves.
+        
+        Resources within a wave are deleted in parallel; a wave starts only after
+        the previous one finished (VMs, then NICs/disks/other, then virtual
+        networks, then NSGs and Public IPs).
+        
+        Args:
+            resources: List of resource dicts as returned by ResourceFinder
+            max_workers: Maximum number of concurrent deletions
+        
+        Returns:
+            List of (resource, result message) tuples in deletion order.
+        """
+        waves: Dict[int, List[Dict]] = {}
+        for resource in resources:
+            waves.setdefault(self._deletion_wave(resource), []).append(resource)
+        
+        results: List[Tuple[Dict, str]] = []
+        for wave in sorted(waves):
+            wave_resources = waves[wave]
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(wave_resources)))) as executor:
+                for resource, result_msg in zip(wave_resources, executor.map(self._delete_resource_safe, wave_resources)):
+                    results.append((resource, result_msg))
+        return results
+    
+    def _delete_resource_safe(self, resource: Dict) -> str:
+        """delete_resource that never raises (error is returned as message); rate limited per provider/region."""
+        try:
+            waited = _DELETE_LIMITER.acquire(self._rate_limit_key(resource))
+            if waited:
+                logger.warning("Delete of %s throttled locally for %.1fs (ARM rate limit)", resource.get("name"), waited)
+            return self.delete_resource(resource)
+        except Exception as e:
+            error_msg = f"Error deleting {resource.get('type', '')} {resource.get('name')}: {e}"
+            logger.error(error_msg, exc_info=True)
+            return error_msg
+    
+    @staticmethod
+    def _rate_limit_key(resource: Dict) -> Tuple[str, str]:
+        """Returns (resource provider, region), e.g. ("microsoft.compute", "westeurope")."""
+        provider = (resource.get("type") or "").split("/", 1)[0].lower()
+        return provider, (resource.get("location") or "").lower()
+    
+    @staticmethod
+    def _deletion_wave(resource: Dict) -> int:
+        """Returns deletion wave for resource (lower waves are deleted first)."""
+        resource_type = (resource.get("type") or "").lower()
+        service = (resource.get("service") or "").lower()
+        
+        if "virtualmachines" in resource_type:
+            return _WAVE_VMS
+        if any(dependency in resource_type for dependency in _NETWORK_DEPENDENCY_TYPES):
+            return _WAVE_NETWORK_DEPENDENCIES
+        if (service == "network" or "network" in resource_type) and "networkinterface" not in resource_type:
+            return _WAVE_NETWORKS
+        return _WAVE_DEFAULT
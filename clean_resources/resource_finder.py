@@ -6,8 +6,10 @@ Similar to AWS Resource Groups Tagging API functionality.
 """
 
 import logging
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import Iterator, List, Dict, Optional, Tuple
 from azure.mgmt.resource import ResourceManagementClient
+from azure.mgmt.resource.resources.models import GenericResourceExpanded
 from azure_clients import get_credential
 from config.settings import AZURE_SUBSCRIPTION_ID
 from identity.utils import normalize_name
@@ -34,46 +36,27 @@ class ResourceFinder:
             tag_filter: Dict with tag key-value pairs, e.g., {"Group": "AI-2024L"}
         
         Returns:
-            List of dicts with resource info: {"id", "name", "type", "service", "resource_group"}
+            List of dicts with resource info: {"id", "name", "type", "service", "resource_group", "location"}
         """
         resources = []
         
         try:
-            # List all resources in subscription
-            # Note: For better performance with large subscriptions, consider using Azure Resource Graph
-            for resource in self._rm.resources.list():
-                # Check if resource has tags and matches filter
-                if resource.tags:
-                    tags_match = True
-                    for key, value in tag_filter.items():
-                        # Normalize tag values for comparison
-                        normalized_value = normalize_name(str(value))
-                        tag_value = normalize_name(str(resource.tags.get(key, "")))
-                        
-                        if tag_value != normalized_value:
-                            tags_match = False
-                            break
-                    
-                    if tags_match:
-                        # Extract service name from resource type
-                        # e.g., "Microsoft.Compute/virtualMachines" -> "vm"
-                        resource_type = resource.type or ""
-                        service = self._extract_service_name(resource_type)
-                        
-                        # Extract resource group from resource ID
-                        resource_group = None
-                        if resource.id and "/resourceGroups/" in resource.id:
-                            parts = resource.id.split("/resourceGroups/")
-                            if len(parts) > 1:
-                                resource_group = parts[1].split("/")[0]
-                        
-                        resources.append({
-                            "id": resource.id,
-                            "name": resource.name,
-                            "type": resource_type,
-                            "service": service,
-                            "resource_group": resource_group
-                        })
+            for resource, service in self._iter_tagged_resources(tag_filter):
+                # Extract resource group from resource ID
+                resource_group = None
+                if resource.id and "/resourceGroups/" in resource.id:
+                    parts = resource.id.split("/resourceGroups/")
+                    if len(parts) > 1:
+                        resource_group = parts[1].split("/")[0]
+                
+                resources.append({
+                    "id": resource.id,
+                    "name": resource.name,
+                    "type": resource.type or "",
+                    "service": service,
+                    "resource_group": resource_group,
+                    "location": resource.location
+                })
             
             logger.info(f"Found {len(resources)} resources matching tags: {tag_filter}")
             return resources
@@ -82,10 +65,56 @@ class ResourceFinder:
             logger.error(f"Error finding resources by tags: {e}", exc_info=True)
             return []
     
-    def _extract_service_name(self, resource_type: str) -> str:
+    def count_resources_by_tags(self, tag_filter: dict, service: Optional[str] = None) -> int:
+        """
+        Counts resources that match the given tag filter (and optionally service name).
+        
+        Unlike find_resources_by_tags, no per-resource dicts are built.
+        
+        Args:
+            tag_filter: Dict with tag key-value pairs, e.g., {"Group": "AI-2024L"}
+            service: Short service name (e.g., "vm"); None counts all matching resources
+        
+        Returns:
+            Number of matching resources (0 on error).
+        """
+        try:
+            return sum(
+                1 for _, resource_service in self._iter_tagged_resources(tag_filter)
+                if service is None or resource_service == service
+            )
+        except Exception as e:
+            logger.error(f"Error counting resources by tags: {e}", exc_info=True)
+            return 0
+    
+    def _iter_tagged_resources(self, tag_filter: dict) -> Iterator[Tuple[GenericResourceExpanded, str]]:
+        """
+        Yields (resource, service name) for resources whose tags match `tag_filter`.
+        
+        Tag values are compared after normalize_name on both sides.
+        """
+        normalized_filter = [(key, normalize_name(str(value))) for key, value in tag_filter.items()]
+        
+        # List all resources in subscription
+        # Note: For better performance with large subscriptions, consider using Azure Resource Graph
+        for resource in self._rm.resources.list():
+            if not resource.tags:
+                continue
+            if all(
+                normalize_name(str(resource.tags.get(key, ""))) == normalized_value
+                for key, normalized_value in normalized_filter
+            ):
+                # e.g., "Microsoft.Compute/virtualMachines" -> "vm"
+                yield resource, self._extract_service_name(resource.type or "")
+    
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _extract_service_name(resource_type: str) -> str:
         """
         Extracts short service name from Azure resource type.
         
+        Memoized: a subscription holds only a handful of distinct resource types.
+        
         Args:
             resource_type: Full Azure resource type, e.g., "Microsoft.Compute/virtualMachines"
         
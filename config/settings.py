@@ -15,6 +15,28 @@ AZURE_CLIENT_SECRET = os.getenv("AZURE_CLIENT_SECRET")
 AZURE_SUBSCRIPTION_ID = os.getenv("AZURE_SUBSCRIPTION_ID")
 AZURE_UDOMAIN = os.getenv("AZURE_UDOMAIN")
 
+# Opcjonalne parametry wydajnościowe (mają wartości domyślne)
+# Maksymalna liczba równoległych łańcuchów wywołań Graph API w ramach jednego RPC
+GRAPH_MAX_WORKERS = int(os.getenv("GRAPH_MAX_WORKERS", "8"))
+# Rozmiar puli połączeń keep-alive do Graph API (powinien pokrywać równoległość wywołań)
+GRAPH_POOL_MAXSIZE = int(os.getenv("GRAPH_POOL_MAXSIZE", "32"))
+# Limit jednoczesnych żądań do Graph API w całym procesie (ochrona przed throttlingiem 429)
+GRAPH_MAX_INFLIGHT = int(os.getenv("GRAPH_MAX_INFLIGHT", "32"))
+# Maksymalna liczba równoległych wywołań Azure Resource Manager (np. usuwanie przypisań ról)
+ARM_MAX_WORKERS = int(os.getenv("ARM_MAX_WORKERS", "16"))
+# Rozmiar puli połączeń keep-alive klientów ARM (Resource, Compute, Network, Storage, Cost Management, Authorization)
+ARM_POOL_MAXSIZE = int(os.getenv("ARM_POOL_MAXSIZE", "32"))
+# Limit usunięć zasobów na godzinę per (resource provider, region); 0 = bez limitu
+ARM_DELETE_RATE_PER_HOUR = float(os.getenv("ARM_DELETE_RATE_PER_HOUR", "1000"))
+# Liczba usunięć, które mogą przejść od razu (seria) zanim zacznie działać limit godzinowy
+ARM_DELETE_BURST = int(os.getenv("ARM_DELETE_BURST", "100"))
+# Czas życia (s) cache'owanych wyników wyszukiwania grup po nazwie
+GROUP_CACHE_TTL = float(os.getenv("GROUP_CACHE_TTL", "60"))
+# Liczba wątków serwera gRPC (każde RPC blokuje wątek na czas wywołań Graph/ARM)
+GRPC_MAX_WORKERS = int(os.getenv("GRPC_MAX_WORKERS", "32"))
+# Limit jednocześnie obsługiwanych RPC (puste = bez limitu); nadmiarowe RPC dostają RESOURCE_EXHAUSTED
+GRPC_MAX_CONCURRENT_RPCS = int(os.getenv("GRPC_MAX_CONCURRENT_RPCS") or 0) or None
+
 REQUIRED_VARS = [
     "AZURE_TENANT_ID",
     "AZURE_CLIENT_ID",
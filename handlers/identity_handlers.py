@@ -5,24 +5,53 @@ CreateUsersForGroup, RemoveGroup.
 """
 
 import logging
+import random
+import threading
 import time
-from typing import List
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional
 
 import grpc
 
 from identity.user_manager import AzureUserManager
-from identity.group_manager import AzureGroupManager
+from identity.group_manager import AzureGroupManager, ALREADY_MEMBER
 from identity.rbac_manager import AzureRBACManager
-from identity.utils import normalize_name, build_username_with_group_suffix
+from identity.utils import normalize_name, build_username_with_group_suffix, build_resource_group_name
+from identity.ttl_cache import TTLCache
+from clean_resources.resource_deleter import exclude_resource_group
+import azure_clients
+from azure_clients import get_graph_client
+from config.settings import AZURE_UDOMAIN, GRAPH_MAX_WORKERS, GROUP_CACHE_TTL
 from cost_monitoring import limit_manager as cost_manager
 from protos import adapter_interface_pb2 as pb2
 
 logger = logging.getLogger(__name__)
 
+# Wspólna pula dla add_owner wykonywanego obok add_member (zamiast puli per lider).
+# Zadania w niej nie czekają na inne zadania, więc pule liderów nie mogą się o nią zakleszczyć.
+_OWNER_EXECUTOR = ThreadPoolExecutor(max_workers=GRAPH_MAX_WORKERS, thread_name_prefix="graph-add-owner")
+
 
 class IdentityHandlers:
     """Handlers for identity-related RPC methods."""
     
+    # Zależności sprawdzane w GetStatus: (nazwa atrybutu, czy wymagany)
+    _HEALTH_CHECKS = (
+        ("user_manager", True),
+        ("group_manager", True),
+        ("rbac_manager", True),
+        ("resource_finder", False),
+        ("resource_deleter", False),
+    )
+    
+    # Jak długo (s) wynik pozytywnej weryfikacji klientów Azure w GetStatus jest ważny
+    _STATUS_CHECK_TTL = 30.0
+    
+    # Gotowe odpowiedzi GetStatus - gRPC tylko je serializuje, nigdy nie modyfikuje
+    _HEALTHY = pb2.StatusResponse(isHealthy=True)
+    _UNHEALTHY = pb2.StatusResponse(isHealthy=False)
+    
     def __init__(
         self,
         user_manager: AzureUserManager,
@@ -36,6 +65,25 @@ class IdentityHandlers:
         self.rbac_manager = rbac_manager
         self.resource_finder = resource_finder
         self.resource_deleter = resource_deleter
+        # Krótkotrwały cache: znormalizowana nazwa grupy -> dane grupy (tylko trafienia)
+        self._group_cache = TTLCache(maxsize=1024, ttl=GROUP_CACHE_TTL)
+        self._clients_checked_at = float("-inf")
+    
+    def _cached_get_group(self, normalized_name: str) -> Optional[dict]:
+        """
+        Returns group by normalized name, using a short-TTL cache.
+        
+        Only found groups are cached, so a group created after a miss
+        (Azure AD replication) is picked up on the next lookup.
+        """
+        group = self._group_cache.get(normalized_name)
+        if group is not None:
+            return group
+        
+        group = self.group_manager.get_group_by_name(normalized_name)
+        if group:
+            self._group_cache.set(normalized_name, group)
+        return group
     
     def get_status(self, request, context):
         """
@@ -45,98 +93,105 @@ class IdentityHandlers:
         Returns true/false without raising exceptions.
         """
         try:
-            if not hasattr(self, 'user_manager') or self.user_manager is None:
-                logger.error("[GetStatus] user_manager not initialized")
-                resp = pb2.StatusResponse()
-                resp.isHealthy = False
-                return resp
-            
-            if not hasattr(self, 'group_manager') or self.group_manager is None:
-                logger.error("[GetStatus] group_manager not initialized")
-                resp = pb2.StatusResponse()
-                resp.isHealthy = False
-                return resp
-            
-            if not hasattr(self, 'rbac_manager') or self.rbac_manager is None:
-                logger.error("[GetStatus] rbac_manager not initialized")
-                resp = pb2.StatusResponse()
-                resp.isHealthy = False
-                return resp
-            
-            if hasattr(self, 'resource_finder'):
-                if self.resource_finder is None:
-                    logger.error("[GetStatus] resource_finder not initialized")
-                    resp = pb2.StatusResponse()
-                    resp.isHealthy = False
-                    return resp
-            
-            # Check resource_deleter if it was provided (optional dependency)
-            if hasattr(self, 'resource_deleter'):
-                if self.resource_deleter is None:
-                    logger.error("[GetStatus] resource_deleter not initialized")
-                    resp = pb2.StatusResponse()
-                    resp.isHealthy = False
-                    return resp
-            
-            try:
-                from azure_clients import get_credential, get_graph_client, get_cost_client
-                
-                credential = get_credential()
-                if credential is None:
-                    logger.error("[GetStatus] Failed to create credential")
-                    resp = pb2.StatusResponse()
-                    resp.isHealthy = False
-                    return resp
-                
-                graph_client = get_graph_client()
-                if graph_client is None:
-                    logger.error("[GetStatus] Failed to create Graph client")
-                    resp = pb2.StatusResponse()
-                    resp.isHealthy = False
-                    return resp
-                
-                cost_client = get_cost_client()
-                if cost_client is None:
-                    logger.error("[GetStatus] Failed to create Cost Management client")
-                    resp = pb2.StatusResponse()
-                    resp.isHealthy = False
-                    return resp
-                
-            except Exception as e:
-                logger.error(f"[GetStatus] Failed to initialize Azure clients: {e}", exc_info=True)
-                resp = pb2.StatusResponse()
-                resp.isHealthy = False
-                return resp
-            
-            try:
-                if not hasattr(cost_manager, 'get_total_cost_for_group'):
-                    logger.error("[GetStatus] cost_manager.get_total_cost_for_group not available")
-                    resp = pb2.StatusResponse()
-                    resp.isHealthy = False
-                    return resp
-                
-                cost_manager_instance = cost_manager.LimitManager()
-                if cost_manager_instance is None:
-                    logger.error("[GetStatus] Failed to create LimitManager instance")
-                    resp = pb2.StatusResponse()
-                    resp.isHealthy = False
-                    return resp
-                
-            except Exception as e:
-                logger.error(f"[GetStatus] Failed to initialize cost_manager: {e}", exc_info=True)
-                resp = pb2.StatusResponse()
-                resp.isHealthy = False
-                return resp
+            healthy = self._check_components() and self._check_azure_clients()
+        except Exception as e:
+            logger.error(f"[GetStatus] Unexpected error: {e}", exc_info=True)
+            healthy = False
+        return self._HEALTHY if healthy else self._UNHEALTHY
+    
+    @staticmethod
+    def _rpc_deadline(context) -> Optional[float]:
+        """Returns RPC deadline as a time.monotonic() value, or None if the client set none."""
+        time_remaining = context.time_remaining()
+        return None if time_remaining is None else time.monotonic() + time_remaining
+    
+    def _retry_get_group(
+        self,
+        normalized_group_name: str,
+        group_name: str,
+        context,
+        max_attempts: int = 5,
+    ) -> tuple[Optional[dict], int]:
+        """
+        Re-checks a group that was not found on the first lookup (Azure AD replication).
+        
+        Waits with exponential backoff and jitter between attempts and stops early
+        when the RPC deadline is closer than the next delay.
+        
+        Returns:
+            Tuple (group or None, number of lookups performed including the first one).
+        """
+        for attempt in range(1, max_attempts):
+            # Replikacja Entra ID zwykle trwa poniżej sekundy - backoff wykładniczy z jitterem
+            delay = min(0.25 * (2 ** (attempt - 1)), 4.0) + random.uniform(0, 0.1)
+            time_remaining = context.time_remaining()
+            if time_remaining is not None and time_remaining <= delay:
+                logger.warning(
+                    f"[CreateUsersForGroup] Group '{group_name}' not found and RPC deadline "
+                    f"is too close to retry (attempt {attempt}/{max_attempts})"
+                )
+                return None, attempt
+            logger.warning(
+                f"[CreateUsersForGroup] Group '{group_name}' not found "
+                f"(attempt {attempt}/{max_attempts}) – waiting {delay:.2f}s for replication..."
+            )
+            time.sleep(delay)
             
-            resp = pb2.StatusResponse()
-            resp.isHealthy = True
-            return resp
+            group = self._cached_get_group(normalized_group_name)
+            if group:
+                return group, attempt + 1
+        
+        return None, max_attempts
+    
+    def _check_components(self) -> bool:
+        """Checks handler dependencies listed in _HEALTH_CHECKS."""
+        for name, required in self._HEALTH_CHECKS:
+            # Opcjonalne zależności: brak atrybutu jest OK, ale ustawione None już nie
+            if not required and not hasattr(self, name):
+                continue
+            if getattr(self, name, None) is None:
+                logger.error(f"[GetStatus] {name} not initialized")
+                return False
+        return True
+    
+    def _check_azure_clients(self) -> bool:
+        """
+        Checks Azure clients and LimitManager.
+        
+        A healthy result is reused for _STATUS_CHECK_TTL seconds; failures are not cached.
+        """
+        now = time.monotonic()
+        if now - self._clients_checked_at < self._STATUS_CHECK_TTL:
+            return True
+        
+        try:
+            # Odwołania przez moduł (nie import w funkcji) - testy podmieniają fabryki w azure_clients
+            for factory, description in (
+                (azure_clients.get_credential, "credential"),
+                (azure_clients.get_graph_client, "Graph client"),
+                (azure_clients.get_cost_client, "Cost Management client"),
+            ):
+                if factory() is None:
+                    logger.error(f"[GetStatus] Failed to create {description}")
+                    return False
+        except Exception as e:
+            logger.error(f"[GetStatus] Failed to initialize Azure clients: {e}", exc_info=True)
+            return False
+        
+        try:
+            if not hasattr(cost_manager, 'get_total_cost_for_group'):
+                logger.error("[GetStatus] cost_manager.get_total_cost_for_group not available")
+                return False
             
+            if cost_manager.LimitManager() is None:
+                logger.error("[GetStatus] Failed to create LimitManager instance")
+                return False
         except Exception as e:
-            logger.error(f"[GetStatus] Unexpected error: {e}", exc_info=True)
-            resp = pb2.StatusResponse()
-            resp.isHealthy = False
-            return resp
+            logger.error(f"[GetStatus] Failed to initialize cost_manager: {e}", exc_info=True)
+            return False
+        
+        self._clients_checked_at = now
+        return True
     
     def group_exists(self, request, context):
         """Checks if group with given name exists in Entra ID. Normalizes name before search."""
@@ -144,7 +199,7 @@ class IdentityHandlers:
         normalized_name = normalize_name(group_name)
 
         try:
-            group = self.group_manager.get_group_by_name(normalized_name)
+            group = self._cached_get_group(normalized_name)
             resp = pb2.GroupExistsResponse()
             resp.exists = group is not None
             return resp
@@ -163,51 +218,47 @@ class IdentityHandlers:
         Returns message "Users successfully added".
         """
         group_name: str = request.groupName
-        users: List[str] = list(request.users)
+        users = request.users
         normalized_group_name = normalize_name(group_name)
 
         try:
-            max_attempts = 5
-            delay_seconds = 3.0
-            group = None
-            
-            for attempt in range(1, max_attempts + 1):
-                group = self.group_manager.get_group_by_name(normalized_group_name)
-                if group:
-                    break
-                
-                if attempt < max_attempts:
-                    logger.warning(
-                        f"[CreateUsersForGroup] Group '{group_name}' not found "
-                        f"(attempt {attempt}/{max_attempts}) – waiting {delay_seconds}s for replication..."
-                    )
-                    time.sleep(delay_seconds)
-            
+            group = self._cached_get_group(normalized_group_name)
             if not group:
-                context.set_code(grpc.StatusCode.NOT_FOUND)
-                context.set_details(
-                    f"Group '{group_name}' does not exist in Azure AD (checked {max_attempts} times)"
-                )
-                resp = pb2.CreateUsersForGroupResponse()
-                resp.message = ""
-                return resp
+                # Ponowne próby tylko gdy grupy jeszcze nie widać (opóźnienie replikacji)
+                group, attempts = self._retry_get_group(normalized_group_name, group_name, context)
+                if not group:
+                    context.set_code(grpc.StatusCode.NOT_FOUND)
+                    context.set_details(
+                        f"Group '{group_name}' does not exist in Azure AD (checked {attempts} times)"
+                    )
+                    resp = pb2.CreateUsersForGroupResponse()
+                    resp.message = ""
+                    return resp
 
             group_id = group["id"]
             
-            unique_users = list(dict.fromkeys(users))
-            if len(unique_users) != len(users):
+            # Zwykle loginy są już unikalne - wtedy pole repeated używane bez kopiowania
+            if len(users) < 2 or len(set(users)) == len(users):
+                unique_users = users
+            else:
+                unique_users = list(dict.fromkeys(users))
                 logger.info(
                     f"[CreateUsersForGroup] Deduplicated users: {len(users)} -> {len(unique_users)}"
                 )
             
-            existing_members = {}
+            # Obecni członkowie: id oraz login (część UPN przed "@", lowercase)
+            existing_member_ids: set[str] = set()
+            existing_member_upns: set[str] = set()
             try:
-                members = self.group_manager.list_members(group_id)
-                for member in members:
-                    if member.get("objectType") == "User":
+                # Strony członków przetwarzane na bieżąco, kolejna strona pobierana w tle
+                for member in self.group_manager.list_members_iter(group_id, prefetch=True):
+                    if member.get("@odata.type") == "#microsoft.graph.user":
                         member_id = member.get("id")
                         if member_id:
-                            existing_members[member_id] = member.get("userPrincipalName", "")
+                            existing_member_ids.add(member_id)
+                            upn = member.get("userPrincipalName")
+                            if upn:
+                                existing_member_upns.add(upn.partition("@")[0].lower())
             except Exception as e:
                 logger.warning(
                     f"[CreateUsersForGroup] Failed to list existing members: {e}. "
@@ -218,64 +269,59 @@ class IdentityHandlers:
             failed_users: List[tuple[str, str]] = []
             already_members: List[str] = []
             
-            for login in unique_users:
-                username_with_suffix = build_username_with_group_suffix(login, group_name)
-                user_id = None
-                
+            # Istniejące konta sprawdzane hurtowo zamiast wykrywania konfliktu przy create_user
+            usernames = {login: build_username_with_group_suffix(login, group_name) for login in unique_users}
+            existing_users = {}
+            if unique_users:
                 try:
-                    try:
-                        user_id = self.user_manager.create_user(
-                            login=login,
-                            display_name=username_with_suffix,
-                            group_name=group_name,
-                        )
-                    except Exception as e:
-                        error_msg = str(e)
-                        if "already exists" in error_msg.lower() or "ObjectConflict" in error_msg:
-                            logger.warning(
-                                f"[CreateUsersForGroup] User {login} may already exist: {error_msg}"
-                            )
-                            failed_users.append((login, f"User creation failed: {error_msg}"))
-                            continue
-                        else:
-                            failed_users.append((login, f"User creation failed: {error_msg}"))
-                            logger.error(f"[CreateUsersForGroup] create_user({login}) failed: {e}")
-                            continue
-                    
-                    if user_id in existing_members:
+                    existing_users = self.user_manager.find_users(list(usernames.values()))
+                except Exception as e:
+                    logger.warning(
+                        f"[CreateUsersForGroup] Failed to look up existing users: {e}. "
+                        "Falling back to conflict detection on create."
+                    )
+            
+            # Konta tworzone równolegle, członkostwo dodawane hurtowo ($batch)
+            max_workers = max(1, min(GRAPH_MAX_WORKERS, len(unique_users)))
+            to_add: dict[str, str] = {}
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = executor.map(
+                    lambda login: self._provision_one(
+                        login, group_name, existing_member_ids, existing_member_upns,
+                        existing_user_id=existing_users.get(usernames[login]),
+                    ),
+                    unique_users,
+                )
+                for login, status, detail, user_id in results:
+                    if status == "failed":
+                        failed_users.append((login, detail))
+                    elif status == "already_member":
                         already_members.append(login)
-                        logger.info(
-                            f"[CreateUsersForGroup] User {login} already member of group, skipping add_member"
-                        )
-                        succeeded_users.append(login)
-                        continue
-                    
-                    try:
-                        self.group_manager.add_member(group_id, user_id)
                         succeeded_users.append(login)
-                        logger.info(f"[CreateUsersForGroup] Successfully added user {login} to group")
-                    except Exception as e:
-                        error_msg = str(e)
-                        if (
-                            "already exists" in error_msg.lower() 
-                            or "already a member" in error_msg.lower()
-                            or "Request_BadRequest" in error_msg
-                        ):
-                            already_members.append(login)
-                            succeeded_users.append(login)
-                            logger.info(
-                                f"[CreateUsersForGroup] User {login} already member (tolerated): {error_msg}"
-                            )
-                        else:
-                            failed_users.append((login, f"Failed to add to group: {error_msg}"))
-                            logger.error(
-                                f"[CreateUsersForGroup] add_member failed for {login}: {e}"
-                            )
-                
+                    else:
+                        to_add[user_id] = login
+            
+            if to_add:
+                try:
+                    add_failures = self.group_manager.add_members_bulk(
+                        group_id, list(to_add), deadline=self._rpc_deadline(context)
+                    )
                 except Exception as e:
-                    failed_users.append((login, f"Unexpected error: {str(e)}"))
-                    logger.error(f"[CreateUsersForGroup] Unexpected error for {login}: {e}", exc_info=True)
-                    continue
+                    logger.error(f"[CreateUsersForGroup] Bulk add_member failed: {e}", exc_info=True)
+                    add_failures = dict.fromkeys(to_add, str(e))
+                
+                for user_id, login in to_add.items():
+                    error = add_failures.get(user_id)
+                    if error is None:
+                        logger.info("[CreateUsersForGroup] Successfully added user %s to group", login)
+                        succeeded_users.append(login)
+                    elif error == ALREADY_MEMBER:
+                        logger.info("[CreateUsersForGroup] User %s is already a member of group", login)
+                        already_members.append(login)
+                        succeeded_users.append(login)
+                    else:
+                        logger.error("[CreateUsersForGroup] add_member failed for %s: %s", login, error)
+                        failed_users.append((login, f"Failed to add to group: {error}"))
             
             response = pb2.CreateUsersForGroupResponse()
             response.message = "Users successfully added"
@@ -316,10 +362,10 @@ class IdentityHandlers:
         Adds group suffix to leader usernames (matches AWS adapter format).
         """
         group_name: str = request.groupName
-        resource_types: List[str] = list(request.resourceTypes)
-        leaders: List[str] = list(request.leaders)
+        leaders = request.leaders
         
-        resource_type: str = resource_types[0] if resource_types else ""
+        # Pola repeated czytane bezpośrednio, bez kopiowania do list
+        resource_type: str = request.resourceTypes[0] if request.resourceTypes else ""
 
         normalized_group_name = normalize_name(group_name)
 
@@ -328,110 +374,69 @@ class IdentityHandlers:
                 name=normalized_group_name,
                 create_resource_group=True
             )
+            # Zapis do cache od razu po utworzeniu: kolejne RPC (np. CreateUsersForGroup)
+            # nie odpytują Graph i nie czekają na replikację $filter po displayName
+            self._group_cache.set(normalized_group_name, {"id": group_id, "displayName": normalized_group_name})
             created_leaders: List[tuple[str, str]] = []
 
-            try:
-                success, reason = self.rbac_manager.assign_role_to_group(
-                    resource_type=resource_type,
-                    group_id=group_id,
-                )
-                if success:
-                    logger.info(
-                        f"[CreateGroupWithLeaders] Assigned RBAC role for resource type '{resource_type}' "
-                        f"to group '{normalized_group_name}'"
-                    )
-                else:
-                    logger.warning(
-                        f"[CreateGroupWithLeaders] RBAC role assignment for resource type '{resource_type}' "
-                        f"to group '{normalized_group_name}' failed: {reason}"
-                    )
-            except Exception as e:
-                logger.warning(
-                    f"[CreateGroupWithLeaders] Exception assigning RBAC role for resource type '{resource_type}' "
-                    f"to group '{normalized_group_name}': {e}",
-                    exc_info=True
+            # Przypisanie roli (ARM, z ponowieniami na replikację grupy) nie blokuje tworzenia liderów (Graph)
+            with ThreadPoolExecutor(max_workers=1) as rbac_executor:
+                rbac_executor.submit(
+                    self._assign_group_role, resource_type, group_id, normalized_group_name
                 )
 
-            for leader_login in leaders:
-                username_with_suffix = build_username_with_group_suffix(
-                    leader_login, group_name
-                )
+                # Nazwy z sufiksem liczone raz - używane też przy rollbacku
+                suffixed = {login: build_username_with_group_suffix(login, group_name) for login in leaders}
 
-                try:
-                    leader_id = self.user_manager.create_user(
-                        login=leader_login,
-                        display_name=username_with_suffix,
-                        group_name=group_name,
-                    )
-                except Exception as e:
-                    for login, _uid in created_leaders:
-                        try:
-                            self.user_manager.delete_user(
-                                build_username_with_group_suffix(login, group_name)
-                            )
-                        except Exception:
-                            logger.warning(
-                                f"[CreateGroupWithLeaders] rollback "
-                                f"delete_user({login}) failed"
-                            )
-                    try:
-                        self.group_manager.delete_group(group_id)
-                    except Exception:
-                        logger.warning(
-                            f"[CreateGroupWithLeaders] rollback "
-                            f"delete_group({group_id}) failed"
-                        )
-                    logger.error(
-                        f"[CreateGroupWithLeaders] create_user({leader_login}) "
-                        f"failed: {e}"
-                    )
-                    raise
-
-                # Dodajemy lidera jako członka grupy
-                try:
-                    self.group_manager.add_member(group_id, leader_id)
-                except Exception as e:
-                    # rollback bieżącego lidera, wcześniejszych liderów i grupy
-                    try:
-                        self.user_manager.delete_user(username_with_suffix)
-                    except Exception:
-                        logger.warning(
-                            f"[CreateGroupWithLeaders] rollback "
-                            f"delete_user({username_with_suffix}) failed"
-                        )
-                    for login, _uid in created_leaders:
-                        try:
-                            self.user_manager.delete_user(
-                                build_username_with_group_suffix(login, group_name)
-                            )
-                        except Exception:
-                            logger.warning(
-                                f"[CreateGroupWithLeaders] rollback "
-                                f"delete_user({login}) failed"
+                # Liderzy tworzeni równolegle; created_leaders zbiera utworzone konta do rollbacku
+                deadline = self._rpc_deadline(context)
+                created_lock = threading.Lock()
+                first_error: Optional[Exception] = None
+                if leaders:
+                    max_workers = min(GRAPH_MAX_WORKERS, len(leaders))
+                    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                        futures = [
+                            executor.submit(
+                                self._provision_leader,
+                                group_id,
+                                leader_login,
+                                suffixed[leader_login],
+                                group_name,
+                                created_leaders,
+                                created_lock,
+                                deadline,
                             )
+                            for leader_login in leaders
+                        ]
+                        for future in as_completed(futures):
+                            if future.cancelled():
+                                continue
+                            error = future.exception()
+                            if error is not None and first_error is None:
+                                first_error = error
+                                # Nie zaczynamy nowych liderów - i tak zostaną wycofani
+                                for pending in futures:
+                                    pending.cancel()
+            
+            if first_error is not None:
+                # rollback utworzonych liderów i grupy (po zakończeniu wszystkich zadań)
+                for login, _uid in created_leaders:
                     try:
-                        self.group_manager.delete_group(group_id)
+                        self.user_manager.delete_user(suffixed[login])
                     except Exception:
                         logger.warning(
                             f"[CreateGroupWithLeaders] rollback "
-                            f"delete_group({group_id}) failed"
+                            f"delete_user({login}) failed"
                         )
-                    logger.error(
-                        f"[CreateGroupWithLeaders] add_member failed for "
-                        f"leader={username_with_suffix}, group_id={group_id}: {e}"
-                    )
-                    raise
-
-                # Dodajemy lidera jako właściciela grupy
                 try:
-                    self.group_manager.add_owner(group_id, leader_id)
-                except Exception as e:
+                    self.group_manager.delete_group(group_id)
+                    self._group_cache.pop(normalized_group_name)
+                except Exception:
                     logger.warning(
-                        f"[CreateGroupWithLeaders] add_owner failed for "
-                        f"leader={username_with_suffix}, group_id={group_id}: {e}"
+                        f"[CreateGroupWithLeaders] rollback "
+                        f"delete_group({group_id}) failed"
                     )
-
-                created_leaders.append((leader_login, leader_id))
+                raise first_error
 
             response = pb2.GroupCreatedResponse()
             response.groupName = group_name  # Return original name, not normalized
@@ -443,6 +448,31 @@ class IdentityHandlers:
             context.set_details(str(e))
             return pb2.GroupCreatedResponse()
     
+    def _assign_group_role(self, resource_type: str, group_id: str, normalized_group_name: str) -> None:
+        """Assigns RBAC role for resource type to a new group; failures are logged, not raised."""
+        try:
+            success, reason = self.rbac_manager.assign_role_to_group(
+                resource_type=resource_type,
+                group_id=group_id,
+                expect_replication_delay=True,
+            )
+            if success:
+                logger.info(
+                    f"[CreateGroupWithLeaders] Assigned RBAC role for resource type '{resource_type}' "
+                    f"to group '{normalized_group_name}'"
+                )
+            else:
+                logger.warning(
+                    f"[CreateGroupWithLeaders] RBAC role assignment for resource type '{resource_type}' "
+                    f"to group '{normalized_group_name}' failed: {reason}"
+                )
+        except Exception as e:
+            logger.warning(
+                f"[CreateGroupWithLeaders] Exception assigning RBAC role for resource type '{resource_type}' "
+                f"to group '{normalized_group_name}': {e}",
+                exc_info=True
+            )
+    
     def remove_group(self, request, context):
         """
         Removes group and all its members (users).
@@ -456,7 +486,7 @@ class IdentityHandlers:
         normalized_group_name = normalize_name(group_name)
 
         try:
-            group = self.group_manager.get_group_by_name(normalized_group_name)
+            group = self._cached_get_group(normalized_group_name)
             if not group:
                 response = pb2.RemoveGroupResponse()
                 response.success = True
@@ -466,6 +496,13 @@ class IdentityHandlers:
             group_id = group["id"]
             removed_users = []
             
+            # Członkowie (Graph) wyliczani w tle, równolegle ze sprzątaniem RBAC i zasobów (ARM)
+            member_executor = ThreadPoolExecutor(max_workers=1)
+            members_future = member_executor.submit(
+                self._list_group_user_members, group_id, normalized_group_name
+            )
+            member_executor.shutdown(wait=False)
+            
             logger.info(
                 f"[RemoveGroup] Step 0: Removing RBAC role assignments for group '{normalized_group_name}'..."
             )
@@ -485,50 +522,21 @@ class IdentityHandlers:
                 f"[RemoveGroup] Step 1: Cleaning up Azure resources for group '{normalized_group_name}'..."
             )
             try:
+                # Ta sama strategia co CleanupGroupResources: RG usuwana kaskadowo,
+                # po tagach tylko zasoby spoza niej
+                resource_group_name = build_resource_group_name(normalized_group_name)
+                rg_deleted = self.resource_deleter.begin_delete_resource_group(resource_group_name)
+                
                 resources = self.resource_finder.find_resources_by_tags({"Group": normalized_group_name})
+                if rg_deleted:
+                    resources = exclude_resource_group(resources, resource_group_name)
                 logger.info(
                     f"[RemoveGroup] Found {len(resources)} resources with tag Group={normalized_group_name}"
                 )
                 
-                for resource in resources:
-                    try:
-                        result_msg = self.resource_deleter.delete_resource(resource)
-                        logger.info(f"[RemoveGroup] Deleted resource: {result_msg}")
-                    except Exception as e:
-                        logger.warning(
-                            f"[RemoveGroup] Error deleting resource {resource.get('name', 'unknown')}: {e}",
-                            exc_info=True
-                        )
-                
-                if not resources:
-                    resource_group_name = f"rg-{normalized_group_name}"
-                    logger.info(
-                        f"[RemoveGroup] No resources found by tags. "
-                        f"Trying fallback: delete Resource Group '{resource_group_name}'"
-                    )
-                    try:
-                        from azure_clients import get_resource_client
-                        resource_client = get_resource_client()
-                        try:
-                            rg = resource_client.resource_groups.get(resource_group_name)
-                            if rg:
-                                logger.info(
-                                    f"[RemoveGroup] Deleting Resource Group '{resource_group_name}' "
-                                    f"(this will delete all resources in the RG)..."
-                                )
-                                resource_client.resource_groups.begin_delete(resource_group_name).wait()
-                                logger.info(
-                                    f"[RemoveGroup] Successfully deleted Resource Group '{resource_group_name}'"
-                                )
-                        except Exception:
-                            logger.info(
-                                f"[RemoveGroup] Resource Group '{resource_group_name}' does not exist"
-                            )
-                    except Exception as e:
-                        logger.warning(
-                            f"[RemoveGroup] Error during fallback Resource Group deletion: {e}",
-                            exc_info=True
-                        )
+                # Niezależne zasoby usuwane równolegle (w falach zgodnych z zależnościami)
+                for _, result_msg in self.resource_deleter.delete_resources(resources):
+                    logger.info("[RemoveGroup] Deleted resource: %s", result_msg)
                 
                 logger.info(
                     f"[RemoveGroup] Step 1 completed: Cleaned up Azure resources for group '{normalized_group_name}'"
@@ -544,47 +552,27 @@ class IdentityHandlers:
                 f"[RemoveGroup] Step 2: Removing RBAC role assignments for users in group '{normalized_group_name}'..."
             )
             
-            user_members = []
-            primary_endpoint_count = 0
-            import time
-            for attempt in range(1, 4):
-                try:
-                    user_members = self.group_manager.list_user_members(group_id)
-                    primary_endpoint_count = len(user_members)
-                    if user_members:
-                        logger.info(
-                            f"[RemoveGroup] Primary endpoint (list_user_members) found {primary_endpoint_count} users "
-                            f"in group '{normalized_group_name}' (attempt {attempt}/3)"
-                        )
-                        break
-                    if attempt < 3:
-                        delay = 2.0 * attempt
-                        logger.info(
-                            f"[RemoveGroup] Primary endpoint returned 0 users (attempt {attempt}/3). "
-                            f"Waiting {delay}s for Azure AD replication..."
-                        )
-                        time.sleep(delay)
-                except Exception as e:
-                    logger.warning(
-                        f"[RemoveGroup] Error calling list_user_members (attempt {attempt}/3): {e}",
-                        exc_info=True
-                    )
-                    if attempt < 3:
-                        time.sleep(2.0 * attempt)
+            user_members = members_future.result()
+            primary_endpoint_count = len(user_members)
             
             logger.info(
                 f"[RemoveGroup] Step 2.1: Primary endpoint found {len(user_members)} user members "
                 f"in group '{normalized_group_name}' (group_id: {group_id})"
             )
             
-            for idx, user in enumerate(user_members):
-                logger.info(
-                    f"[RemoveGroup] User {idx+1}: id={user.get('id')}, "
-                    f"userPrincipalName={user.get('userPrincipalName', 'N/A')}"
-                )
+            if logger.isEnabledFor(logging.INFO):
+                for idx, user in enumerate(user_members):
+                    logger.info(
+                        "[RemoveGroup] User %s: id=%s, "
+                        "userPrincipalName=%s",
+                        idx + 1, user.get('id'), user.get('userPrincipalName', 'N/A')
+                    )
             
             user_ids_to_remove = []
             
+            # Jeden klient Graph dla całego kroku (współdzielona sesja HTTP i cache tokenów)
+            graph_client = get_graph_client()
+            
             upn_search_count = 0
             if not user_members:
                 logger.warning(
@@ -592,13 +580,8 @@ class IdentityHandlers:
                     f"Trying fallback: search users by UPN pattern containing '{normalized_group_name}'..."
                 )
                 try:
-                    from config.settings import AZURE_UDOMAIN
-                    from azure_clients import get_graph_client
-                    graph_client = get_graph_client()
-                    
                     filter_pattern = f"-{normalized_group_name}@{AZURE_UDOMAIN}"
                     # Graph API wymaga URL encoding dla filtrów
-                    import urllib.parse
                     filter_encoded = urllib.parse.quote(f"endswith(userPrincipalName,'{filter_pattern}')")
                     
                     resp = graph_client.get(f"/users?$filter={filter_encoded}&$select=id,userPrincipalName")
@@ -619,11 +602,13 @@ class IdentityHandlers:
                                 })
                                 upn_search_count += 1
                                 logger.debug(
-                                    f"[RemoveGroup] UPN search: Found user '{upn}' (id: {user_id})"
+                                    "[RemoveGroup] UPN search: Found user '%s' (id: %s)",
+                                    upn, user_id
                                 )
                         logger.info(
-                            f"[RemoveGroup] Step 2.2: UPN pattern search added {upn_search_count} users "
-                            f"to removal list"
+                            "[RemoveGroup] Step 2.2: UPN pattern search added %s users "
+                            "to removal list",
+                            upn_search_count
                         )
                     else:
                         logger.warning(
@@ -656,106 +641,81 @@ class IdentityHandlers:
                 
                 if not user_id:
                     logger.warning(
-                        f"[RemoveGroup] User member missing 'id': {user}"
+                        "[RemoveGroup] User member missing 'id': %s",
+                        user
                     )
                     continue
                 
                 if not user_principal_name:
                     logger.warning(
-                        f"[RemoveGroup] User member missing 'userPrincipalName' (id: {user_id}). "
-                        f"Trying to get UPN from Graph API..."
+                        "[RemoveGroup] User member missing 'userPrincipalName' (id: %s). "
+                        "Trying to get UPN from Graph API...",
+                        user_id
                     )
                     try:
-                        from azure_clients import get_graph_client
-                        graph_client = get_graph_client()
                         user_data = graph_client.get(f"/users/{user_id}?$select=userPrincipalName")
                         if user_data.status_code == 200:
                             user_principal_name = user_data.json().get("userPrincipalName", "")
                             logger.info(
-                                f"[RemoveGroup] Retrieved UPN for user {user_id}: {user_principal_name}"
+                                "[RemoveGroup] Retrieved UPN for user %s: %s",
+                                user_id, user_principal_name
                             )
                     except Exception as e:
                         logger.warning(
-                            f"[RemoveGroup] Failed to get UPN for user {user_id}: {e}"
+                            "[RemoveGroup] Failed to get UPN for user %s: %s",
+                            user_id, e
                         )
                 
                 if user_id and user_principal_name:
-                    try:
-                        removed_user_assignments = self.rbac_manager.remove_role_assignments_for_user(user_id)
-                        logger.info(
-                            f"[RemoveGroup] Removed {removed_user_assignments} role assignment(s) "
-                            f"for user '{user_principal_name}' (id: {user_id})"
-                        )
-                        user_ids_to_remove.append((user_id, user_principal_name))
-                    except Exception as e:
-                        logger.warning(
-                            f"[RemoveGroup] Error removing role assignments for user {user_principal_name}: {e}. "
-                            f"Continuing with user deletion...",
-                            exc_info=True
-                        )
-                        user_ids_to_remove.append((user_id, user_principal_name))
+                    user_ids_to_remove.append((user_id, user_principal_name))
                 else:
                     logger.warning(
-                        f"[RemoveGroup] Skipping user member: missing id or userPrincipalName. "
-                        f"id={user_id}, userPrincipalName={user_principal_name}"
+                        "[RemoveGroup] Skipping user member: missing id or userPrincipalName. "
+                        "id=%s, userPrincipalName=%s",
+                        user_id, user_principal_name
                     )
             
-            logger.info(
-                f"[RemoveGroup] Step 3: Removing users from group and deleting users for group '{normalized_group_name}'..."
-            )
-            for user_id, user_principal_name in user_ids_to_remove:
+            # Przypisania ról wszystkich użytkowników: jedno listowanie ARM + równoległe DELETE
+            if user_ids_to_remove:
                 try:
-                    try:
-                        self.group_manager.remove_member(group_id, user_id)
-                    except Exception as e:
-                        logger.debug(
-                            f"[RemoveGroup] Error removing user {user_principal_name} from group (may already be removed): {e}"
-                        )
-                    
-                    import time
-                    user_deleted = False
-                    for delete_attempt in range(1, 4):
-                        try:
-                            self.user_manager.delete_user(user_principal_name)
-                            user_deleted = True
-                            break
-                        except Exception as e:
-                            error_msg = str(e).lower()
-                            if "404" in error_msg or "not found" in error_msg:
-                                user_deleted = True
-                                logger.info(
-                                    f"[RemoveGroup] User '{user_principal_name}' already deleted (idempotent success)"
-                                )
-                                break
-                            if delete_attempt < 3:
-                                delay = 2.0 * delete_attempt
-                                logger.warning(
-                                    f"[RemoveGroup] Error deleting user {user_principal_name} (attempt {delete_attempt}/3): {e}. "
-                                    f"Retrying in {delay}s..."
-                                )
-                                time.sleep(delay)
-                            else:
-                                raise
-                    
-                    if user_deleted:
-                        removed_users.append(user_principal_name)
+                    removed_counts = self.rbac_manager.remove_role_assignments_for_users(
+                        user_id for user_id, _ in user_ids_to_remove
+                    )
+                    for user_id, user_principal_name in user_ids_to_remove:
                         logger.info(
-                            f"[RemoveGroup] Removed user '{user_principal_name}' from group and Azure AD"
-                        )
-                    else:
-                        logger.error(
-                            f"[RemoveGroup] Failed to delete user {user_principal_name} after 3 attempts"
+                            "[RemoveGroup] Removed %s role assignment(s) for user '%s' (id: %s)",
+                            removed_counts.get(user_id, 0), user_principal_name, user_id
                         )
                 except Exception as e:
                     logger.warning(
-                        f"[RemoveGroup] Failed to delete user {user_principal_name}: {e}",
+                        f"[RemoveGroup] Error removing role assignments for users: {e}. "
+                        f"Continuing with user deletion...",
                         exc_info=True
                     )
             
+            if not user_ids_to_remove:
+                # Pusta grupa - przejdź od razu do usunięcia grupy
+                logger.info(
+                    f"[RemoveGroup] Step 3: No users to remove in group '{normalized_group_name}', skipping"
+                )
+            else:
+                logger.info(
+                    f"[RemoveGroup] Step 3: Removing users from group and deleting users for group '{normalized_group_name}'..."
+                )
+                # Usunięcie użytkownika w paczkach Graph $batch usuwa też jego członkostwo w grupie
+                removed_users.extend(
+                    self.user_manager.delete_users(user_ids_to_remove)
+                )
+                logger.info(
+                    f"[RemoveGroup] Removed {len(removed_users)}/{len(user_ids_to_remove)} users "
+                    f"from group and Azure AD"
+                )
+            
             logger.info(
                 f"[RemoveGroup] Step 4: Deleting Entra ID group '{normalized_group_name}'..."
             )
             self.group_manager.delete_group(group_id)
+            self._group_cache.pop(normalized_group_name)
             
             response = pb2.RemoveGroupResponse()
             response.success = True
@@ -772,117 +732,140 @@ class IdentityHandlers:
 
         except Exception as e:
             logger.error(f"[RemoveGroup] Error: {e}", exc_info=True)
-            context.set_code(grpc.StatusCode.INTERNAL)
-            context.set_details(str(e))
-            response = pb2.RemoveGroupResponse()
-            response.success = False
-            response.message = str(e)
-            return response
+            context.abort(grpc.StatusCode.INTERNAL, str(e))
+    
+    def _list_group_user_members(self, group_id: str, normalized_group_name: str) -> List[dict]:
+        """
+        Lists user members of a group for RemoveGroup, retrying while the listing is empty.
+        
+        Makes up to 3 attempts on empty results or errors (Azure AD replication delay).
+        Runs in a background thread while RemoveGroup cleans up Azure resources.
+        """
+        user_members: List[dict] = []
+        for attempt in range(1, 4):
+            try:
+                user_members = self.group_manager.list_user_members(group_id)
+                if user_members:
+                    logger.info(
+                        f"[RemoveGroup] Primary endpoint (list_user_members) found {len(user_members)} users "
+                        f"in group '{normalized_group_name}' (attempt {attempt}/3)"
+                    )
+                    break
+                if attempt < 3:
+                    delay = 2.0 * attempt
+                    logger.info(
+                        f"[RemoveGroup] Primary endpoint returned 0 users (attempt {attempt}/3). "
+                        f"Waiting {delay}s for Azure AD replication..."
+                    )
+                    time.sleep(delay)
+            except Exception as e:
+                logger.warning(
+                    f"[RemoveGroup] Error calling list_user_members (attempt {attempt}/3): {e}",
+                    exc_info=True
+                )
+                if attempt < 3:
+                    time.sleep(2.0 * attempt)
+        return user_members
     
     def assign_policies(self, request, context):
         """
         Assigns RBAC policies to a group or user.
         Backend uses this to assign resource access permissions.
         """
+        # Walidacja poza try: context.abort rzuca wyjątek, którego nie wolno przechwycić
+        resource_types = request.resourceTypes
+        group_name = request.groupName if request.groupName else None
+        user_name = request.userName if request.userName else None
+        
+        if not resource_types:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Resource types list cannot be empty")
+        
+        if not group_name and not user_name:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Either groupName or userName must be provided")
+        
+        available_types = self.rbac_manager._available_types
+        invalid_types = set(resource_types) - available_types
+        
+        if invalid_types:
+            error_msg = (
+                f"Invalid resource types: {', '.join(sorted(invalid_types))}. "
+                f"Available resource types: {self.rbac_manager._available_types_str}"
+            )
+            logger.error(f"[AssignPolicies] {error_msg}")
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, error_msg)
+        
         try:
-            resource_types = list(request.resourceTypes)
-            group_name = request.groupName if request.groupName else None
-            user_name = request.userName if request.userName else None
-            
-            if not resource_types:
-                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
-                context.set_details("Resource types list cannot be empty")
-                return pb2.AssignPoliciesResponse(success=False, message="Resource types list cannot be empty")
-            
-            if not group_name and not user_name:
-                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
-                context.set_details("Either groupName or userName must be provided")
-                return pb2.AssignPoliciesResponse(success=False, message="Either groupName or userName must be provided")
-            
-            available_types = set(self.rbac_manager.RESOURCE_TYPE_ROLES.keys())
-            invalid_types = [rt for rt in resource_types if rt not in available_types]
-            
-            if invalid_types:
-                available_list = ", ".join(sorted(available_types))
-                error_msg = (
-                    f"Invalid resource types: {', '.join(invalid_types)}. "
-                    f"Available resource types: {available_list}"
-                )
-                logger.error(f"[AssignPolicies] {error_msg}")
-                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
-                context.set_details(error_msg)
-                return pb2.AssignPoliciesResponse(success=False, message=error_msg)
-            
-            deduplicated_types = []
-            for rt in resource_types:
-                if rt not in deduplicated_types:
-                    deduplicated_types.append(rt)
-            
-            ordered_types = []
-            resource_type_order = getattr(self.rbac_manager, 'RESOURCE_TYPE_ORDER', ['network', 'storage', 'vm'])
-            
-            for rt in resource_type_order:
-                if rt in deduplicated_types:
-                    ordered_types.append(rt)
-            
-            for rt in deduplicated_types:
-                if rt not in ordered_types:
-                    ordered_types.append(rt)
+            # dict.fromkeys: deduplikacja O(N) z zachowaniem kolejności
+            seen = dict.fromkeys(resource_types)
+            resource_type_order = self.rbac_manager._resource_type_order
+            ordered_types = [rt for rt in resource_type_order if rt in seen] + [rt for rt in seen if rt not in resource_type_order]
             
             logger.info(
                 f"[AssignPolicies] Processing resource types in deterministic order: {ordered_types} "
-                f"(original: {resource_types}, deduplicated: {deduplicated_types})"
+                f"(original: {resource_types}, deduplicated: {list(seen)})"
             )
             
             assigned_roles = []
             failed_assignments = []
             
-            for resource_type in ordered_types:
+            # Grupa rozwiązywana raz dla wszystkich typów zasobów
+            group = None
+            group_error = None
+            if group_name:
+                normalized_group_name = normalize_name(group_name)
+                group = self._cached_get_group(normalized_group_name)
+                if not group:
+                    group_error = f"Group '{normalized_group_name}' not found for policy assignment"
+                    logger.warning(f"[AssignPolicies] {group_error}")
+            
+            scope = f"/subscriptions/{self.rbac_manager._subscription_id}"
+            
+            def assign_to_group(resource_type: str) -> tuple[bool, str]:
+                logger.info(
+                    "[AssignPolicies] Assigning role for resource_type='%s' "
+                    "to group='%s' (group_id=%s, scope=%s)",
+                    resource_type, group_name, group['id'], scope
+                )
                 try:
-                    if group_name:
-                        normalized_group_name = normalize_name(group_name)
-                        group = self.group_manager.get_group_by_name(normalized_group_name)
-                        if not group:
-                            error_msg = f"Group '{normalized_group_name}' not found for policy assignment"
-                            logger.warning(f"[AssignPolicies] {error_msg}")
-                            failed_assignments.append(f"{resource_type}: {error_msg}")
-                            continue
-                        
-                        scope = f"/subscriptions/{self.rbac_manager._subscription_id}"
-                        logger.info(
-                            f"[AssignPolicies] Assigning role for resource_type='{resource_type}' "
-                            f"to group='{group_name}' (group_id={group['id']}, scope={scope})"
-                        )
-                        
-                        success, reason = self.rbac_manager.assign_role_to_group(
-                            resource_type=resource_type,
-                            group_id=group["id"]
-                        )
+                    return self.rbac_manager.assign_role_to_group(
+                        resource_type=resource_type,
+                        group_id=group["id"]
+                    )
+                except Exception as e:
+                    error_msg = f"Exception assigning policy for resource type '{resource_type}': {str(e)}"
+                    logger.error("[AssignPolicies] %s", error_msg, exc_info=True)
+                    return False, str(e)
+            
+            if group_error:
+                failed_assignments.extend(f"{resource_type}: {group_error}" for resource_type in ordered_types)
+            elif group:
+                # Przypisania dla różnych typów zasobów są niezależne - wykonywane równolegle
+                max_workers = min(GRAPH_MAX_WORKERS, len(ordered_types))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    results = executor.map(assign_to_group, ordered_types)
+                    # executor.map zwraca wyniki w kolejności ordered_types (deterministyczny komunikat)
+                    for resource_type, (success, reason) in zip(ordered_types, results):
                         if success:
                             assigned_roles.append(f"{resource_type}->{group_name}")
                             logger.info(
-                                f"[AssignPolicies] Successfully assigned RBAC role for "
-                                f"resource_type='{resource_type}' to group='{group_name}'. "
-                                f"group_id={group['id']}, scope={scope}"
+                                "[AssignPolicies] Successfully assigned RBAC role for "
+                                "resource_type='%s' to group='%s'. "
+                                "group_id=%s, scope=%s",
+                                resource_type, group_name, group['id'], scope
                             )
                         else:
-                            error_msg = (
-                                f"Failed to assign RBAC role for resource_type='{resource_type}' "
-                                f"to group='{group_name}': {reason}. "
-                                f"group_id={group['id']}, scope={scope}"
+                            logger.warning(
+                                "[AssignPolicies] Failed to assign RBAC role for resource_type='%s' "
+                                "to group='%s': %s. "
+                                "group_id=%s, scope=%s",
+                                resource_type, group_name, reason, group['id'], scope
                             )
-                            logger.warning(f"[AssignPolicies] {error_msg}")
                             failed_assignments.append(f"{resource_type}: {reason}")
-                    
-                    if user_name:
-                        logger.warning(f"[AssignPolicies] User-level policy assignment not yet implemented for '{user_name}'")
-                        failed_assignments.append(f"{resource_type}: User-level assignment not implemented")
-                
-                except Exception as e:
-                    error_msg = f"Exception assigning policy for resource type '{resource_type}': {str(e)}"
-                    logger.error(f"[AssignPolicies] {error_msg}", exc_info=True)
-                    failed_assignments.append(f"{resource_type}: {str(e)}")
-                    # Continue with other resource types
+            
+            if user_name:
+                logger.warning(f"[AssignPolicies] User-level policy assignment not yet implemented for '{user_name}'")
+                for resource_type in ordered_types:
+                    failed_assignments.append(f"{resource_type}: User-level assignment not implemented")
             
             if assigned_roles:
                 message = f"Policies assigned successfully: {', '.join(assigned_roles)}"
@@ -903,9 +886,7 @@ class IdentityHandlers:
         
         except Exception as e:
             logger.error(f"[AssignPolicies] Unexpected error: {e}", exc_info=True)
-            context.set_code(grpc.StatusCode.INTERNAL)
-            context.set_details(str(e))
-            return pb2.AssignPoliciesResponse(success=False, message=f"Internal error: {str(e)}")
+            context.abort(grpc.StatusCode.INTERNAL, f"Internal error: {str(e)}")
     
     def update_group_leaders(self, request, context):
         """
@@ -915,14 +896,13 @@ class IdentityHandlers:
         Currently uses CreateGroupWithLeadersRequest/Response from protobuf.
         """
         group_name: str = request.groupName
-        resource_types: List[str] = list(request.resourceTypes)
-        new_leaders: List[str] = list(request.leaders)
+        new_leaders = frozenset(request.leaders)
         
-        resource_type: str = resource_types[0] if resource_types else ""
+        resource_type: str = request.resourceTypes[0] if request.resourceTypes else ""
         normalized_group_name = normalize_name(group_name)
         
         try:
-            group = self.group_manager.get_group_by_name(normalized_group_name)
+            group = self._cached_get_group(normalized_group_name)
             if not group:
                 context.set_code(grpc.StatusCode.NOT_FOUND)
                 context.set_details(f"Group '{normalized_group_name}' does not exist")
@@ -930,138 +910,116 @@ class IdentityHandlers:
             
             group_id = group["id"]
             
-            current_owner_ids = self.group_manager.list_owners(group_id)
+            # Owners razem z UPN w jednym zapytaniu (bez GET /users/{id} dla każdego ownera)
+            current_owners = self.group_manager.list_owner_users(group_id)
             logger.info(
-                f"[UpdateGroupLeaders] Current owners for group '{normalized_group_name}': {len(current_owner_ids)}"
+                f"[UpdateGroupLeaders] Current owners for group '{normalized_group_name}': {len(current_owners)}"
             )
             
+            # KROK 2: Diff liczony w trakcie rozwiązywania loginów (jedno przejście po ownerach)
             current_leader_logins = set()
-            owner_id_to_login = {}
+            to_remove = {}  # owner_id -> login
             
-            for owner_id in current_owner_ids:
-                try:
-                    from msgraph.core import GraphClient
-                    from azure_clients import get_graph_client
-                    graph = get_graph_client()
-                    resp = graph.get(f"/users/{owner_id}")
-                    if resp.status_code == 200:
-                        user_data = resp.json()
-                        upn = user_data.get("userPrincipalName", "")
-                        login = upn.split("@")[0] if "@" in upn else upn
-                        if login.endswith(f"-{normalized_group_name}"):
-                            login = login[:-(len(normalized_group_name) + 1)]
-                        current_leader_logins.add(login)
-                        owner_id_to_login[owner_id] = login
-                except Exception as e:
-                    logger.warning(
-                        f"[UpdateGroupLeaders] Could not get user data for owner_id {owner_id}: {e}"
-                    )
-                    # Użyj owner_id jako fallback
-                    current_leader_logins.add(owner_id)
-                    owner_id_to_login[owner_id] = owner_id
+            graph = None
+            login_suffix = f"-{normalized_group_name}"
+            for owner in current_owners:
+                owner_id = owner["id"]
+                upn = owner.get("userPrincipalName", "")
+                if not upn:
+                    # UPN brakujący w odpowiedzi - dociągnij pojedynczo
+                    try:
+                        graph = graph or get_graph_client()
+                        resp = graph.get(f"/users/{owner_id}?$select=userPrincipalName")
+                        if resp.status_code == 200:
+                            upn = resp.json().get("userPrincipalName", "")
+                    except Exception as e:
+                        logger.warning(
+                            "[UpdateGroupLeaders] Could not get user data for owner_id %s: %s",
+                            owner_id, e
+                        )
+                
+                # Użyj owner_id jako fallback, gdy UPN nie jest dostępny
+                login = upn.partition("@")[0].removesuffix(login_suffix) if upn else owner_id
+                current_leader_logins.add(login)
+                if login not in new_leaders:
+                    to_remove[owner_id] = login
             
-            # KROK 2: Oblicz diff
-            new_leaders_set = set(new_leaders)
-            to_add = new_leaders_set - current_leader_logins
-            to_remove = current_leader_logins - new_leaders_set
+            to_add = new_leaders - current_leader_logins
             
             logger.info(
                 f"[UpdateGroupLeaders] Diff for group '{normalized_group_name}': "
-                f"to_add={list(to_add)}, to_remove={list(to_remove)}"
+                f"to_add={list(to_add)}, to_remove={list(to_remove.values())}"
             )
             
             # KROK 3: Usuń starych liderów
-            for leader_login in to_remove:
-                # Znajdź owner_id dla tego loginu
-                owner_id = None
-                for oid, login in owner_id_to_login.items():
-                    if login == leader_login:
-                        owner_id = oid
-                        break
-                
-                if owner_id:
-                    try:
-                        # Usuń z owners
-                        self.group_manager.remove_owner(group_id, owner_id)
-                        logger.info(
-                            f"[UpdateGroupLeaders] Removed owner '{leader_login}' (id: {owner_id}) "
-                            f"from group '{normalized_group_name}'"
-                        )
-                        
-                        # Usuń RBAC role assignments dla tego użytkownika
-                        removed_assignments = self.rbac_manager.remove_role_assignments_for_user(owner_id)
-                        if removed_assignments > 0:
-                            logger.info(
-                                f"[UpdateGroupLeaders] Removed {removed_assignments} RBAC role assignment(s) "
-                                f"for old leader '{leader_login}'"
-                            )
-                    except Exception as e:
-                        logger.warning(
-                            f"[UpdateGroupLeaders] Error removing old leader '{leader_login}': {e}",
-                            exc_info=True
-                        )
+            removed_counts = {}
+            if to_remove:
+                # RBAC role assignments wszystkich usuwanych liderów w jednym przebiegu
+                try:
+                    removed_counts = self.rbac_manager.remove_role_assignments_for_users(to_remove.keys())
+                except Exception as e:
+                    logger.warning(
+                        f"[UpdateGroupLeaders] Error removing RBAC role assignments for old leaders: {e}",
+                        exc_info=True
+                    )
             
-            # KROK 4: Dodaj nowych liderów
-            for leader_login in to_add:
+            for owner_id, leader_login in to_remove.items():
                 try:
-                    username_with_suffix = build_username_with_group_suffix(leader_login, group_name)
+                    # Usuń z owners
+                    self.group_manager.remove_owner(group_id, owner_id)
+                    logger.info(
+                        "[UpdateGroupLeaders] Removed owner '%s' (id: %s) "
+                        "from group '%s'",
+                        leader_login, owner_id, normalized_group_name
+                    )
                     
-                    # Sprawdź czy użytkownik już istnieje
-                    user = self.user_manager.get_user(username_with_suffix)
-                    if user:
-                        leader_id = user.get("id")
+                    removed_assignments = removed_counts.get(owner_id, 0)
+                    if removed_assignments > 0:
                         logger.info(
-                            f"[UpdateGroupLeaders] User '{leader_login}' already exists, using existing user"
+                            "[UpdateGroupLeaders] Removed %s RBAC role assignment(s) "
+                            "for old leader '%s'",
+                            removed_assignments, leader_login
                         )
-                    else:
-                        # Utwórz użytkownika
-                        leader_id = self.user_manager.create_user(
-                            login=leader_login,
-                            display_name=username_with_suffix,
-                            group_name=group_name,
+                except Exception as e:
+                    logger.warning(
+                        "[UpdateGroupLeaders] Error removing old leader '%s': %s",
+                        leader_login, e, exc_info=True
+                    )
+            
+            # KROK 4: Dodaj nowych liderów (każdy lider to niezależny łańcuch wywołań Graph API)
+            if to_add:
+                deadline = self._rpc_deadline(context)
+                max_workers = min(GRAPH_MAX_WORKERS, len(to_add))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futures = [
+                        executor.submit(
+                            self._add_one_leader,
+                            group_id,
+                            leader_login,
+                            group_name,
+                            normalized_group_name,
+                            deadline,
                         )
+                        for leader_login in to_add
+                    ]
+                    added_count = sum(1 for future in as_completed(futures) if future.result())
+                
+                # Rola RBAC jest przypisywana grupie, nie użytkownikowi - wystarczy jedno wywołanie
+                if resource_type and added_count:
+                    success, reason = self.rbac_manager.assign_role_to_group(
+                        resource_type=resource_type,
+                        group_id=group_id,
+                    )
+                    if success:
                         logger.info(
-                            f"[UpdateGroupLeaders] Created user '{leader_login}' for group '{normalized_group_name}'"
+                            f"[UpdateGroupLeaders] Assigned RBAC role for '{resource_type}' "
+                            f"to group '{normalized_group_name}' ({added_count} new leader(s))"
                         )
-                    
-                    # Dodaj do members (jeśli jeszcze nie jest członkiem)
-                    try:
-                        self.group_manager.add_member(group_id, leader_id)
-                    except Exception as e:
-                        # Może już być członkiem - to OK
-                        if "already" not in str(e).lower():
-                            logger.warning(
-                                f"[UpdateGroupLeaders] Could not add '{leader_login}' to members: {e}"
-                            )
-                    
-                    # Dodaj jako owner
-                    self.group_manager.add_owner(group_id, leader_id)
-                    logger.info(
-                        f"[UpdateGroupLeaders] Added '{leader_login}' as owner of group '{normalized_group_name}'"
-                    )
-                    
-                    # Przypisz RBAC role dla nowego lidera (jeśli resource_type podany)
-                    if resource_type:
-                        success, reason = self.rbac_manager.assign_role_to_group(
-                            resource_type=resource_type,
-                            group_id=group_id,
+                    else:
+                        logger.warning(
+                            f"[UpdateGroupLeaders] Failed to assign RBAC role for '{resource_type}' "
+                            f"to group '{normalized_group_name}': {reason}"
                         )
-                        if success:
-                            logger.info(
-                                f"[UpdateGroupLeaders] Assigned RBAC role for '{resource_type}' "
-                                f"to new leader '{leader_login}'"
-                            )
-                        else:
-                            logger.warning(
-                                f"[UpdateGroupLeaders] Failed to assign RBAC role for new leader '{leader_login}': {reason}"
-                            )
-                    
-                except Exception as e:
-                    logger.error(
-                        f"[UpdateGroupLeaders] Error adding new leader '{leader_login}': {e}",
-                        exc_info=True
-                    )
-                    # Kontynuuj z następnymi liderami
             
             response = pb2.GroupCreatedResponse()
             response.groupName = group_name
@@ -1073,7 +1031,192 @@ class IdentityHandlers:
             
         except Exception as e:
             logger.error(f"[UpdateGroupLeaders] Error: {e}", exc_info=True)
-            context.set_code(grpc.StatusCode.INTERNAL)
-            context.set_details(str(e))
-            return pb2.GroupCreatedResponse()
-
+            context.abort(grpc.StatusCode.INTERNAL, str(e))
+    
+    def _provision_leader(
+        self,
+        group_id: str,
+        leader_login: str,
+        username_with_suffix: str,
+        group_name: str,
+        created_leaders: List[tuple[str, str]],
+        created_lock: threading.Lock,
+        deadline: Optional[float] = None,
+    ) -> None:
+        """
+        Creates a leader account, adds it as group member and owner (CreateGroupWithLeaders).
+        
+        The account is recorded in `created_leaders` as soon as it exists, so the caller
+        can roll it back. Raises on create_user/add_member failure; add_owner errors are logged.
+        """
+        try:
+            leader_id = self.user_manager.create_user(
+                login=leader_login,
+                display_name=username_with_suffix,
+                group_name=group_name,
+            )
+        except Exception as e:
+            logger.error(
+                "[CreateGroupWithLeaders] create_user(%s) "
+                "failed: %s",
+                leader_login, e
+            )
+            raise
+        
+        with created_lock:
+            created_leaders.append((leader_login, leader_id))
+        
+        # Dodajemy lidera jako członka i właściciela grupy (równolegle)
+        member_error, owner_error = self._add_member_and_owner(group_id, leader_id, deadline)
+        if owner_error is not None:
+            logger.warning(
+                "[CreateGroupWithLeaders] add_owner failed for "
+                "leader=%s, group_id=%s: %s",
+                username_with_suffix, group_id, owner_error
+            )
+        if member_error is not None:
+            logger.error(
+                "[CreateGroupWithLeaders] add_member failed for "
+                "leader=%s, group_id=%s: %s",
+                username_with_suffix, group_id, member_error
+            )
+            raise member_error
+    
+    def _add_member_and_owner(
+        self,
+        group_id: str,
+        user_id: str,
+        deadline: Optional[float] = None,
+    ) -> tuple[Optional[Exception], Optional[Exception]]:
+        """
+        Adds user as group member and owner concurrently.
+        
+        Both calls wait for the same user replication, so overlapping them halves
+        the wait for a freshly created account. Returns (member_error, owner_error).
+        """
+        owner_future = _OWNER_EXECUTOR.submit(self.group_manager.add_owner, group_id, user_id, deadline=deadline)
+        member_error = None
+        try:
+            self.group_manager.add_member(group_id, user_id, deadline=deadline)
+        except Exception as e:
+            member_error = e
+        owner_error = owner_future.exception()
+        return member_error, owner_error
+    
+    def _add_one_leader(
+        self,
+        group_id: str,
+        leader_login: str,
+        group_name: str,
+        normalized_group_name: str,
+        deadline: Optional[float] = None,
+    ) -> bool:
+        """
+        Adds a single new leader: get/create user, add as member and owner.
+        
+        Runs as an independent unit of work so leaders can be provisioned concurrently.
+        Logs and swallows errors; returns True on success.
+        """
+        try:
+            username_with_suffix = build_username_with_group_suffix(leader_login, group_name)
+            
+            # Sprawdź czy użytkownik już istnieje
+            user = self.user_manager.get_user(username_with_suffix)
+            if user:
+                leader_id = user.get("id")
+                logger.info(
+                    "[UpdateGroupLeaders] User '%s' already exists, using existing user",
+                    leader_login
+                )
+            else:
+                # Utwórz użytkownika
+                leader_id = self.user_manager.create_user(
+                    login=leader_login,
+                    display_name=username_with_suffix,
+                    group_name=group_name,
+                )
+                logger.info(
+                    "[UpdateGroupLeaders] Created user '%s' for group '%s'",
+                    leader_login, normalized_group_name
+                )
+            
+            # Dodaj do members i owners (równolegle)
+            member_error, owner_error = self._add_member_and_owner(group_id, leader_id, deadline)
+            # Może już być członkiem - to OK
+            if member_error is not None and "already" not in str(member_error).lower():
+                logger.warning(
+                    "[UpdateGroupLeaders] Could not add '%s' to members: %s",
+                    leader_login, member_error
+                )
+            if owner_error is not None:
+                raise owner_error
+            logger.info(
+                "[UpdateGroupLeaders] Added '%s' as owner of group '%s'",
+                leader_login, normalized_group_name
+            )
+            return True
+            
+        except Exception as e:
+            logger.error(
+                "[UpdateGroupLeaders] Error adding new leader '%s': %s",
+                leader_login, e, exc_info=True
+            )
+            return False
+    
+    def _provision_one(
+        self,
+        login: str,
+        group_name: str,
+        existing_member_ids: set[str],
+        existing_member_upns: set[str],
+        existing_user_id: Optional[str] = None,
+    ) -> tuple[str, str, str, Optional[str]]:
+        """
+        Creates a single user (unless `existing_user_id` is given) for CreateUsersForGroup.
+        
+        Runs as an independent unit of work so users can be provisioned concurrently.
+        Group membership is added afterwards in bulk by the caller.
+        The existing-member sets are only read here.
+        
+        Returns:
+            Tuple (login, status, detail, user_id) where status is "to_add",
+            "already_member" or "failed".
+        """
+        username_with_suffix = build_username_with_group_suffix(login, group_name)
+        
+        if username_with_suffix.lower() in existing_member_upns:
+            logger.info(
+                "[CreateUsersForGroup] User %s already member of group, skipping create_user and add_member",
+                login
+            )
+            return login, "already_member", "", None
+        
+        try:
+            if existing_user_id:
+                user_id = existing_user_id
+                logger.info("[CreateUsersForGroup] User %s already exists, reusing existing account", login)
+            else:
+                user_id = self.user_manager.create_user(
+                    login=login,
+                    display_name=username_with_suffix,
+                    group_name=group_name,
+                )
+        except Exception as e:
+            error_msg = str(e)
+            if "already exists" in error_msg.lower() or "ObjectConflict" in error_msg:
+                logger.warning(
+                    "[CreateUsersForGroup] User %s may already exist: %s",
+                    login, error_msg
+                )
+            else:
+                logger.error("[CreateUsersForGroup] create_user(%s) failed: %s", login, e)
+            return login, "failed", f"User creation failed: {error_msg}", None
+        
+        if user_id in existing_member_ids:
+            logger.info(
+                "[CreateUsersForGroup] User %s already member of group, skipping add_member",
+                login
+            )
+            return login, "already_member", "", user_id
+        
+        return login, "to_add", "", user_id
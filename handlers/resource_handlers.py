@@ -7,11 +7,10 @@ import logging
 
 import grpc
 
-from azure_clients import get_resource_client
 from identity.rbac_manager import AzureRBACManager
-from identity.utils import normalize_name
+from identity.utils import normalize_name, build_resource_group_name
 from clean_resources.resource_finder import ResourceFinder
-from clean_resources.resource_deleter import ResourceDeleter
+from clean_resources.resource_deleter import ResourceDeleter, exclude_resource_group
 from protos import adapter_interface_pb2 as pb2
 
 logger = logging.getLogger(__name__)
@@ -29,6 +28,10 @@ class ResourceHandlers:
         self.rbac_manager = rbac_manager
         self.resource_finder = resource_finder
         self.resource_deleter = resource_deleter
+        # Mapowanie typów zasobów na role RBAC jest stałe - odpowiedź budowana raz
+        self._services_response = pb2.GetAvailableServicesResponse(
+            services=tuple(rbac_manager.RESOURCE_TYPE_ROLES)
+        )
     
     def get_available_services(self, request, context):
         """
@@ -36,10 +39,8 @@ class ResourceHandlers:
         Azure equivalent of AWS GetAvailableServices.
         """
         try:
-            # Get available resource types from RBAC manager
-            services_list = list(self.rbac_manager.RESOURCE_TYPE_ROLES.keys())
             response = pb2.GetAvailableServicesResponse()
-            response.services.extend(services_list)
+            response.CopyFrom(self._services_response)
             return response
         except Exception as e:
             logger.error(f"[GetAvailableServices] Error: {e}", exc_info=True)
@@ -60,8 +61,7 @@ class ResourceHandlers:
             return pb2.ResourceCountResponse()
         
         try:
-            resources = self.resource_finder.find_resources_by_tags({"Group": group_name})
-            count = sum(1 for r in resources if (r.get("service") or "").lower() == resource_type)
+            count = self.resource_finder.count_resources_by_tags({"Group": group_name}, service=resource_type)
             return pb2.ResourceCountResponse(count=count)
         except Exception as e:
             logger.error(f"[GetResourceCount] Error: {e}", exc_info=True)
@@ -74,66 +74,33 @@ class ResourceHandlers:
         Removes all Azure resources associated with group (VMs, storage, etc.).
         
         Strategy:
-        1. Find and delete resources by Group tags
-        2. Fallback: delete Resource Group rg-{group_name} if no tagged resources found
+        1. If Resource Group rg-{group_name} exists, delete it (ARM cascades to its resources)
+        2. Find and delete resources by Group tags (outside that Resource Group, if it was deleted)
         """
         group_name: str = request.groupName
         normalized_group_name = normalize_name(group_name)
+        resource_group_name = build_resource_group_name(normalized_group_name)
 
         try:
             deleted_resources = []
             
+            # Usunięcie RG jednym wywołaniem ARM obejmuje kaskadowo wszystkie jej zasoby
+            rg_deleted = self.resource_deleter.begin_delete_resource_group(resource_group_name)
+            if rg_deleted:
+                deleted_resources.append(f"Deleted Resource Group: {resource_group_name}")
+            
             resources = self.resource_finder.find_resources_by_tags({"Group": normalized_group_name})
+            if rg_deleted:
+                # Zasoby z usuwanej RG pomijane - zostają tylko otagowane zasoby z innych RG
+                resources = exclude_resource_group(resources, resource_group_name)
             logger.info(
                 f"[CleanupGroupResources] Found {len(resources)} resources with tag Group={normalized_group_name}"
             )
             
-            for resource in resources:
-                try:
-                    result_msg = self.resource_deleter.delete_resource(resource)
-                    deleted_resources.append(result_msg)
-                    logger.info(f"[CleanupGroupResources] Deleted resource: {result_msg}")
-                except Exception as e:
-                    logger.error(
-                        f"[CleanupGroupResources] Error deleting resource {resource.get('name', 'unknown')}: {e}",
-                        exc_info=True
-                    )
-            
-            if not resources:
-                resource_group_name = f"rg-{normalized_group_name}"
-                logger.info(
-                    f"[CleanupGroupResources] No resources found by tags. "
-                    f"Trying fallback: delete Resource Group '{resource_group_name}'"
-                )
-                
-                try:
-                    resource_client = get_resource_client()
-                    
-                    try:
-                        rg = resource_client.resource_groups.get(resource_group_name)
-                        if rg:
-                            logger.info(
-                                f"[CleanupGroupResources] Resource Group '{resource_group_name}' exists. "
-                                f"Deleting it (this will delete all resources in the RG)..."
-                            )
-                            
-                            resource_client.resource_groups.begin_delete(resource_group_name).wait()
-                            
-                            deleted_resources.append(f"Deleted Resource Group: {resource_group_name}")
-                            logger.info(
-                                f"[CleanupGroupResources] Successfully deleted Resource Group '{resource_group_name}'"
-                            )
-                    except Exception as e:
-                        logger.info(
-                            f"[CleanupGroupResources] Resource Group '{resource_group_name}' does not exist. "
-                            f"Nothing to clean up."
-                        )
-                        
-                except Exception as e:
-                    logger.warning(
-                        f"[CleanupGroupResources] Error during fallback Resource Group deletion: {e}",
-                        exc_info=True
-                    )
+            # Niezależne zasoby usuwane równolegle (w falach zgodnych z zależnościami)
+            for _, result_msg in self.resource_deleter.delete_resources(resources):
+                deleted_resources.append(result_msg)
+                logger.info("[CleanupGroupResources] Deleted resource: %s", result_msg)
             
             if deleted_resources:
                 response = pb2.CleanupGroupResponse()
@@ -166,4 +133,3 @@ class ResourceHandlers:
             response.success = False
             response.message = str(e)
             return response
-
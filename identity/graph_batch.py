@@ -0,0 +1,47 @@
+# identity/graph_batch.py
+
+"""
+Helpers for Microsoft Graph JSON batching ($batch endpoint).
+"""
+
+import logging
+from typing import Dict, Iterator, List
+
+from msgraph.core import GraphClient
+
+logger = logging.getLogger(__name__)
+
+# Graph API przyjmuje maksymalnie 20 żądań w jednym $batch
+GRAPH_BATCH_LIMIT = 20
+
+# Operator `in` w $filter przyjmuje maksymalnie 15 wartości
+FILTER_IN_LIMIT = 15
+
+
+def chunked(items: List, size: int) -> Iterator[List]:
+    """Yields consecutive slices of `items` with at most `size` elements."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def post_batch(graph: GraphClient, requests: List[Dict]) -> Dict[str, Dict]:
+    """
+    Sends up to GRAPH_BATCH_LIMIT sub-requests in a single POST /$batch.
+
+    Sub-request URLs are relative to the API version (e.g. "/users/{id}").
+    Returns mapping: sub-request id -> sub-response dict (status, headers, body).
+    Raises on transport-level failure of the batch itself.
+    """
+    if len(requests) > GRAPH_BATCH_LIMIT:
+        raise ValueError(
+            f"Graph $batch supports at most {GRAPH_BATCH_LIMIT} requests, got {len(requests)}"
+        )
+
+    resp = graph.post("/$batch", json={"requests": requests})
+    resp.raise_for_status()
+
+    responses = {r.get("id"): r for r in resp.json().get("responses", [])}
+    logger.debug(
+        "[post_batch] Sent %s sub-requests, received %s responses", len(requests), len(responses)
+    )
+    return responses
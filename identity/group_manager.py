@@ -5,17 +5,58 @@ Group management in Microsoft Entra ID using Microsoft Graph API.
 """
 
 import time
+import random
 import logging
-from typing import Optional, List, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Iterator, List, Dict, Tuple
 
+import requests
+from azure.core.exceptions import HttpResponseError
 from msgraph.core import GraphClient
 
 from azure_clients import get_graph_client, get_resource_client
-from config.settings import AZURE_SUBSCRIPTION_ID
-from identity.utils import normalize_name
+from config.settings import GRAPH_MAX_WORKERS
+from identity.graph_batch import GRAPH_BATCH_LIMIT, chunked, post_batch
+from identity.rg_cache import RESOURCE_GROUP_CACHE
+from identity.utils import normalize_name, build_resource_group_name
 
 logger = logging.getLogger(__name__)
 
+_GRAPH_V1_URL = "https://graph.microsoft.com/v1.0"
+_DIR_OBJ_PREFIX = f"{_GRAPH_V1_URL}/directoryObjects/"
+
+_MAX_RETRY_DELAY = 30.0
+# Łączny limit czekania jednego wywołania (gdy brak deadline RPC)
+_MAX_TOTAL_RETRY_DELAY = 60.0
+
+# Wartość w wyniku add_members_bulk dla użytkowników, którzy już byli członkami grupy
+ALREADY_MEMBER = "already a member"
+
+
+def _retry_after_seconds(headers) -> Optional[float]:
+    """Parses server retry hint (Retry-After seconds or x-ms-retry-after-ms); None if absent or malformed."""
+    if not headers:
+        return None
+    for name, scale in (("Retry-After", 1.0), ("x-ms-retry-after-ms", 0.001)):
+        value = headers.get(name)
+        if value:
+            try:
+                return float(value) * scale
+            except (TypeError, ValueError):
+                continue
+    return None
+
+
+def _next_retry_delay(prev_delay: float, initial_delay: float, retry_after: Optional[float] = None) -> float:
+    """
+    Returns wait before the next retry: decorrelated jitter (first retry waits
+    exactly `initial_delay`), but never shorter than Graph's retry hint.
+    """
+    delay = random.uniform(initial_delay, max(initial_delay, prev_delay * 3))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return min(delay, _MAX_RETRY_DELAY)
+
 
 class AzureGroupManager:
     """
@@ -37,7 +78,8 @@ class AzureGroupManager:
         Creates a security group in Entra ID.
         
         Normalizes group name (spaces → dashes) for AWS adapter compatibility.
-        Optionally creates Azure Resource Group for fallback cleanup.
+        Optionally creates Azure Resource Group for fallback cleanup
+        (concurrently with the Graph call).
         
         Returns tuple (group_id, resource_group_name).
         """
@@ -46,73 +88,152 @@ class AzureGroupManager:
         body = {
             "displayName": normalized_name,
             "mailEnabled": False,
-            "mailNickname": normalized_name.replace(" ", "-").lower(),
+            "mailNickname": normalized_name.lower(),
             "securityEnabled": True,
         }
 
         if description:
             body["description"] = description
 
-        resp = self._graph.post("/groups", json=body)
-        resp.raise_for_status()
-        data = resp.json()
-        group_id = data["id"]
-        
-        resource_group_name = None
-        if create_resource_group:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Graph (Entra ID) i ARM to niezależne płaszczyzny - Resource Group tworzona równolegle z grupą
+            rg_future = (
+                executor.submit(self._create_resource_group_for_group, normalized_name)
+                if create_resource_group else None
+            )
+            
             try:
-                resource_group_name = self._create_resource_group_for_group(normalized_name)
-                logger.info(
-                    f"[create_group] Created Resource Group '{resource_group_name}' "
-                    f"for group '{normalized_name}'"
-                )
-            except Exception as e:
-                logger.warning(
-                    f"[create_group] Failed to create Resource Group for group '{normalized_name}': {e}. "
-                    f"Continuing without RG (cleanup will rely on tags only)."
-                )
+                resp = self._graph.post("/groups", json=body)
+                resp.raise_for_status()
+                data = resp.json()
+                group_id = data["id"]
+            except Exception:
+                # Grupa nie powstała - RG utworzona równolegle nie może zostać osierocona
+                if rg_future is not None:
+                    self._discard_resource_group(rg_future)
+                raise
+            
+            resource_group_name = None
+            if rg_future is not None:
+                try:
+                    resource_group_name, _created = rg_future.result()
+                    logger.info(
+                        f"[create_group] Created Resource Group '{resource_group_name}' "
+                        f"for group '{normalized_name}'"
+                    )
+                except Exception as e:
+                    logger.warning(
+                        f"[create_group] Failed to create Resource Group for group '{normalized_name}': {e}. "
+                        f"Continuing without RG (cleanup will rely on tags only)."
+                    )
         
         return group_id, resource_group_name
     
-    def _create_resource_group_for_group(self, normalized_group_name: str) -> Optional[str]:
+    def _discard_resource_group(self, rg_future) -> None:
+        """
+        Deletes Resource Group created for a group whose creation in Graph failed.
+        
+        Only an RG created by this call (ARM 201) is deleted - a pre-existing one is left intact.
+        """
+        try:
+            resource_group_name, created = rg_future.result()
+        except Exception:
+            return
+        if not resource_group_name or not created:
+            return
+        try:
+            get_resource_client().resource_groups.begin_delete(resource_group_name)
+            RESOURCE_GROUP_CACHE.pop(resource_group_name)
+            logger.info(
+                "[create_group] Group creation failed - deleting Resource Group '%s'",
+                resource_group_name
+            )
+        except Exception as e:
+            logger.warning(
+                "[create_group] Failed to delete orphaned Resource Group '%s': %s",
+                resource_group_name, e
+            )
+
+    def _create_resource_group_for_group(self, normalized_group_name: str) -> Tuple[Optional[str], bool]:
         """
         Creates Resource Group named rg-{normalized_group_name} with Group tag.
         
-        Returns Resource Group name or None on error.
+        An existing Resource Group keeps its tags; only the Group tag is added.
+        
+        Returns tuple (Resource Group name or None on error, True if RG was newly created by this call).
         """
         try:
+            resource_group_name = build_resource_group_name(normalized_group_name)
+            if RESOURCE_GROUP_CACHE.get(resource_group_name):
+                logger.info(
+                    "[_create_resource_group_for_group] Resource Group '%s' "
+                    "already exists (cached)",
+                    resource_group_name
+                )
+                return resource_group_name, False
+            
             resource_client = get_resource_client()
-            resource_group_name = f"rg-{normalized_group_name}"
             
+            # create_or_update nadpisuje wszystkie tagi - istniejącej RG tylko dokładamy tag Group
+            tags = {"Group": normalized_group_name}
             try:
-                existing_rg = resource_client.resource_groups.get(resource_group_name)
-                if existing_rg:
-                    logger.info(
-                        f"[_create_resource_group_for_group] Resource Group '{resource_group_name}' "
-                        f"already exists"
+                existing = resource_client.resource_groups.get(resource_group_name)
+            except HttpResponseError as e:
+                if e.status_code != 404:
+                    raise
+                existing = None
+            
+            if existing is not None:
+                current_tags = existing.tags or {}
+                if current_tags.get("Group") != normalized_group_name:
+                    resource_client.resource_groups.create_or_update(
+                        resource_group_name,
+                        {"location": existing.location, "tags": {**current_tags, **tags}},
                     )
-                    return resource_group_name
-            except Exception:
-                pass
+                logger.info(
+                    "[_create_resource_group_for_group] Resource Group '%s' "
+                    "already exists, tag Group=%s ensured",
+                    resource_group_name, normalized_group_name
+                )
+                RESOURCE_GROUP_CACHE.set(resource_group_name, True)
+                return resource_group_name, False
             
-            tags = {"Group": normalized_group_name}
-            resource_client.resource_groups.create_or_update(
-                resource_group_name,
-                {"location": "westeurope", "tags": tags}
-            )
+            try:
+                # Status 201 odróżnia nowo utworzoną RG od utworzonej równolegle (200)
+                rg, status_code = resource_client.resource_groups.create_or_update(
+                    resource_group_name,
+                    {"location": "westeurope", "tags": tags},
+                    cls=lambda response, deserialized, _headers: (
+                        deserialized, response.http_response.status_code
+                    ),
+                )
+            except Exception as e:
+                # Np. RG utworzona równolegle w innym regionie - nadal nadaje się do cleanupu
+                if not resource_client.resource_groups.check_existence(resource_group_name):
+                    raise
+                logger.info(
+                    "[_create_resource_group_for_group] Resource Group '%s' "
+                    "already exists (%s)",
+                    resource_group_name, e
+                )
+                rg, status_code = None, None
+            RESOURCE_GROUP_CACHE.set(resource_group_name, True)
             
-            logger.info(
-                f"[_create_resource_group_for_group] Created Resource Group '{resource_group_name}' "
-                f"with tag Group={normalized_group_name}"
-            )
-            return resource_group_name
+            if rg is not None:
+                provisioning_state = rg.properties.provisioning_state if rg.properties else None
+                logger.info(
+                    "[_create_resource_group_for_group] Resource Group '%s' "
+                    "with tag Group=%s is %s",
+                    resource_group_name, normalized_group_name, provisioning_state
+                )
+            return resource_group_name, status_code == 201
             
         except Exception as e:
             logger.error(
-                f"[_create_resource_group_for_group] Error creating Resource Group: {e}",
-                exc_info=True
+                "[_create_resource_group_for_group] Error creating Resource Group: %s",
+                e, exc_info=True
             )
-            return None
+            return None, False
 
     def delete_group(self, group_id: str) -> None:
         """Deletes group by id. Treats 404 (not found) as success."""
@@ -132,12 +253,15 @@ class AzureGroupManager:
         """
         Finds group by displayName.
         
-        Normalizes name before searching. Returns group data if exactly one found,
-        None if zero or multiple matches.
+        Normalizes name before searching. Returns group data (id, displayName)
+        if exactly one found, None if zero or multiple matches.
         """
         normalized_name = normalize_name(name)
+        # Apostrof w literale OData zapisuje się podwójnie (np. O'Brien -> 'O''Brien')
+        escaped_name = normalized_name.replace("'", "''")
         params = {
-            "$filter": f"displayName eq '{normalized_name}'",
+            "$filter": f"displayName eq '{escaped_name}'",
+            "$select": "id,displayName",
         }
         resp = self._graph.get("/groups", params=params)
         resp.raise_for_status()
@@ -153,71 +277,16 @@ class AzureGroupManager:
         user_id: str,
         retries: int = 5,
         initial_delay: float = 3.0,
+        deadline: Optional[float] = None,
     ) -> None:
         """
         Adds user to group with retry mechanism.
         
         Handles 404 (replication), 429 (rate limit), 5xx (server errors).
-        Uses exponential backoff with max delay 30s.
+        Uses jittered backoff (or Retry-After) with max delay 30s.
+        Stops retrying when the next wait would pass `deadline` (time.monotonic() value).
         """
-        ref = {
-            "@odata.id": f"https://graph.microsoft.com/v1.0/directoryObjects/{user_id}"
-        }
-
-        last_resp = None
-        last_status = None
-
-        for attempt in range(1, retries + 1):
-            resp = self._graph.post(f"/groups/{group_id}/members/$ref", json=ref)
-            status = resp.status_code
-
-            if status in (204, 201):
-                # Dodano pomyślnie
-                if attempt > 1:
-                    logger.info(
-                        f"[add_member] Successfully added member after {attempt} attempts "
-                        f"(group_id={group_id}, user_id={user_id})"
-                    )
-                return
-
-            if status in (404, 429) or (500 <= status < 600):
-                last_resp = resp
-                last_status = status
-                
-                delay = min(initial_delay * (2 ** (attempt - 1)), 30.0)
-                
-                error_type = {
-                    404: "ResourceNotFound (replication delay)",
-                    429: "Too Many Requests (rate limit)",
-                }.get(status, f"Server error ({status})")
-                
-                logger.warning(
-                    f"[add_member] {error_type} dla group_id={group_id}, user_id={user_id} "
-                    f"(attempt {attempt}/{retries}) – czekam {delay:.1f}s..."
-                )
-                
-                if attempt < retries:
-                    time.sleep(delay)
-                    continue
-            else:
-                # Inne błędy (np. 400, 403) - nie retry, od razu błąd
-                logger.error(
-                    f"[add_member] ERROR adding member: status={status}, "
-                    f"group_id={group_id}, user_id={user_id}, body={resp.text}"
-                )
-                resp.raise_for_status()
-                return
-
-        if last_resp is not None:
-            logger.error(
-                f"[add_member] FAILED po {retries} próbach. "
-                f"Ostatni status: {last_status}, group_id={group_id}, user_id={user_id}"
-            )
-            try:
-                logger.error(f"[add_member] Response body: {last_resp.json()}")
-            except Exception:
-                logger.error(f"[add_member] Raw response body: {last_resp.text}")
-            last_resp.raise_for_status()
+        self._add_reference("members", "add_member", group_id, user_id, retries, initial_delay, deadline)
 
     def add_owner(
         self,
@@ -225,30 +294,61 @@ class AzureGroupManager:
         user_id: str,
         retries: int = 5,
         initial_delay: float = 3.0,
+        deadline: Optional[float] = None,
     ) -> None:
         """
         Adds owner to group with retry mechanism.
         
         Handles 404 (replication), 429 (rate limit), 5xx (server errors).
-        Uses exponential backoff with max delay 30s.
+        Uses jittered backoff (or Retry-After) with max delay 30s.
+        Stops retrying when the next wait would pass `deadline` (time.monotonic() value).
         """
-        ref = {
-            "@odata.id": f"https://graph.microsoft.com/v1.0/directoryObjects/{user_id}"
-        }
+        self._add_reference("owners", "add_owner", group_id, user_id, retries, initial_delay, deadline)
+
+    def _add_reference(
+        self,
+        relation: str,
+        log_name: str,
+        group_id: str,
+        user_id: str,
+        retries: int,
+        initial_delay: float,
+        deadline: Optional[float],
+    ) -> None:
+        """
+        POSTs a directory object reference to /groups/{id}/{relation}/$ref with retries.
+        
+        Raises HTTPError on non-retryable status, after the last attempt,
+        or when waiting for the next attempt would exceed `deadline`.
+        """
+        # Endpoint i body są stałe dla wszystkich prób
+        endpoint = f"/groups/{group_id}/{relation}/$ref"
+        ref = {"@odata.id": _DIR_OBJ_PREFIX + user_id}
 
         last_resp = None
         last_status = None
+        delay = 0.0
+        total_delay = 0.0
 
         for attempt in range(1, retries + 1):
-            resp = self._graph.post(f"/groups/{group_id}/owners/$ref", json=ref)
+            # Po 5xx nie wiadomo, czy poprzedni POST nie został wykonany - sprawdzamy zanim wyślemy ponownie
+            if last_status is not None and last_status >= 500 and self._has_reference(relation, group_id, user_id):
+                logger.info(
+                    "[%s] Reference already present after server error (group_id=%s, user_id=%s)",
+                    log_name, group_id, user_id
+                )
+                return
+            
+            resp = self._graph.post(endpoint, json=ref)
             status = resp.status_code
 
             if status in (204, 201):
                 # Dodano pomyślnie
                 if attempt > 1:
                     logger.info(
-                        f"[add_owner] Successfully added owner after {attempt} attempts "
-                        f"(group_id={group_id}, user_id={user_id})"
+                        "[%s] Successfully added after %s attempts "
+                        "(group_id=%s, user_id=%s)",
+                        log_name, attempt, group_id, user_id
                     )
                 return
 
@@ -256,175 +356,325 @@ class AzureGroupManager:
                 last_resp = resp
                 last_status = status
                 
-                delay = min(initial_delay * (2 ** (attempt - 1)), 30.0)
+                delay = _next_retry_delay(delay, initial_delay, _retry_after_seconds(resp.headers))
                 
                 error_type = {
                     404: "ResourceNotFound (replication delay)",
                     429: "Too Many Requests (rate limit)",
                 }.get(status, f"Server error ({status})")
                 
+                # Nie blokujemy wątku, jeśli klient RPC i tak nie doczeka wyniku
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    logger.warning(
+                        "[%s] %s dla group_id=%s, user_id=%s "
+                        "(attempt %s/%s) – brak czasu na ponowienie przed deadline RPC",
+                        log_name, error_type, group_id, user_id, attempt, retries
+                    )
+                    break
+                if total_delay + delay > _MAX_TOTAL_RETRY_DELAY:
+                    logger.warning(
+                        "[%s] %s dla group_id=%s, user_id=%s "
+                        "(attempt %s/%s) – przekroczony łączny czas ponowień",
+                        log_name, error_type, group_id, user_id, attempt, retries
+                    )
+                    break
+                
                 logger.warning(
-                    f"[add_owner] {error_type} dla group_id={group_id}, user_id={user_id} "
-                    f"(attempt {attempt}/{retries}) – czekam {delay:.1f}s..."
+                    "[%s] %s dla group_id=%s, user_id=%s "
+                    "(attempt %s/%s) – czekam %.1fs...",
+                    log_name, error_type, group_id, user_id, attempt, retries, delay
                 )
                 
                 if attempt < retries:
                     time.sleep(delay)
+                    total_delay += delay
                     continue
             else:
+                # Inne błędy (np. 400, 403) - nie retry, od razu błąd
                 logger.error(
-                    f"[add_owner] ERROR adding owner: status={status}, "
-                    f"group_id={group_id}, user_id={user_id}, body={resp.text}"
+                    "[%s] ERROR adding %s: status=%s, "
+                    "group_id=%s, user_id=%s, body=%s",
+                    log_name, relation[:-1], status, group_id, user_id, resp.text
                 )
                 resp.raise_for_status()
                 return
 
         if last_resp is not None:
             logger.error(
-                f"[add_owner] FAILED po {retries} próbach. "
-                f"Ostatni status: {last_status}, group_id={group_id}, user_id={user_id}"
+                "[%s] FAILED po %s próbach. "
+                "Ostatni status: %s, group_id=%s, user_id=%s",
+                log_name, attempt, last_status, group_id, user_id
             )
-            try:
-                logger.error(f"[add_owner] Response body: {last_resp.json()}")
-            except Exception:
-                logger.error(f"[add_owner] Raw response body: {last_resp.text}")
+            # Dekodowanie JSON tylko, gdy log zostanie faktycznie wypisany
+            if logger.isEnabledFor(logging.ERROR):
+                try:
+                    logger.error("[%s] Response body: %s", log_name, last_resp.json())
+                except Exception:
+                    logger.error("[%s] Raw response body: %s", log_name, last_resp.text)
             last_resp.raise_for_status()
 
+    def _has_reference(self, relation: str, group_id: str, user_id: str) -> bool:
+        """Returns True if user is already in /groups/{id}/{relation} (False if unknown)."""
+        try:
+            resp = self._graph.get(f"/groups/{group_id}/{relation}/{user_id}", params={"$select": "id"})
+            return resp.status_code == 200
+        except Exception:
+            return False
+
+    def add_members_bulk(
+        self,
+        group_id: str,
+        user_ids: List[str],
+        max_rounds: int = 3,
+        initial_delay: float = 3.0,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, str]:
+        """
+        Adds many users to a group using Graph $batch (20 additions per request).
+        
+        Users that already are members are reported with ALREADY_MEMBER. Sub-requests failing with
+        404 (replication), 429 or 5xx are retried in the next round with backoff
+        (or after Retry-After of throttled sub-requests); no new round is started if its wait would pass `deadline`.
+        
+        Returns:
+            Dict user_id -> error description (or ALREADY_MEMBER) for users that were not added.
+        """
+        pending = list(dict.fromkeys(user_ids))
+        failed: Dict[str, str] = {}
+        delay = 0.0
+        retry_after: Optional[float] = None
+        
+        for round_no in range(1, max_rounds + 1):
+            if not pending:
+                break
+            if round_no > 1:
+                delay = _next_retry_delay(delay, initial_delay, retry_after)
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    logger.warning(
+                        "[add_members_bulk] %s member(s) not added, "
+                        "no time left before RPC deadline (round %s/%s)",
+                        len(pending), round_no, max_rounds
+                    )
+                    break
+                logger.warning(
+                    "[add_members_bulk] %s member(s) not added yet, "
+                    "retrying in %.1fs (round %s/%s)",
+                    len(pending), delay, round_no, max_rounds
+                )
+                time.sleep(delay)
+            
+            chunks = list(chunked(pending, GRAPH_BATCH_LIMIT))
+            max_workers = min(GRAPH_MAX_WORKERS, len(chunks))
+            retry: List[str] = []
+            retry_after = None
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = executor.map(lambda chunk: self._add_members_chunk(group_id, chunk), chunks)
+                for chunk_result, chunk_retry_after in results:
+                    # Czekamy tyle, ile wymaga najdłuższy Retry-After z throttlowanych pod-żądań
+                    if chunk_retry_after is not None:
+                        retry_after = max(retry_after or 0.0, chunk_retry_after)
+                    for user_id, (retryable, error) in chunk_result.items():
+                        if error is None:
+                            failed.pop(user_id, None)
+                        else:
+                            failed[user_id] = error
+                            if retryable:
+                                retry.append(user_id)
+            pending = retry
+        
+        already = sum(1 for error in failed.values() if error == ALREADY_MEMBER)
+        added = len(set(user_ids)) - len(failed)
+        logger.info(
+            "[add_members_bulk] Added %s member(s) to group %s, %s already member(s), %s failed",
+            added, group_id, already, len(failed) - already
+        )
+        return failed
+
+    def _add_members_chunk(
+        self, group_id: str, user_ids: List[str]
+    ) -> Tuple[Dict[str, Tuple[bool, Optional[str]]], Optional[float]]:
+        """
+        Sends one $batch adding up to 20 members.
+        
+        Returns tuple (mapping user_id -> (retryable, error), longest Retry-After
+        of throttled sub-requests or None); error is None on success and
+        ALREADY_MEMBER for existing members.
+        """
+        members_ref = f"/groups/{group_id}/members/$ref"
+        sub_requests = [
+            {
+                "id": str(i),
+                "method": "POST",
+                "url": members_ref,
+                "body": {"@odata.id": _DIR_OBJ_PREFIX + user_id},
+                "headers": {"Content-Type": "application/json"},
+            }
+            for i, user_id in enumerate(user_ids)
+        ]
+        
+        try:
+            responses = post_batch(self._graph, sub_requests)
+        except Exception as e:
+            logger.warning("[add_members_bulk] Batch request failed: %s", e)
+            return {user_id: (True, str(e)) for user_id in user_ids}, None
+        
+        result = {}
+        retry_after = None
+        for i, user_id in enumerate(user_ids):
+            sub = responses.get(str(i), {})
+            status = sub.get("status")
+            sub_retry_after = _retry_after_seconds(sub.get("headers"))
+            if sub_retry_after is not None:
+                retry_after = max(retry_after or 0.0, sub_retry_after)
+            error = ((sub.get("body") or {}).get("error") or {}).get("message", "")
+            
+            if status in (200, 201, 204):
+                result[user_id] = (False, None)
+            elif status == 400 and "already exist" in error.lower():
+                # Użytkownik jest już członkiem grupy - bez ponawiania, zgłaszany osobno
+                result[user_id] = (False, ALREADY_MEMBER)
+            elif status is None or status in (404, 429) or 500 <= status < 600:
+                result[user_id] = (True, f"status={status} {error}".strip())
+            else:
+                result[user_id] = (False, f"status={status} {error}".strip())
+        return result, retry_after
+
     def remove_member(self, group_id: str, user_id: str) -> None:
         """Removes user from group. Treats 404 (not found) as success."""
         resp = self._graph.delete(f"/groups/{group_id}/members/{user_id}/$ref")
         if resp.status_code not in (204, 404):
             resp.raise_for_status()
 
-    def list_members(self, group_id: str) -> List[Dict]:
+    def list_members_iter(self, group_id: str, path_suffix: str = "", prefetch: bool = False) -> Iterator[Dict]:
         """
-        Returns list of group members (each element is dict with directoryObject data).
+        Yields group members page by page, following @odata.nextLink.
         
-        Note: pagination (@odata.nextLink) not implemented for large groups.
+        `path_suffix` allows type-cast endpoints, e.g. "/microsoft.graph.user".
+        By default the next page is fetched only when the consumer gets there;
+        with `prefetch=True` it is requested in the background while the
+        consumer processes the current page.
         """
-        members: List[Dict] = []
-
+        # $top=999 to maksymalny rozmiar strony - mniej round-tripów dla dużych grup
         params = {
-            "$select": "id,userPrincipalName"
+            "$select": "id,userPrincipalName",
+            "$top": 999,
         }
-        resp = self._graph.get(f"/groups/{group_id}/members", params=params)
+        endpoint_path = f"/groups/{group_id}/members{path_suffix}"
+        
+        if not prefetch:
+            while endpoint_path:
+                page_members, endpoint_path = self._get_page(endpoint_path, params)
+                params = None
+                yield from page_members
+            return
+        
+        # Pipeline o głębokości 2: żądanie następnej strony leci, zanim konsument przetworzy bieżącą
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self._get_page, endpoint_path, params)
+            while future:
+                page_members, next_path = future.result()
+                future = executor.submit(self._get_page, next_path, None) if next_path else None
+                yield from page_members
+    
+    def _get_page(self, endpoint_path: str, params: Optional[Dict]) -> Tuple[List[Dict], Optional[str]]:
+        """Fetches one page of a Graph collection; returns (items, relative path of next page or None)."""
+        resp = self._graph.get(endpoint_path, params=params)
         resp.raise_for_status()
         data = resp.json()
-        members.extend(data.get("value", []))
-
-        return members
+        page_members = data.get("value", [])
+        
+        next_link = data.get("@odata.nextLink")
+        if next_link and next_link.startswith(_GRAPH_V1_URL):
+            logger.debug("[_get_page] Pagination: Retrieved %d items, more pages available", len(page_members))
+            return page_members, next_link.replace(_GRAPH_V1_URL, "")
+        return page_members, None
+    
+    def list_members(self, group_id: str) -> List[Dict]:
+        """Returns list of group members (each element is dict with directoryObject data)."""
+        return list(self.list_members_iter(group_id, prefetch=True))
     
     def list_user_members(self, group_id: str) -> List[Dict]:
         """
-        Returns list of User members only, filtering out other object types.
+        Returns list of User members only (dicts with "id" and "userPrincipalName").
         
-        Uses /groups/{group_id}/members with filtering, or fallback to
-        /members/microsoft.graph.user endpoint.
+        Uses the type-cast /groups/{group_id}/members/microsoft.graph.user endpoint,
+        so other object types are filtered server-side; falls back to listing all
+        members and filtering by @odata.type if Graph rejects the cast.
         """
-        user_members: List[Dict] = []
-        
         try:
-            params = {
-                "$select": "id,userPrincipalName"
-            }
-            
-            all_members = []
-            endpoint_path = f"/groups/{group_id}/members"
-            
-            while endpoint_path:
-                resp = self._graph.get(endpoint_path, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-                page_members = data.get("value", [])
-                all_members.extend(page_members)
-                
-                next_link = data.get("@odata.nextLink")
-                if next_link:
-                    logger.debug(f"[list_user_members] Pagination: Retrieved {len(page_members)} members, more pages available")
-                    if next_link.startswith("https://graph.microsoft.com/v1.0"):
-                        endpoint_path = next_link.replace("https://graph.microsoft.com/v1.0", "")
-                        params = None
-                    else:
-                        endpoint_path = None
-                else:
-                    endpoint_path = None
-            
-            logger.debug(f"[list_user_members] Retrieved {len(all_members)} total members from group {group_id}")
-            
-            for member in all_members:
-                odata_type = member.get("@odata.type", "")
-                if "#microsoft.graph.user" in odata_type:
-                    user_id = member.get("id")
-                    upn = member.get("userPrincipalName", "")
-                    if user_id:
-                        user_members.append({
-                            "id": user_id,
-                            "userPrincipalName": upn
-                        })
-            
-            logger.info(f"[list_user_members] Found {len(user_members)} user members in group {group_id} (from {len(all_members)} total members)")
-            
-        except Exception as e:
+            user_members = [
+                member for member in self.list_members_iter(group_id, "/microsoft.graph.user", prefetch=True)
+                if member.get("id")
+            ]
+            logger.info("[list_user_members] Found %s user members in group %s", len(user_members), group_id)
+            return user_members
+        except requests.HTTPError as e:
             logger.warning(
-                f"[list_user_members] Error getting user members: {e}. "
-                f"Trying alternative endpoint...",
-                exc_info=True
+                "[list_user_members] Error getting user members: %s. "
+                "Trying alternative endpoint...",
+                e, exc_info=True
             )
-            try:
-                params = {
-                    "$select": "id,userPrincipalName"
-                }
-                
-                fallback_users = []
-                endpoint_path = f"/groups/{group_id}/members/microsoft.graph.user"
-                
-                while endpoint_path:
-                    resp = self._graph.get(endpoint_path, params=params)
-                    resp.raise_for_status()
-                    data = resp.json()
-                    page_users = data.get("value", [])
-                    fallback_users.extend(page_users)
-                    
-                    next_link = data.get("@odata.nextLink")
-                    if next_link:
-                        logger.debug(f"[list_user_members] Fallback pagination: Retrieved {len(page_users)} users, more pages available")
-                        if next_link.startswith("https://graph.microsoft.com/v1.0"):
-                            endpoint_path = next_link.replace("https://graph.microsoft.com/v1.0", "")
-                            params = None
-                        else:
-                            endpoint_path = None
-                    else:
-                        endpoint_path = None
-                
-                user_members.extend(fallback_users)
-                logger.info(f"[list_user_members] Fallback endpoint found {len(fallback_users)} users")
-            except Exception as e2:
-                logger.error(
-                    f"[list_user_members] Both methods failed. Last error: {e2}",
-                    exc_info=True
-                )
+        
+        user_members = []
+        total_members = 0
+        try:
+            for member in self.list_members_iter(group_id, prefetch=True):
+                total_members += 1
+                if "#microsoft.graph.user" in member.get("@odata.type", "") and member.get("id"):
+                    user_members.append({
+                        "id": member["id"],
+                        "userPrincipalName": member.get("userPrincipalName", "")
+                    })
+            logger.info(
+                "[list_user_members] Fallback endpoint found %s users "
+                "(from %s total members)",
+                len(user_members), total_members
+            )
+        except Exception as e2:
+            logger.error(
+                "[list_user_members] Both methods failed. Last error: %s",
+                e2, exc_info=True
+            )
+            user_members = []
         
         return user_members
     
     def list_owners(self, group_id: str) -> List[str]:
         """Returns list of user IDs (GUIDs) of group owners."""
-        owners: List[str] = []
+        return [owner["id"] for owner in self._list_user_owners(group_id, "id", "list_owners")]
+    
+    def list_owner_users(self, group_id: str) -> List[Dict]:
+        """
+        Returns user owners of the group with their UPN.
+        
+        Uses the /owners/microsoft.graph.user cast with $select, so callers
+        get userPrincipalName without a separate /users/{id} request per owner.
+        """
+        return [
+            {"id": owner["id"], "userPrincipalName": owner.get("userPrincipalName", "")}
+            for owner in self._list_user_owners(group_id, "id,userPrincipalName", "list_owner_users")
+        ]
+    
+    def _list_user_owners(self, group_id: str, select: str, log_name: str) -> List[Dict]:
+        """
+        Lists user owners through /owners/microsoft.graph.user (all pages, $top=999).
+        
+        Returns only entries with id; empty list on error.
+        """
+        owners: List[Dict] = []
+        params = {"$select": select, "$top": 999}
+        endpoint_path = f"/groups/{group_id}/owners/microsoft.graph.user"
         
         try:
-            resp = self._graph.get(f"/groups/{group_id}/owners")
-            resp.raise_for_status()
-            data = resp.json()
-            
-            for owner in data.get("value", []):
-                if owner.get("objectType") == "User":
-                    owner_id = owner.get("id")
-                    if owner_id:
-                        owners.append(owner_id)
+            while endpoint_path:
+                page, endpoint_path = self._get_page(endpoint_path, params)
+                params = None
+                owners.extend(owner for owner in page if owner.get("id"))
             
-            logger.info(f"[list_owners] Found {len(owners)} owners for group {group_id}")
+            logger.info(f"[{log_name}] Found {len(owners)} user owners for group {group_id}")
             return owners
         except Exception as e:
-            logger.error(f"[list_owners] Error listing owners for group {group_id}: {e}", exc_info=True)
+            logger.error(f"[{log_name}] Error listing owners for group {group_id}: {e}", exc_info=True)
             return []
     
     def remove_owner(self, group_id: str, user_id: str) -> None:
@@ -5,15 +5,44 @@ Azure RBAC role assignment management based on resource type.
 """
 
 import logging
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+import random
+import re
 import uuid
 import time
 
 from azure.mgmt.authorization import AuthorizationManagementClient
 from azure.mgmt.authorization.models import RoleAssignmentCreateParameters
 
-from azure_clients import get_credential, _validate_scope
-from config.settings import AZURE_SUBSCRIPTION_ID
+from azure_clients import get_credential, get_graph_client, _pooled_transport, _validate_scope
+from config.settings import AZURE_SUBSCRIPTION_ID, ARM_MAX_WORKERS, ARM_POOL_MAXSIZE
+from identity.ttl_cache import TTLCache
+
+_MISSING = object()
+# Wbudowane role praktycznie się nie zmieniają; brak roli pamiętany krócej
+_ROLE_DEFINITION_TTL = 24 * 3600.0
+_ROLE_DEFINITION_NOT_FOUND_TTL = 300.0
+# Weryfikacja po PUT: tanie GET-y co pół sekundy zamiast ponawiania całego PUT
+_VERIFY_ATTEMPTS = 6
+_VERIFY_INTERVAL = 0.5
+# Klasyfikacja błędów ARM: kod z SDK, a gdy go brak - jedno przeszukanie komunikatu
+_ASSIGNMENT_EXISTS_CODES = frozenset({"RoleAssignmentExists", "Conflict"})
+_ASSIGNMENT_EXISTS_RE = re.compile(r"RoleAssignmentExists|Conflict|(?i:already exists)")
+_NOT_FOUND_RE = re.compile(r"404|NotFound")
+# Brak grupy w Graph uznawany za trwały dopiero po tylu kolejnych 404 (rozdzielonych backoffem ~3.5 s),
+# bo świeżo utworzona grupa może jeszcze nie być widoczna (replikacja Entra ID)
+_PRINCIPAL_MISSING_PROBES = 4
+
+
+def _error_code(error: Exception) -> Optional[str]:
+    """Returns ARM error code (e.g. 'RoleAssignmentExists') from SDK exception, if present."""
+    return getattr(getattr(error, "error", None), "code", None)
+
+
+def _role_assignment_name(scope: str, principal_id: str, role_definition_id: str) -> str:
+    """Deterministic role assignment name - repeated PUT for the same triple hits the same resource."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{scope}|{principal_id}|{role_definition_id}"))
 
 
 class AzureRBACManager:
@@ -27,59 +56,69 @@ class AzureRBACManager:
     
     RESOURCE_TYPE_ORDER = ["network", "storage", "vm"]
 
+    # Wspólny dla wszystkich instancji: (subscription_id, role_name) -> role definition ID lub None
+    _ROLE_DEFINITION_CACHE = TTLCache(maxsize=64, ttl=_ROLE_DEFINITION_TTL)
+
     def __init__(self, credential=None, subscription_id: Optional[str] = None) -> None:
         cred = credential or get_credential()
         sub_id = subscription_id or AZURE_SUBSCRIPTION_ID
-        self._auth_client = AuthorizationManagementClient(cred, sub_id)
+        # Równoległe usuwanie przypisań (ARM_MAX_WORKERS) nie może czekać na wolne połączenie
+        self._auth_client = AuthorizationManagementClient(
+            cred, sub_id, transport=_pooled_transport(ARM_POOL_MAXSIZE)
+        )
         self._subscription_id = sub_id
+        # Stałe dane klasy - liczone raz zamiast przy każdym RPC
+        self._available_types = frozenset(self.RESOURCE_TYPE_ROLES)
+        self._resource_type_order = tuple(self.RESOURCE_TYPE_ORDER)
+        self._available_types_str = ", ".join(sorted(self.RESOURCE_TYPE_ROLES))
+
+    def prewarm_role_definitions(self) -> None:
+        """Resolves role definition IDs for all RESOURCE_TYPE_ROLES ahead of the first assignment."""
+        # Pierwsze chybienie rozwiązuje wszystkie skonfigurowane role naraz
+        self._get_role_definition_id(next(iter(self.RESOURCE_TYPE_ROLES.values())))
 
     def _get_role_definition_id(self, role_name: str) -> Optional[str]:
         """
         Returns role definition ID for the given role name.
         
         Searches at subscription scope. Returns None if not found or on error.
+        Results are cached per process (errors are not cached); on a cache miss
+        all roles from RESOURCE_TYPE_ROLES are resolved at once, concurrently.
         """
+        cached = self._ROLE_DEFINITION_CACHE.get((self._subscription_id, role_name), _MISSING)
+        if cached is not _MISSING:
+            return cached
+        
+        # Jedna równoległa runda dla wszystkich ról zamiast osobnego wywołania przy każdym typie zasobu
+        # Żądana rola jest pobierana zawsze - inny wątek mógł ją w międzyczasie zapisać do cache,
+        # a wynik i tak musi trafić do `resolved`
+        missing = [role_name] + [
+            name for name in dict.fromkeys(self.RESOURCE_TYPE_ROLES.values())
+            if name != role_name
+            and self._ROLE_DEFINITION_CACHE.get((self._subscription_id, name), _MISSING) is _MISSING
+        ]
+        with ThreadPoolExecutor(max_workers=min(ARM_MAX_WORKERS, len(missing))) as executor:
+            resolved = dict(zip(missing, executor.map(self._fetch_role_definition_id, missing)))
+        return resolved[role_name]
+    
+    def _fetch_role_definition_id(self, role_name: str) -> Optional[str]:
+        """Lists role definition by name at subscription scope and caches the result."""
         try:
             role_definitions = self._auth_client.role_definitions.list(
                 scope=f"/subscriptions/{self._subscription_id}",
                 filter=f"roleName eq '{role_name}'",
             )
-            for role_def in role_definitions:
-                return role_def.id
+            role_definition_id = next((role_def.id for role_def in role_definitions), None)
         except Exception as e:
             logging.warning(f"Could not find role definition for {role_name}: {e}")
-        return None
-    
-    def _find_existing_role_assignment(
-        self,
-        scope: str,
-        principal_id: str,
-        role_definition_id: str,
-    ) -> Optional[object]:
-        """
-        Checks if a role assignment already exists for the given principal and role.
-        
-        Returns RoleAssignment object if found, None otherwise.
-        """
-        try:
-            assignments = self._auth_client.role_assignments.list_for_scope(scope=scope)
-            
-            for assignment in assignments:
-                if (assignment.principal_id == principal_id and 
-                    assignment.role_definition_id == role_definition_id):
-                    logging.info(
-                        f"[_find_existing_role_assignment] Found existing assignment: "
-                        f"name={assignment.name}, scope={scope}, principal_id={principal_id}, "
-                        f"role_definition_id={role_definition_id}"
-                    )
-                    return assignment
-            
-            return None
-        except Exception as e:
-            logging.warning(
-                f"[_find_existing_role_assignment] Error checking for existing assignment: {e}"
-            )
             return None
+        
+        self._ROLE_DEFINITION_CACHE.set(
+            (self._subscription_id, role_name),
+            role_definition_id,
+            ttl=None if role_definition_id else _ROLE_DEFINITION_NOT_FOUND_TTL,
+        )
+        return role_definition_id
     
     def _verify_role_assignment_exists(
         self,
@@ -104,7 +143,7 @@ class AzureRBACManager:
                 return True
             return False
         except Exception as e:
-            if "404" in str(e) or "NotFound" in str(e):
+            if getattr(e, "status_code", None) == 404 or _NOT_FOUND_RE.search(str(e)):
                 logging.warning(
                     f"[_verify_role_assignment_exists] Assignment not found after creation: "
                     f"name={assignment_name}, scope={scope}"
@@ -115,11 +154,26 @@ class AzureRBACManager:
             )
             return False
 
+    def _wait_for_role_assignment(self, scope: str, assignment_name: str) -> bool:
+        """
+        Polls for a freshly created role assignment with short GET intervals.
+        
+        Returns True as soon as the assignment is visible, False after all attempts.
+        """
+        for attempt in range(_VERIFY_ATTEMPTS):
+            if attempt:
+                time.sleep(_VERIFY_INTERVAL)
+            if self._verify_role_assignment_exists(scope, assignment_name):
+                return True
+        return False
+
     def assign_role_to_group(
         self,
         resource_type: str,
         group_id: str,
         scope: Optional[str] = None,
+        verify: bool = False,
+        expect_replication_delay: bool = False,
     ) -> tuple[bool, str]:
         """
         Assigns RBAC role to a group based on resource type.
@@ -128,15 +182,18 @@ class AzureRBACManager:
             resource_type: Resource type (e.g., "vm", "storage", "network")
             group_id: Entra ID group object ID
             scope: Assignment scope (defaults to subscription level)
+            verify: Poll with GET until the assignment is readable (PUT response is trusted otherwise)
+            expect_replication_delay: Group was just created - PrincipalNotFound is retried without
+                checking in Graph whether the group exists (otherwise a group missing from Graph
+                across several retries fails fast)
         
         Returns:
             Tuple (success: bool, reason: str). Returns (True, "") on success.
         """
         if resource_type not in self.RESOURCE_TYPE_ROLES:
-            available_types = ", ".join(sorted(self.RESOURCE_TYPE_ROLES.keys()))
             reason = (
                 f"Unknown resource type: '{resource_type}'. "
-                f"Available resource types: {available_types}"
+                f"Available resource types: {self._available_types_str}"
             )
             logging.warning(f"[assign_role_to_group] {reason}")
             return False, reason
@@ -165,35 +222,23 @@ class AzureRBACManager:
             logging.error(f"[assign_role_to_group] {reason}")
             return False, reason
 
-        existing_assignment = self._find_existing_role_assignment(
-            scope=scope,
-            principal_id=group_id,
-            role_definition_id=role_definition_id,
-        )
-        
-        if existing_assignment:
-            logging.info(
-                f"[assign_role_to_group] Role assignment already exists (idempotent success). "
-                f"scope={scope}, principal_id={group_id}, role_definition_id={role_definition_id}, "
-                f"role_assignment_id={existing_assignment.name}, role_name='{role_name}'"
-            )
-            return True, ""
-        
         role_assignment_params = RoleAssignmentCreateParameters(
             role_definition_id=role_definition_id,
             principal_id=group_id,
             principal_type="Group",
         )
 
-        max_attempts = 5
-        delay_seconds = 5.0
-        assignment_name = None
+        # 6 prób = 5 opóźnień 0.5/1/2/4/8 s: łącznie ~15 s na replikację nowej grupy
+        max_attempts = 6
+        initial_delay = 0.5
+        # Stała nazwa zamiast listowania scope: istniejące przypisanie kończy się 409 (idempotent success)
+        assignment_name = _role_assignment_name(scope, group_id, role_definition_id)
         last_exception = None
+        group_confirmed = expect_replication_delay
+        missing_probes = 0
 
         for attempt in range(1, max_attempts + 1):
             try:
-                assignment_name = str(uuid.uuid4())
-                
                 logging.info(
                     f"[assign_role_to_group] Creating role assignment (attempt {attempt}/{max_attempts}). "
                     f"scope={scope}, principal_id={group_id}, role_definition_id={role_definition_id}, "
@@ -206,7 +251,17 @@ class AzureRBACManager:
                     parameters=role_assignment_params,
                 )
                 
-                verified = self._verify_role_assignment_exists(scope, assignment_name)
+                # PUT jest synchroniczny - zwrócone przypisanie z id oznacza, że zostało zapisane
+                if not verify and getattr(assignment, "id", None):
+                    logging.info(
+                        f"[assign_role_to_group] Successfully assigned role '{role_name}' "
+                        f"to group {group_id} for resource type '{resource_type}' at scope '{scope}'. "
+                        f"role_assignment_id={assignment_name}, role_definition_id={role_definition_id}, "
+                        f"principal_id={group_id}"
+                    )
+                    return True, ""
+                
+                verified = self._wait_for_role_assignment(scope, assignment_name)
                 
                 if verified:
                     logging.info(
@@ -222,7 +277,6 @@ class AzureRBACManager:
                         f"This may be due to propagation delay. assignment_name={assignment_name}, scope={scope}"
                     )
                     if attempt < max_attempts:
-                        time.sleep(2.0)
                         continue
                     else:
                         return True, "Assignment created but verification failed (may be propagation delay)"
@@ -231,9 +285,7 @@ class AzureRBACManager:
                 msg = str(e)
                 last_exception = e
 
-                if ("RoleAssignmentExists" in msg or 
-                    "already exists" in msg.lower() or 
-                    "Conflict" in msg):
+                if _error_code(e) in _ASSIGNMENT_EXISTS_CODES or _ASSIGNMENT_EXISTS_RE.search(msg):
                     logging.info(
                         f"[assign_role_to_group] Assignment already exists (idempotent success). "
                         f"scope={scope}, principal_id={group_id}, role_definition_id={role_definition_id}, "
@@ -241,13 +293,28 @@ class AzureRBACManager:
                     )
                     return True, ""
 
+                if "PrincipalNotFound" in msg and not group_confirmed:
+                    # Grupa nieobecna w Graph mimo kolejnych ponowień to błąd, a nie opóźnienie replikacji
+                    exists = self._group_exists(group_id)
+                    if exists is False:
+                        missing_probes += 1
+                        if missing_probes >= _PRINCIPAL_MISSING_PROBES:
+                            reason = f"Principal does not exist: group {group_id} not found in Entra ID"
+                            logging.error(f"[assign_role_to_group] {reason}")
+                            return False, reason
+                    else:
+                        missing_probes = 0
+                        group_confirmed = exists is True
+
                 if "PrincipalNotFound" in msg and attempt < max_attempts:
+                    # Replikacja zwykle trwa poniżej sekundy - krótki start, wykładniczy wzrost, jitter
+                    delay = min(initial_delay * (2 ** (attempt - 1)), 30.0) + random.uniform(0, 0.5)
                     logging.warning(
                         f"[assign_role_to_group] PrincipalNotFound for group {group_id} "
                         f"when assigning role '{role_name}' (attempt {attempt}/{max_attempts}) – "
-                        f"waiting {delay_seconds}s for replication..."
+                        f"waiting {delay:.1f}s for replication..."
                     )
-                    time.sleep(delay_seconds)
+                    time.sleep(delay)
                     continue
 
                 reason = (
@@ -269,92 +336,141 @@ class AzureRBACManager:
         logging.error(f"[assign_role_to_group] {reason}")
         return False, reason
     
-    def remove_role_assignments_for_group(
-        self,
-        group_id: str,
-        scope: Optional[str] = None,
-    ) -> int:
+    def _group_exists(self, group_id: str) -> Optional[bool]:
         """
-        Removes all role assignments for a group.
+        Checks in Microsoft Graph whether the group exists.
         
-        Returns count of removed assignments.
+        Returns True/False, or None when the check itself failed (caller keeps retrying).
         """
+        try:
+            resp = get_graph_client().get(f"/groups/{group_id}", params={"$select": "id"})
+        except Exception as e:
+            logging.warning(f"[_group_exists] Error checking group {group_id} in Graph: {e}")
+            return None
+        if resp.status_code == 404:
+            return False
+        return True if resp.ok else None
+    
+    def _delete_role_assignment(self, scope: str, assignment, log_prefix: str) -> bool:
+        """
+        Deletes a single role assignment with retry on 429/5xx.
+        
+        Returns True if removed or already gone (404/409), False otherwise.
+        """
+        max_attempts = 3
+        initial_delay = 2.0
+        
+        for attempt in range(1, max_attempts + 1):
+            try:
+                self._auth_client.role_assignments.delete(
+                    scope=scope,
+                    role_assignment_name=assignment.name
+                )
+                logging.info(
+                    f"{log_prefix} Removed role assignment "
+                    f"name={assignment.name}, role_definition_id={assignment.role_definition_id} "
+                    f"for principal {assignment.principal_id} at scope {scope}"
+                )
+                return True
+                
+            except Exception as e:
+                msg = str(e)
+                status_code = getattr(e, 'status_code', None)
+                
+                # 404/409 jako idempotent success (assignment już nie istnieje)
+                if status_code in (404, 409) or "NotFound" in msg or "Conflict" in msg:
+                    logging.info(
+                        f"{log_prefix} Assignment already removed "
+                        f"(idempotent success). name={assignment.name}, principal_id={assignment.principal_id}"
+                    )
+                    return True
+                
+                if (status_code in (429, 500, 502, 503, 504) and attempt < max_attempts):
+                    delay = min(initial_delay * (2 ** (attempt - 1)), 10.0)
+                    logging.warning(
+                        f"{log_prefix} Retryable error (attempt {attempt}/{max_attempts}): "
+                        f"{msg}. Waiting {delay:.1f}s..."
+                    )
+                    time.sleep(delay)
+                    continue
+                
+                # Inne błędy - loguj i przejdź do następnego assignment
+                logging.warning(
+                    f"{log_prefix} Failed to remove assignment "
+                    f"name={assignment.name} for principal {assignment.principal_id}: {msg}"
+                )
+                return False
+        return False
+    
+    def _remove_role_assignments_for_principal(
+        self,
+        principal_id: str,
+        principal_type: str,
+        scope: Optional[str],
+        log_prefix: str,
+    ) -> int:
+        """Removes all role assignments of one principal. Returns count of removed assignments."""
         if scope is None:
             scope = f"/subscriptions/{self._subscription_id}"
         
         try:
             _validate_scope(scope)
         except ValueError as e:
-            logging.error(f"[remove_role_assignments_for_group] Invalid scope: {e}")
+            logging.error(f"{log_prefix} Invalid scope: {e}")
             return 0
         
         removed_count = 0
-        max_attempts = 3
-        initial_delay = 2.0
         
         try:
-            assignments = self._auth_client.role_assignments.list_for_scope(scope=scope)
+            assignments = [
+                assignment
+                for assignment in self._auth_client.role_assignments.list_for_scope(
+                    scope=scope,
+                    filter=f"principalId eq '{principal_id}'",
+                )
+                if assignment.principal_id == principal_id and assignment.principal_type == principal_type
+            ]
             
-            for assignment in assignments:
-                if assignment.principal_id == group_id and assignment.principal_type == "Group":
-                    for attempt in range(1, max_attempts + 1):
-                        try:
-                            self._auth_client.role_assignments.delete(
-                                scope=scope,
-                                role_assignment_name=assignment.name
-                            )
-                            removed_count += 1
-                            logging.info(
-                                f"[remove_role_assignments_for_group] Removed role assignment "
-                                f"name={assignment.name}, role_definition_id={assignment.role_definition_id} "
-                                f"for group {group_id} at scope {scope}"
-                            )
-                            break  # Sukces - wyjdź z retry loop
-                            
-                        except Exception as e:
-                            msg = str(e)
-                            status_code = getattr(e, 'status_code', None)
-                            
-                            # 404/409 jako idempotent success (assignment już nie istnieje)
-                            if status_code in (404, 409) or "NotFound" in msg or "Conflict" in msg:
-                                logging.info(
-                                    f"[remove_role_assignments_for_group] Assignment already removed "
-                                    f"(idempotent success). name={assignment.name}, group_id={group_id}"
-                                )
-                                removed_count += 1
-                                break
-                            
-                            if (status_code in (429, 500, 502, 503, 504) and attempt < max_attempts):
-                                delay = min(initial_delay * (2 ** (attempt - 1)), 10.0)
-                                logging.warning(
-                                    f"[remove_role_assignments_for_group] Retryable error (attempt {attempt}/{max_attempts}): "
-                                    f"{msg}. Waiting {delay:.1f}s..."
-                                )
-                                time.sleep(delay)
-                                continue
-                            
-                            # Inne błędy - loguj i przejdź do następnego assignment
-                            logging.warning(
-                                f"[remove_role_assignments_for_group] Failed to remove assignment "
-                                f"name={assignment.name} for group {group_id}: {msg}"
-                            )
-                            break
+            if assignments:
+                # Każde DELETE to osobny round-trip do ARM - usuwamy równolegle
+                max_workers = min(ARM_MAX_WORKERS, len(assignments))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    removed_count = sum(
+                        executor.map(
+                            lambda assignment: self._delete_role_assignment(scope, assignment, log_prefix),
+                            assignments,
+                        )
+                    )
             
             if removed_count > 0:
                 logging.info(
-                    f"[remove_role_assignments_for_group] Removed {removed_count} role assignment(s) "
-                    f"for group {group_id} at scope {scope}"
+                    f"{log_prefix} Removed {removed_count} role assignment(s) "
+                    f"for {principal_type.lower()} {principal_id} at scope {scope}"
                 )
             
             return removed_count
             
         except Exception as e:
             logging.error(
-                f"[remove_role_assignments_for_group] Error removing role assignments for group {group_id}: {e}",
+                f"{log_prefix} Error removing role assignments for {principal_type.lower()} {principal_id}: {e}",
                 exc_info=True
             )
             return removed_count
     
+    def remove_role_assignments_for_group(
+        self,
+        group_id: str,
+        scope: Optional[str] = None,
+    ) -> int:
+        """
+        Removes all role assignments for a group.
+        
+        Returns count of removed assignments.
+        """
+        return self._remove_role_assignments_for_principal(
+            group_id, "Group", scope, "[remove_role_assignments_for_group]"
+        )
+    
     def remove_role_assignments_for_user(
         self,
         user_id: str,
@@ -365,78 +481,57 @@ class AzureRBACManager:
         
         Returns count of removed assignments.
         """
+        return self._remove_role_assignments_for_principal(
+            user_id, "User", scope, "[remove_role_assignments_for_user]"
+        )
+    
+    def remove_role_assignments_for_users(
+        self,
+        user_ids: Iterable[str],
+        scope: Optional[str] = None,
+    ) -> Dict[str, int]:
+        """
+        Removes all role assignments for many users at once.
+        
+        Lists assignments at the scope once, deleting matching ones in parallel as pages arrive.
+        
+        Returns:
+            Dict user_id -> count of removed assignments.
+        """
+        log_prefix = "[remove_role_assignments_for_users]"
+        removed_counts: Dict[str, int] = dict.fromkeys(user_ids, 0)
+        if not removed_counts:
+            return removed_counts
+        
         if scope is None:
             scope = f"/subscriptions/{self._subscription_id}"
         
         try:
             _validate_scope(scope)
         except ValueError as e:
-            logging.error(f"[remove_role_assignments_for_user] Invalid scope: {e}")
-            return 0
-        
-        removed_count = 0
-        max_attempts = 3
-        initial_delay = 2.0
+            logging.error(f"{log_prefix} Invalid scope: {e}")
+            return removed_counts
         
-        try:
-            assignments = self._auth_client.role_assignments.list_for_scope(scope=scope)
-            
-            for assignment in assignments:
-                if assignment.principal_id == user_id and assignment.principal_type == "User":
-                    for attempt in range(1, max_attempts + 1):
-                        try:
-                            self._auth_client.role_assignments.delete(
-                                scope=scope,
-                                role_assignment_name=assignment.name
-                            )
-                            removed_count += 1
-                            logging.info(
-                                f"[remove_role_assignments_for_user] Removed role assignment "
-                                f"name={assignment.name}, role_definition_id={assignment.role_definition_id} "
-                                f"for user {user_id} at scope {scope}"
-                            )
-                            break  # Sukces - wyjdź z retry loop
-                            
-                        except Exception as e:
-                            msg = str(e)
-                            status_code = getattr(e, 'status_code', None)
-                            
-                            # 404/409 jako idempotent success (assignment już nie istnieje)
-                            if status_code in (404, 409) or "NotFound" in msg or "Conflict" in msg:
-                                logging.info(
-                                    f"[remove_role_assignments_for_user] Assignment already removed "
-                                    f"(idempotent success). name={assignment.name}, user_id={user_id}"
-                                )
-                                removed_count += 1
-                                break
-                            
-                            if (status_code in (429, 500, 502, 503, 504) and attempt < max_attempts):
-                                delay = min(initial_delay * (2 ** (attempt - 1)), 10.0)
-                                logging.warning(
-                                    f"[remove_role_assignments_for_user] Retryable error (attempt {attempt}/{max_attempts}): "
-                                    f"{msg}. Waiting {delay:.1f}s..."
-                                )
-                                time.sleep(delay)
-                                continue
-                            
-                            # Inne błędy - loguj i przejdź do następnego assignment
-                            logging.warning(
-                                f"[remove_role_assignments_for_user] Failed to remove assignment "
-                                f"name={assignment.name} for user {user_id}: {msg}"
-                            )
-                            break
-            
-            if removed_count > 0:
-                logging.info(
-                    f"[remove_role_assignments_for_user] Removed {removed_count} role assignment(s) "
-                    f"for user {user_id} at scope {scope}"
+        # Strony listingu pobierane leniwie; pasujące przypisania usuwane już w trakcie listowania
+        with ThreadPoolExecutor(max_workers=ARM_MAX_WORKERS) as executor:
+            futures = {}
+            try:
+                for assignment in self._auth_client.role_assignments.list_for_scope(scope=scope):
+                    if assignment.principal_id in removed_counts and assignment.principal_type == "User":
+                        future = executor.submit(self._delete_role_assignment, scope, assignment, log_prefix)
+                        futures[future] = assignment.principal_id
+            except Exception as e:
+                logging.error(
+                    f"{log_prefix} Error listing role assignments at scope {scope}: {e}",
+                    exc_info=True
                 )
             
-            return removed_count
-            
-        except Exception as e:
-            logging.error(
-                f"[remove_role_assignments_for_user] Error removing role assignments for user {user_id}: {e}",
-                exc_info=True
-            )
-            return removed_count
+            for future, principal_id in futures.items():
+                if future.result():
+                    removed_counts[principal_id] += 1
+        
+        logging.info(
+            f"{log_prefix} Removed {sum(removed_counts.values())} role assignment(s) "
+            f"for {len(removed_counts)} user(s) at scope {scope}"
+        )
+        return removed_counts
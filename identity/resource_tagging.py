@@ -8,9 +8,7 @@ Can be called by users with appropriate roles (e.g. Tag Contributor).
 """
 
 import logging
-from typing import Optional
 
-from azure.mgmt.resource import ResourceManagementClient
 from azure.core.exceptions import HttpResponseError
 
 from azure_clients import get_resource_client
@@ -0,0 +1,10 @@
+# identity/rg_cache.py
+
+"""
+Process-wide cache of Resource Groups (rg-<group>) known to exist.
+"""
+
+from identity.ttl_cache import TTLCache
+
+# Tylko pozytywne wpisy; usunięcie RG musi zdjąć wpis (RESOURCE_GROUP_CACHE.pop)
+RESOURCE_GROUP_CACHE = TTLCache(maxsize=1024, ttl=300.0)
@@ -3,12 +3,16 @@ User management in Microsoft Entra ID using Microsoft Graph API.
 """
 
 import logging
-from typing import Optional
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 from msgraph.core import GraphClient
 
 from azure_clients import get_graph_client
-from config.settings import AZURE_UDOMAIN
+from config.settings import AZURE_UDOMAIN, GRAPH_MAX_WORKERS
+from identity.graph_batch import FILTER_IN_LIMIT, GRAPH_BATCH_LIMIT, chunked, post_batch
 from identity.utils import build_username_with_group_suffix, normalize_name
 
 logger = logging.getLogger(__name__)
@@ -96,6 +100,139 @@ class AzureUserManager:
         if resp.status_code not in (204, 404):
             resp.raise_for_status()
 
+    def find_users(self, logins: List[str]) -> Dict[str, str]:
+        """
+        Looks up many users by login or UPN with as few Graph calls as possible.
+
+        Uses `userPrincipalName in (...)` filters (max 15 values each),
+        sent together in $batch requests (max 20 filters per batch).
+        Logins that could not be checked are simply absent from the result.
+
+        Returns:
+            Dict login -> user id for users that exist.
+        """
+        found: Dict[str, str] = {}
+        login_by_upn = {self._login_to_upn(login).lower(): login for login in logins}
+        upn_chunks = list(chunked(list(login_by_upn), FILTER_IN_LIMIT))
+
+        for batch_no, batch in enumerate(chunked(upn_chunks, GRAPH_BATCH_LIMIT), start=1):
+            requests = []
+            for i, upns in enumerate(batch):
+                values = ",".join("'" + upn.replace("'", "''") + "'" for upn in upns)
+                query = urllib.parse.quote(f"userPrincipalName in ({values})")
+                requests.append({
+                    "id": str(i),
+                    "method": "GET",
+                    "url": f"/users?$filter={query}&$select=id,userPrincipalName",
+                })
+
+            try:
+                responses = post_batch(self._graph, requests)
+            except Exception as e:
+                logger.warning("[find_users] Batch lookup failed (batch %s): %s", batch_no, e)
+                continue
+
+            for sub in responses.values():
+                if sub.get("status") != 200:
+                    logger.warning("[find_users] Lookup sub-request failed: status=%s", sub.get("status"))
+                    continue
+                for user in (sub.get("body") or {}).get("value", []):
+                    login = login_by_upn.get(user.get("userPrincipalName", "").lower())
+                    if login is not None and user.get("id"):
+                        found[login] = user["id"]
+
+        logger.info("[find_users] Found %s existing user(s) out of %s", len(found), len(login_by_upn))
+        return found
+
+    def delete_users(
+        self,
+        users: List[Tuple[str, str]],
+        max_rounds: int = 3,
+    ) -> List[str]:
+        """
+        Deletes users using Graph $batch.
+
+        Each user becomes a single DELETE sub-request, so one POST handles
+        20 users. Deleting a user also removes its group memberships.
+        Batches of a round are sent concurrently; failed sub-requests are
+        re-queued into the next round.
+
+        Args:
+            users: List of (user_id, user_principal_name) tuples
+            max_rounds: Maximum number of batch rounds (retries)
+
+        Returns:
+            List of UPNs that were deleted (or already did not exist).
+        """
+        pending = [user_id for user_id, _ in users]
+        upn_by_id = dict(users)
+        deleted_ids = set()
+
+        for round_no in range(1, max_rounds + 1):
+            if not pending:
+                break
+            if round_no > 1:
+                delay = 2.0 * (round_no - 1)
+                logger.warning(
+                    "[delete_users] %s user(s) not deleted yet, retrying in %ss (round %s/%s)",
+                    len(pending), delay, round_no, max_rounds
+                )
+                time.sleep(delay)
+
+            # Paczki są niezależne - wysyłane równolegle, stan aktualizowany w tym wątku
+            chunks = list(chunked(pending, GRAPH_BATCH_LIMIT))
+            pending = []
+            max_workers = min(GRAPH_MAX_WORKERS, len(chunks))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = executor.map(
+                    lambda chunk: self._delete_users_chunk(chunk, upn_by_id),
+                    chunks,
+                )
+                for chunk_result in results:
+                    for user_id, del_status in chunk_result.items():
+                        upn = upn_by_id[user_id]
+                        if del_status in (204, 404):
+                            deleted_ids.add(user_id)
+                            logger.info("[delete_users] Deleted user '%s'", upn)
+                        else:
+                            pending.append(user_id)
+                            logger.warning(
+                                "[delete_users] Error deleting user %s (round %s/%s): "
+                                "status=%s",
+                                upn, round_no, max_rounds, del_status
+                            )
+
+        for user_id in pending:
+            logger.error("[delete_users] Failed to delete user %s after %s rounds", upn_by_id[user_id], max_rounds)
+
+        return [upn for user_id, upn in users if user_id in deleted_ids]
+
+    def _delete_users_chunk(
+        self,
+        chunk: List[str],
+        upn_by_id: Dict[str, str],
+    ) -> Dict[str, Optional[int]]:
+        """
+        Sends one $batch deleting up to 20 users.
+
+        Returns mapping user_id -> DELETE status (None if the batch itself failed).
+        """
+        requests = [
+            {"id": str(i), "method": "DELETE", "url": f"/users/{upn_by_id[user_id]}"}
+            for i, user_id in enumerate(chunk)
+        ]
+
+        try:
+            responses = post_batch(self._graph, requests)
+        except Exception as e:
+            logger.warning("[delete_users] Batch request failed: %s", e)
+            return {user_id: None for user_id in chunk}
+
+        return {
+            user_id: responses.get(str(i), {}).get("status")
+            for i, user_id in enumerate(chunk)
+        }
+
     def get_user(self, login_or_upn: str) -> Optional[dict]:
         """Retrieves user data as dict, or None if user doesn't exist."""
         upn = self._login_to_upn(login_or_upn)
@@ -5,7 +5,10 @@ Utility functions for name normalization and username formatting.
 Matches AWS adapter behavior for consistency.
 """
 
+from functools import lru_cache
 
+
+@lru_cache(maxsize=4096)
 def normalize_name(name: str) -> str:
     """
     Normalizes group/user names to be Azure AD compatible.
@@ -32,6 +35,7 @@ def normalize_name(name: str) -> str:
     return normalized
 
 
+@lru_cache(maxsize=4096)
 def build_username_with_group_suffix(user_login: str, group_name: str) -> str:
     """
     Builds username with group suffix (matches AWS adapter format).
@@ -44,3 +48,13 @@ def build_username_with_group_suffix(user_login: str, group_name: str) -> str:
     normalized_group = normalize_name(group_name)
     return f"{user_login}-{normalized_group}"
 
+
+@lru_cache(maxsize=4096)
+def build_resource_group_name(group_name: str) -> str:
+    """
+    Builds name of the Resource Group created for a group.
+    
+    Format: rg-{normalized_group_name}
+    Example: "AI 2024L" → "rg-AI-2024L"
+    """
+    return f"rg-{normalize_name(group_name)}"
@@ -1,9 +1,10 @@
 import logging
+import threading
 from concurrent import futures
 
 import grpc
 
-from config.settings import validate_config
+from config.settings import validate_config, GRPC_MAX_WORKERS, GRPC_MAX_CONCURRENT_RPCS
 from identity.user_manager import AzureUserManager
 from identity.group_manager import AzureGroupManager
 from identity.rbac_manager import AzureRBACManager
@@ -124,11 +125,21 @@ def serve():
     """Starts the gRPC server."""
     validate_config()
 
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    pb2_grpc.add_CloudAdapterServicer_to_server(CloudAdapterServicer(), server)
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=GRPC_MAX_WORKERS),
+        maximum_concurrent_rpcs=GRPC_MAX_CONCURRENT_RPCS,
+    )
+    servicer = CloudAdapterServicer()
+    pb2_grpc.add_CloudAdapterServicer_to_server(servicer, server)
     server.add_insecure_port("[::]:50053")
-    logger.info("[AzureAdapter] gRPC server started on port 50053")
+    logger.info(f"[AzureAdapter] gRPC server started on port 50053 (workers: {GRPC_MAX_WORKERS})")
     server.start()
+    # Definicje ról pobierane w tle - pierwsze przypisanie roli nie czeka na ARM, start serwera też nie
+    threading.Thread(
+        target=servicer.rbac_manager.prewarm_role_definitions,
+        name="rbac-prewarm",
+        daemon=True,
+    ).start()
     server.wait_for_termination()
 
 
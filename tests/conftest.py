@@ -0,0 +1,67 @@
+# tests/conftest.py
+
+"""
+Wspólne fixture'y dla testów handlerów gRPC Azure adaptera.
+"""
+
+from unittest.mock import Mock
+
+import pytest
+
+
+@pytest.fixture
+def context():
+    """Kontekst gRPC bez deadline'u (time_remaining() zwraca None)."""
+    context = Mock()
+    context.time_remaining.return_value = None
+    return context
+
+
+@pytest.fixture
+def rbac_manager():
+    """Mock AzureRBACManager z danymi klasy i udanym przypisaniem roli."""
+    rbac_manager = Mock()
+    rbac_manager.RESOURCE_TYPE_ROLES = {
+        "vm": "Virtual Machine Contributor",
+        "storage": "Storage Account Contributor",
+        "network": "Network Contributor",
+    }
+    rbac_manager._available_types = frozenset({"network", "storage", "vm"})
+    rbac_manager._resource_type_order = ("network", "storage", "vm")
+    rbac_manager._available_types_str = "network, storage, vm"
+    rbac_manager.assign_role_to_group.return_value = (True, "")
+    return rbac_manager
+
+
+@pytest.fixture
+def make_identity_handler(rbac_manager):
+    """Fabryka IdentityHandlers z mockami w miejsce niepodanych zależności."""
+    from handlers.identity_handlers import IdentityHandlers
+
+    default_rbac_manager = rbac_manager
+
+    def make(group_manager=None, user_manager=None, rbac_manager=None):
+        return IdentityHandlers(
+            user_manager=user_manager or Mock(),
+            group_manager=group_manager or Mock(),
+            rbac_manager=rbac_manager or default_rbac_manager,
+            resource_finder=Mock(),
+            resource_deleter=Mock(),
+        )
+
+    return make
+
+
+@pytest.fixture
+def make_resource_handler(rbac_manager):
+    """Fabryka ResourceHandlers z mockami w miejsce niepodanych zależności."""
+    from handlers.resource_handlers import ResourceHandlers
+
+    def make(resource_finder=None, resource_deleter=None):
+        return ResourceHandlers(
+            rbac_manager=rbac_manager,
+            resource_finder=resource_finder or Mock(),
+            resource_deleter=resource_deleter or Mock(),
+        )
+
+    return make
@@ -0,0 +1,92 @@
+# tests/test_assign_policies.py
+
+"""
+Testy jednostkowe dla AssignPolicies w Azure adapterze.
+"""
+
+import grpc
+import pytest
+from unittest.mock import Mock
+
+
+class _Aborted(Exception):
+    """Odpowiednik wyjątku rzucanego przez grpc.ServicerContext.abort."""
+
+
+def _abort_context():
+    context = Mock()
+    context.abort.side_effect = _Aborted
+    return context
+
+
+class TestAssignPoliciesValidation:
+    """Testy walidacji żądania AssignPolicies."""
+
+    def test_invalid_resource_type_aborts_with_invalid_argument(self, make_identity_handler):
+        """Test że nieznany typ zasobu kończy RPC statusem INVALID_ARGUMENT (a nie INTERNAL)."""
+        from protos import adapter_interface_pb2 as pb2
+
+        handler = make_identity_handler()
+        context = _abort_context()
+        request = pb2.AssignPoliciesRequest(resourceTypes=["compute"], groupName="test-group")
+
+        with pytest.raises(_Aborted):
+            handler.assign_policies(request, context)
+
+        context.abort.assert_called_once()
+        code, details = context.abort.call_args.args
+        assert code == grpc.StatusCode.INVALID_ARGUMENT
+        assert "compute" in details
+
+    def test_empty_resource_types_aborts(self, make_identity_handler):
+        """Test że pusta lista typów zasobów kończy RPC statusem INVALID_ARGUMENT."""
+        from protos import adapter_interface_pb2 as pb2
+
+        handler = make_identity_handler()
+        context = _abort_context()
+        request = pb2.AssignPoliciesRequest(groupName="test-group")
+
+        with pytest.raises(_Aborted):
+            handler.assign_policies(request, context)
+
+        assert context.abort.call_args.args[0] == grpc.StatusCode.INVALID_ARGUMENT
+
+
+class TestAssignPoliciesGroupLookup:
+    """Testy rozwiązywania grupy w AssignPolicies."""
+
+    def test_group_resolved_once_for_many_resource_types(self, make_identity_handler):
+        """Test że grupa jest wyszukiwana raz, a rola przypisywana dla każdego typu zasobu."""
+        from protos import adapter_interface_pb2 as pb2
+
+        group_manager = Mock()
+        group_manager.get_group_by_name.return_value = {"id": "group-123"}
+        handler = make_identity_handler(group_manager=group_manager)
+        handler.rbac_manager.assign_role_to_group.return_value = (True, "")
+
+        request = pb2.AssignPoliciesRequest(groupName="test-group", resourceTypes=["vm", "storage", "network"])
+        response = handler.assign_policies(request, _abort_context())
+
+        assert response.success
+        assert response.message == (
+            "Policies assigned successfully: "
+            "network->test-group, storage->test-group, vm->test-group"
+        )
+        group_manager.get_group_by_name.assert_called_once_with("test-group")
+        assert handler.rbac_manager.assign_role_to_group.call_count == 3
+
+    def test_missing_group_fails_without_role_assignments(self, make_identity_handler):
+        """Test że brak grupy zwraca success=False bez wywołań RBAC."""
+        from protos import adapter_interface_pb2 as pb2
+
+        group_manager = Mock()
+        group_manager.get_group_by_name.return_value = None
+        handler = make_identity_handler(group_manager=group_manager)
+
+        request = pb2.AssignPoliciesRequest(groupName="test-group", resourceTypes=["vm", "storage"])
+        response = handler.assign_policies(request, _abort_context())
+
+        assert not response.success
+        assert "Group 'test-group' not found" in response.message
+        group_manager.get_group_by_name.assert_called_once_with("test-group")
+        handler.rbac_manager.assign_role_to_group.assert_not_called()
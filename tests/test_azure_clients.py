@@ -0,0 +1,93 @@
+# tests/test_azure_clients.py
+
+"""
+Testy jednostkowe dla fabryki klientów Azure.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
+
+from azure.identity import ClientSecretCredential
+from msgraph.core import GraphClient
+
+from azure_clients import (
+    _GraphConcurrencyLimiter,
+    _limit_graph_concurrency,
+    _pooled_transport,
+    _resize_graph_pool,
+)
+
+
+class TestGraphConnectionPool:
+    """Testy rozmiaru puli połączeń klienta Graph."""
+
+    def test_resize_graph_pool_sets_maxsize_on_sending_middleware(self):
+        """Test że pula połączeń ostatniego middleware (wysyłającego żądania) ma zadany rozmiar."""
+        credential = ClientSecretCredential(
+            tenant_id="00000000-0000-0000-0000-000000000000",
+            client_id="client-id",
+            client_secret="secret",
+        )
+        client = GraphClient(credential=credential, scopes=["https://graph.microsoft.com/.default"])
+
+        _resize_graph_pool(client, 48)
+
+        middleware = client.graph_session.get_adapter("https://graph.microsoft.com")._first_middleware
+        while middleware.next is not None:
+            middleware = middleware.next
+        assert middleware._pool_maxsize == 48
+        assert middleware.poolmanager.connection_pool_kw["maxsize"] == 48
+
+
+class TestArmConnectionPool:
+    """Testy puli połączeń transportu klientów ARM."""
+
+    def test_pooled_transport_uses_enlarged_https_pool(self):
+        """Test że transport ARM korzysta z sesji z powiększoną pulą połączeń HTTPS."""
+        transport = _pooled_transport(40)
+
+        adapter = transport.session.get_adapter("https://management.azure.com")
+        assert adapter._pool_maxsize == 40
+        assert transport._session_owner is False
+
+
+class TestGraphConcurrencyLimit:
+    """Testy limitu jednoczesnych żądań do Graph API."""
+
+    def test_limiter_is_last_middleware(self):
+        """Test że limiter jest ostatnim middleware (obejmuje tylko wywołanie sieciowe)."""
+        credential = ClientSecretCredential(
+            tenant_id="00000000-0000-0000-0000-000000000000",
+            client_id="client-id",
+            client_secret="secret",
+        )
+        client = GraphClient(credential=credential, scopes=["https://graph.microsoft.com/.default"])
+
+        _limit_graph_concurrency(client, 4)
+
+        middleware = client.graph_session.get_adapter("https://graph.microsoft.com")._first_middleware
+        while middleware.next is not None:
+            middleware = middleware.next
+        assert isinstance(middleware, _GraphConcurrencyLimiter)
+
+    def test_limiter_caps_requests_in_flight(self):
+        """Test że liczba równoległych wywołań sieciowych nie przekracza limitu."""
+        limiter = _GraphConcurrencyLimiter(2)
+        lock = threading.Lock()
+        state = {"current": 0, "peak": 0}
+
+        def fake_send(self, request, **kwargs):
+            with lock:
+                state["current"] += 1
+                state["peak"] = max(state["peak"], state["current"])
+            time.sleep(0.02)
+            with lock:
+                state["current"] -= 1
+
+        with patch("requests.adapters.HTTPAdapter.send", fake_send):
+            with ThreadPoolExecutor(max_workers=6) as executor:
+                list(executor.map(lambda _: limiter.send(Mock()), range(12)))
+
+        assert state["peak"] == 2
@@ -0,0 +1,144 @@
+# tests/test_create_group_with_leaders.py
+
+"""
+Testy jednostkowe dla CreateGroupWithLeaders w Azure adapterze.
+"""
+
+import threading
+from unittest.mock import Mock
+
+import grpc
+
+
+def _make_request(leaders):
+    from protos import adapter_interface_pb2 as pb2
+
+    request = pb2.CreateGroupWithLeadersRequest()
+    request.groupName = "test-group"
+    request.resourceTypes.append("vm")
+    request.leaders.extend(leaders)
+    return request
+
+
+class TestCreateGroupWithLeaders:
+    """Testy tworzenia grupy razem z liderami."""
+
+    def test_provisions_all_leaders(self, make_identity_handler, context):
+        """Test że każdy lider jest tworzony, dodawany jako członek i owner."""
+        group_manager = Mock()
+        group_manager.create_group.return_value = ("group-123", "rg-test-group")
+
+        user_manager = Mock()
+        user_manager.create_user.side_effect = lambda login, display_name, group_name: f"id-{login}"
+
+        handler = make_identity_handler(group_manager, user_manager)
+
+        response = handler.create_group_with_leaders(_make_request(["alice", "bob", "carol"]), context)
+
+        assert response.groupName == "test-group"
+        context.set_code.assert_not_called()
+        member_ids = {c.args[1] for c in group_manager.add_member.call_args_list}
+        owner_ids = {c.args[1] for c in group_manager.add_owner.call_args_list}
+        assert member_ids == owner_ids == {"id-alice", "id-bob", "id-carol"}
+        group_manager.delete_group.assert_not_called()
+
+    def test_adds_member_and_owner_concurrently(self, make_identity_handler, context):
+        """Test że add_member i add_owner lidera są wykonywane równolegle."""
+        owner_started = threading.Event()
+
+        group_manager = Mock()
+        group_manager.create_group.return_value = ("group-123", "rg-test-group")
+        group_manager.add_owner.side_effect = lambda group_id, user_id, **kwargs: owner_started.set()
+
+        def add_member(group_id, user_id, **kwargs):
+            if not owner_started.wait(timeout=2):
+                raise Exception("add_owner did not run concurrently")
+
+        group_manager.add_member.side_effect = add_member
+
+        user_manager = Mock()
+        user_manager.create_user.return_value = "id-alice"
+
+        handler = make_identity_handler(group_manager, user_manager)
+
+        handler.create_group_with_leaders(_make_request(["alice"]), context)
+
+        context.set_code.assert_not_called()
+        group_manager.delete_group.assert_not_called()
+
+    def test_assigns_role_while_leaders_are_provisioned(self, make_identity_handler, context):
+        """Test że przypisanie roli RBAC nie blokuje tworzenia liderów."""
+        leader_created = threading.Event()
+
+        group_manager = Mock()
+        group_manager.create_group.return_value = ("group-123", "rg-test-group")
+
+        user_manager = Mock()
+
+        def create_user(login, display_name, group_name):
+            leader_created.set()
+            return f"id-{login}"
+
+        user_manager.create_user.side_effect = create_user
+
+        # Przy wykonaniu sekwencyjnym lider powstałby dopiero po zakończeniu przypisania
+        leader_seen_during_assignment = []
+
+        def assign_role_to_group(resource_type, group_id, **kwargs):
+            leader_seen_during_assignment.append(leader_created.wait(timeout=2))
+            return True, ""
+
+        handler = make_identity_handler(group_manager, user_manager)
+        handler.rbac_manager.assign_role_to_group.side_effect = assign_role_to_group
+
+        handler.create_group_with_leaders(_make_request(["alice"]), context)
+
+        context.set_code.assert_not_called()
+        assert leader_seen_during_assignment == [True]
+
+    def test_rolls_back_created_leaders_and_group_on_failure(self, make_identity_handler, context):
+        """Test że błąd add_member wycofuje wszystkich utworzonych liderów oraz grupę."""
+        group_manager = Mock()
+        group_manager.create_group.return_value = ("group-123", "rg-test-group")
+
+        def add_member(group_id, user_id, **kwargs):
+            if user_id == "id-bad":
+                raise Exception("Graph error")
+
+        group_manager.add_member.side_effect = add_member
+
+        user_manager = Mock()
+        user_manager.create_user.side_effect = lambda login, display_name, group_name: f"id-{login}"
+
+        handler = make_identity_handler(group_manager, user_manager)
+
+        handler.create_group_with_leaders(_make_request(["alice", "bad"]), context)
+
+        context.set_code.assert_called_once_with(grpc.StatusCode.INTERNAL)
+        created = {c.kwargs["login"] for c in user_manager.create_user.call_args_list}
+        deleted = {c.args[0] for c in user_manager.delete_user.call_args_list}
+        assert deleted == {f"{login}-test-group" for login in created}
+        assert "bad-test-group" in deleted
+        group_manager.delete_group.assert_called_once_with("group-123")
+
+    def test_created_group_is_cached_for_following_rpcs(self, make_identity_handler, context):
+        """Test że po utworzeniu grupy CreateUsersForGroup nie szuka jej ponownie w Graph."""
+        from protos import adapter_interface_pb2 as pb2
+
+        group_manager = Mock()
+        group_manager.create_group.return_value = ("group-123", "rg-test-group")
+        group_manager.list_members_iter.return_value = iter([])
+        group_manager.add_members_bulk.return_value = {}
+
+        user_manager = Mock()
+        user_manager.create_user.side_effect = lambda login, display_name, group_name: f"id-{login}"
+        user_manager.find_users.return_value = {}
+
+        handler = make_identity_handler(group_manager, user_manager)
+        handler.create_group_with_leaders(_make_request(["alice"]), context)
+        handler.create_users_for_group(
+            pb2.CreateUsersForGroupRequest(groupName="test-group", users=["bob"]), context
+        )
+
+        group_manager.get_group_by_name.assert_not_called()
+        assert group_manager.add_members_bulk.call_args.args[0] == "group-123"
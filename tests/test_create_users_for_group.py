@@ -0,0 +1,157 @@
+# tests/test_create_users_for_group.py
+
+"""
+Testy jednostkowe dla CreateUsersForGroup w Azure adapterze.
+"""
+
+from unittest.mock import Mock, patch
+
+import grpc
+
+
+class TestCreateUsersForGroup:
+    """Testy tworzenia użytkowników i dodawania ich do grupy."""
+
+    def test_provisions_all_users_and_tolerates_partial_failures(self, make_identity_handler, context):
+        """Test że błąd jednego użytkownika nie przerywa tworzenia pozostałych."""
+        from protos import adapter_interface_pb2 as pb2
+
+        group_manager = Mock()
+        group_manager.get_group_by_name.return_value = {"id": "group-123"}
+        group_manager.list_members_iter.return_value = iter([])
+
+        group_manager.add_members_bulk.return_value = {"id-dup": "status=403 Insufficient privileges"}
+
+        user_manager = Mock()
+        user_manager.find_users.return_value = {}
+
+        def create_user(login, display_name, group_name):
+            if login == "bad":
+                raise Exception("Graph error")
+            return f"id-{login}"
+
+        user_manager.create_user.side_effect = create_user
+
+        handler = make_identity_handler(group_manager, user_manager)
+        request = pb2.CreateUsersForGroupRequest(
+            groupName="test-group",
+            users=["alice", "bad", "dup", "bob", "alice"],
+        )
+
+        response = handler.create_users_for_group(request, context)
+
+        assert response.message == "Users successfully added"
+        assert user_manager.create_user.call_count == 4
+        group_manager.add_members_bulk.assert_called_once()
+        assert set(group_manager.add_members_bulk.call_args.args[1]) == {"id-alice", "id-dup", "id-bob"}
+        group_manager.add_member.assert_not_called()
+
+    def test_reuses_existing_users_without_create(self, make_identity_handler, context):
+        """Test że istniejące konta (wykryte hurtowo) nie są tworzone ponownie."""
+        from protos import adapter_interface_pb2 as pb2
+
+        group_manager = Mock()
+        group_manager.get_group_by_name.return_value = {"id": "group-123"}
+        group_manager.list_members_iter.return_value = iter([])
+        group_manager.add_members_bulk.return_value = {}
+
+        user_manager = Mock()
+        user_manager.find_users.return_value = {"alice-test-group": "id-alice"}
+        user_manager.create_user.return_value = "id-bob"
+
+        handler = make_identity_handler(group_manager, user_manager)
+        request = pb2.CreateUsersForGroupRequest(groupName="test-group", users=["alice", "bob"])
+
+        handler.create_users_for_group(request, context)
+
+        user_manager.find_users.assert_called_once_with(["alice-test-group", "bob-test-group"])
+        user_manager.create_user.assert_called_once()
+        assert user_manager.create_user.call_args.kwargs["login"] == "bob"
+        assert set(group_manager.add_members_bulk.call_args.args[1]) == {"id-alice", "id-bob"}
+
+    def test_skips_users_already_in_group(self, make_identity_handler, context):
+        """Test że obecni członkowie grupy (po UPN) nie są tworzeni ani dodawani ponownie."""
+        from protos import adapter_interface_pb2 as pb2
+
+        group_manager = Mock()
+        group_manager.get_group_by_name.return_value = {"id": "group-123"}
+        group_manager.list_members_iter.return_value = iter([
+            {"@odata.type": "#microsoft.graph.user", "id": "id-alice",
+             "userPrincipalName": "Alice-test-group@example.com"},
+            {"@odata.type": "#microsoft.graph.group", "id": "nested-group"},
+        ])
+        group_manager.add_members_bulk.return_value = {}
+
+        user_manager = Mock()
+        user_manager.find_users.return_value = {}
+        user_manager.create_user.return_value = "id-bob"
+
+        handler = make_identity_handler(group_manager, user_manager)
+        request = pb2.CreateUsersForGroupRequest(groupName="test-group", users=["alice", "bob"])
+
+        handler.create_users_for_group(request, context)
+
+        user_manager.create_user.assert_called_once()
+        group_manager.list_members_iter.assert_called_once_with("group-123", prefetch=True)
+        group_manager.add_members_bulk.assert_called_once_with("group-123", ["id-bob"], deadline=None)
+
+    def test_counts_bulk_already_members_separately(self, make_identity_handler, context, caplog):
+        """Test że użytkownik zgłoszony przez $batch jako członek trafia do already_members."""
+        from identity.group_manager import ALREADY_MEMBER
+        from protos import adapter_interface_pb2 as pb2
+
+        group_manager = Mock()
+        group_manager.get_group_by_name.return_value = {"id": "group-123"}
+        group_manager.list_members_iter.return_value = iter([])
+        group_manager.add_members_bulk.return_value = {"id-bob": ALREADY_MEMBER}
+
+        user_manager = Mock()
+        user_manager.find_users.return_value = {}
+        user_manager.create_user.side_effect = lambda login, display_name, group_name: f"id-{login}"
+
+        handler = make_identity_handler(group_manager, user_manager)
+        request = pb2.CreateUsersForGroupRequest(groupName="test-group", users=["alice", "bob"])
+
+        with caplog.at_level("INFO", logger="handlers.identity_handlers"):
+            handler.create_users_for_group(request, context)
+
+        assert "x-already-members: ['bob']" in caplog.text
+        assert "2 succeeded, 0 failed, 1 already members" in caplog.text
+        assert "Successfully added user bob" not in caplog.text
+
+    def test_group_lookup_retries_with_backoff_until_deadline(self, make_identity_handler):
+        """Test że ponowne próby używają rosnących opóźnień i kończą się przed deadlinem RPC."""
+        from protos import adapter_interface_pb2 as pb2
+
+        group_manager = Mock()
+        group_manager.get_group_by_name.return_value = None
+
+        context = Mock()
+        context.time_remaining.side_effect = [10.0, 10.0, 0.5]
+
+        handler = make_identity_handler(group_manager, Mock())
+        request = pb2.CreateUsersForGroupRequest(groupName="test-group", users=["alice"])
+
+        with patch("handlers.identity_handlers.time.sleep") as mock_sleep:
+            response = handler.create_users_for_group(request, context)
+
+        assert response.message == ""
+        delays = [c.args[0] for c in mock_sleep.call_args_list]
+        assert len(delays) == 2
+        assert 0.25 <= delays[0] < delays[1] <= 0.6
+        assert group_manager.get_group_by_name.call_count == 3
+        context.set_code.assert_called_once_with(grpc.StatusCode.NOT_FOUND)
+
+    def test_retry_get_group_returns_group_after_replication(self, make_identity_handler, context):
+        """Test że _retry_get_group zwraca grupę, gdy pojawi się po replikacji."""
+        group_manager = Mock()
+        group_manager.get_group_by_name.side_effect = [None, {"id": "group-123"}]
+
+        handler = make_identity_handler(group_manager, Mock())
+
+        with patch("handlers.identity_handlers.time.sleep") as mock_sleep:
+            group, attempts = handler._retry_get_group("test-group", "test-group", context)
+
+        assert group == {"id": "group-123"}
+        assert attempts == 3
+        assert mock_sleep.call_count == 2
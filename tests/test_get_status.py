@@ -206,6 +206,22 @@ class TestGetStatus(unittest.TestCase):
             self.assertIsInstance(response, pb2.StatusResponse)
             self.assertFalse(response.isHealthy)
     
+    def test_get_status_caches_healthy_client_check(self):
+        """Test GetStatus does not re-check Azure clients within the cache TTL after a healthy result"""
+        from main import CloudAdapterServicer
+        servicer = CloudAdapterServicer()
+        
+        with patch('azure_clients.get_credential') as mock_get_credential, \
+                patch('azure_clients.get_graph_client'), \
+                patch('azure_clients.get_cost_client'), \
+                patch('cost_monitoring.limit_manager.LimitManager'):
+            first = servicer.GetStatus(self.request, self.context)
+            second = servicer.GetStatus(self.request, self.context)
+        
+        self.assertTrue(first.isHealthy)
+        self.assertTrue(second.isHealthy)
+        self.assertEqual(mock_get_credential.call_count, 1)
+    
     def test_get_status_no_exception_thrown(self):
         """Test GetStatus never throws exceptions to caller (contract requirement)"""
         from main import CloudAdapterServicer
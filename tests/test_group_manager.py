@@ -0,0 +1,451 @@
+# tests/test_group_manager.py
+
+"""
+Testy jednostkowe dla AzureGroupManager.
+"""
+
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from identity.group_manager import AzureGroupManager, ALREADY_MEMBER
+
+
+def _page(members, next_link=None):
+    resp = Mock()
+    resp.raise_for_status.return_value = None
+    data = {"value": members}
+    if next_link:
+        data["@odata.nextLink"] = next_link
+    resp.json.return_value = data
+    return resp
+
+
+class TestListMembersIter:
+    """Testy generatora list_members_iter."""
+
+    def test_follows_next_link_lazily(self):
+        """Test że kolejna strona jest pobierana dopiero po skonsumowaniu poprzedniej."""
+        graph = Mock()
+        graph.get.side_effect = [
+            _page([{"id": "u1"}, {"id": "u2"}],
+                  "https://graph.microsoft.com/v1.0/groups/g1/members?$skiptoken=abc"),
+            _page([{"id": "u3"}]),
+        ]
+        manager = AzureGroupManager(graph_client=graph)
+
+        members = manager.list_members_iter("g1")
+        assert next(members) == {"id": "u1"}
+        assert graph.get.call_count == 1
+
+        assert [m["id"] for m in members] == ["u2", "u3"]
+        assert graph.get.call_count == 2
+        second_call = graph.get.call_args_list[1]
+        assert second_call.args[0] == "/groups/g1/members?$skiptoken=abc"
+        assert second_call.kwargs["params"] is None
+
+    def test_prefetch_requests_next_page_before_current_is_consumed(self):
+        """Test że z prefetch=True następna strona jest pobierana w tle."""
+        graph = Mock()
+        graph.get.side_effect = [
+            _page([{"id": "u1"}, {"id": "u2"}],
+                  "https://graph.microsoft.com/v1.0/groups/g1/members?$skiptoken=abc"),
+            _page([{"id": "u3"}]),
+        ]
+        manager = AzureGroupManager(graph_client=graph)
+
+        members = manager.list_members_iter("g1", prefetch=True)
+        assert next(members) == {"id": "u1"}
+        for _ in range(100):
+            if graph.get.call_count == 2:
+                break
+            time.sleep(0.01)
+        assert graph.get.call_count == 2
+
+        assert [m["id"] for m in members] == ["u2", "u3"]
+        assert graph.get.call_args_list[1].args[0] == "/groups/g1/members?$skiptoken=abc"
+
+    def test_first_page_requests_max_page_size(self):
+        """Test że pierwsze żądanie prosi o maksymalną stronę i tylko potrzebne pola."""
+        graph = Mock()
+        graph.get.return_value = _page([])
+        manager = AzureGroupManager(graph_client=graph)
+
+        list(manager.list_members_iter("g1"))
+
+        assert graph.get.call_args.kwargs["params"] == {"$select": "id,userPrincipalName", "$top": 999}
+
+    def test_list_members_returns_all_pages(self):
+        """Test że list_members zwraca członków ze wszystkich stron."""
+        graph = Mock()
+        graph.get.side_effect = [
+            _page([{"id": "u1"}], "https://graph.microsoft.com/v1.0/groups/g1/members?$skiptoken=abc"),
+            _page([{"id": "u2"}]),
+        ]
+        manager = AzureGroupManager(graph_client=graph)
+
+        assert manager.list_members("g1") == [{"id": "u1"}, {"id": "u2"}]
+
+
+def _status(code):
+    resp = Mock()
+    resp.status_code = code
+    resp.text = ""
+    resp.json.return_value = {}
+    if code >= 400:
+        resp.raise_for_status.side_effect = requests.HTTPError(f"{code} error")
+    return resp
+
+
+class TestAddMemberRetries:
+    """Testy ponowień add_member / add_owner."""
+
+    def test_retries_replication_404_until_success(self):
+        """Test że 404 (replikacja) jest ponawiane, a sukces kończy pętlę."""
+        graph = Mock()
+        graph.post.side_effect = [_status(404), _status(204)]
+        manager = AzureGroupManager(graph_client=graph)
+
+        with patch("identity.group_manager.time.sleep") as mock_sleep:
+            manager.add_owner("g1", "u1")
+
+        assert graph.post.call_count == 2
+        assert graph.post.call_args.args[0] == "/groups/g1/owners/$ref"
+        mock_sleep.assert_called_once_with(3.0)
+
+    def test_checks_membership_before_retrying_after_server_error(self):
+        """Test że po 5xx sprawdzamy członkostwo i nie wysyłamy POST ponownie, jeśli już jest."""
+        graph = Mock()
+        graph.post.return_value = _status(502)
+        graph.get.return_value = _status(200)
+        manager = AzureGroupManager(graph_client=graph)
+
+        with patch("identity.group_manager.time.sleep"):
+            manager.add_member("g1", "u1")
+
+        assert graph.post.call_count == 1
+        graph.get.assert_called_once_with("/groups/g1/members/u1", params={"$select": "id"})
+
+    def test_replication_404_retries_without_membership_check(self):
+        """Test że przy 404 (replikacja) nie ma dodatkowego sprawdzania członkostwa."""
+        graph = Mock()
+        graph.post.side_effect = [_status(404), _status(204)]
+        manager = AzureGroupManager(graph_client=graph)
+
+        with patch("identity.group_manager.time.sleep"):
+            manager.add_member("g1", "u1")
+
+        graph.get.assert_not_called()
+
+    def test_honors_retry_after_on_throttling(self):
+        """Test że przy 429 czekamy tyle, ile wskazuje nagłówek Retry-After."""
+        throttled = _status(429)
+        throttled.headers = {"Retry-After": "7"}
+        graph = Mock()
+        graph.post.side_effect = [throttled, _status(204)]
+        manager = AzureGroupManager(graph_client=graph)
+
+        with patch("identity.group_manager.time.sleep") as mock_sleep:
+            manager.add_member("g1", "u1")
+
+        mock_sleep.assert_called_once_with(7.0)
+
+    def test_honors_retry_after_ms_hint(self):
+        """Test że nagłówek x-ms-retry-after-ms wydłuża czekanie ponad domyślne opóźnienie."""
+        throttled = _status(503)
+        throttled.headers = {"x-ms-retry-after-ms": "4500"}
+        graph = Mock()
+        graph.post.side_effect = [throttled, _status(204)]
+        manager = AzureGroupManager(graph_client=graph)
+
+        with patch("identity.group_manager.time.sleep") as mock_sleep:
+            manager.add_member("g1", "u1")
+
+        mock_sleep.assert_called_once_with(4.5)
+
+    def test_retry_delays_are_jittered_and_capped(self):
+        """Test że kolejne opóźnienia są losowe (decorrelated jitter) i ograniczone łącznym limitem."""
+        graph = Mock()
+        graph.post.return_value = _status(503)
+        manager = AzureGroupManager(graph_client=graph)
+
+        with patch("identity.group_manager.time.sleep") as mock_sleep:
+            with pytest.raises(requests.HTTPError):
+                manager.add_member("g1", "u1", retries=20)
+
+        delays = [c.args[0] for c in mock_sleep.call_args_list]
+        assert delays[0] == 3.0
+        assert all(3.0 <= d <= 30.0 for d in delays)
+        assert sum(delays) <= 60.0
+
+    def test_stops_retrying_when_deadline_is_too_close(self):
+        """Test że brak czasu do deadline RPC przerywa ponowienia bez czekania."""
+        graph = Mock()
+        graph.post.return_value = _status(404)
+        manager = AzureGroupManager(graph_client=graph)
+
+        with patch("identity.group_manager.time.sleep") as mock_sleep:
+            with pytest.raises(requests.HTTPError):
+                manager.add_member("g1", "u1", deadline=time.monotonic() + 1.0)
+
+        assert graph.post.call_count == 1
+        mock_sleep.assert_not_called()
+
+
+def _batch_response(statuses):
+    resp = Mock()
+    resp.raise_for_status.return_value = None
+    resp.json.return_value = {
+        "responses": [
+            {"id": str(i), "status": status, "body": body}
+            for i, (status, body) in enumerate(statuses)
+        ]
+    }
+    return resp
+
+
+class TestAddMembersBulk:
+    """Testy hurtowego dodawania członków przez $batch."""
+
+    def test_adds_members_in_batches_of_twenty(self):
+        """Test że 25 użytkowników jest dodawanych dwoma żądaniami $batch."""
+        graph = Mock()
+        graph.post.side_effect = lambda url, json: _batch_response([(204, None)] * len(json["requests"]))
+        manager = AzureGroupManager(graph_client=graph)
+
+        failures = manager.add_members_bulk("g1", [f"u{i}" for i in range(25)])
+
+        assert failures == {}
+        assert graph.post.call_count == 2
+        sizes = sorted(len(c.kwargs["json"]["requests"]) for c in graph.post.call_args_list)
+        assert sizes == [5, 20]
+        first = graph.post.call_args_list[0].kwargs["json"]["requests"][0]
+        assert first["url"] == "/groups/g1/members/$ref"
+        assert first["body"]["@odata.id"].startswith("https://graph.microsoft.com/v1.0/directoryObjects/u")
+
+    def test_retries_transient_failures_and_tolerates_existing_members(self):
+        """Test że 404 jest ponawiane, a 'already exist' zgłaszane jako ALREADY_MEMBER bez ponawiania."""
+        graph = Mock()
+        already = {"error": {"message": "One or more added object references already exist"}}
+        forbidden = {"error": {"message": "Insufficient privileges"}}
+        graph.post.side_effect = [
+            _batch_response([(204, None), (404, None), (400, already), (403, forbidden)]),
+            _batch_response([(204, None)]),
+        ]
+        manager = AzureGroupManager(graph_client=graph)
+
+        with patch("identity.group_manager.time.sleep") as mock_sleep:
+            failures = manager.add_members_bulk("g1", ["u1", "u2", "u3", "u4"])
+
+        assert set(failures) == {"u3", "u4"}
+        assert failures["u3"] == ALREADY_MEMBER
+        assert "Insufficient privileges" in failures["u4"]
+        retried = graph.post.call_args_list[1].kwargs["json"]["requests"]
+        assert [r["body"]["@odata.id"].rsplit("/", 1)[1] for r in retried] == ["u2"]
+        mock_sleep.assert_called_once_with(3.0)
+
+
+    def test_honors_retry_after_of_throttled_sub_requests(self):
+        """Test że kolejna runda czeka tyle, ile wskazuje Retry-After throttlowanego pod-żądania."""
+        throttled = _batch_response([(204, None), (429, None)])
+        throttled.json.return_value["responses"][1]["headers"] = {"Retry-After": "12"}
+        graph = Mock()
+        graph.post.side_effect = [throttled, _batch_response([(204, None)])]
+        manager = AzureGroupManager(graph_client=graph)
+
+        with patch("identity.group_manager.time.sleep") as mock_sleep:
+            failures = manager.add_members_bulk("g1", ["u1", "u2"])
+
+        assert failures == {}
+        mock_sleep.assert_called_once_with(12.0)
+
+
+class TestCreateGroup:
+    """Testy tworzenia grupy."""
+
+    def test_creates_resource_group_concurrently_with_graph_group(self):
+        """Test że Resource Group jest tworzona równolegle z wywołaniem Graph."""
+        rg_started = threading.Event()
+
+        def post(url, json):
+            assert rg_started.wait(timeout=2), "Resource Group creation did not run concurrently"
+            resp = Mock()
+            resp.raise_for_status.return_value = None
+            resp.json.return_value = {"id": "group-123"}
+            return resp
+
+        graph = Mock()
+        graph.post.side_effect = post
+        manager = AzureGroupManager(graph_client=graph)
+
+        def create_rg(normalized_name):
+            rg_started.set()
+            return f"rg-{normalized_name}", True
+
+        with patch.object(manager, "_create_resource_group_for_group", side_effect=create_rg):
+            assert manager.create_group("AI 2024L") == ("group-123", "rg-AI-2024L")
+
+    def test_skips_resource_group_when_disabled(self):
+        """Test że bez create_resource_group ARM nie jest wywoływany."""
+        graph = Mock()
+        graph.post.return_value.json.return_value = {"id": "group-123"}
+        manager = AzureGroupManager(graph_client=graph)
+
+        with patch.object(manager, "_create_resource_group_for_group") as create_rg:
+            assert manager.create_group("AI 2024L", create_resource_group=False) == ("group-123", None)
+
+        create_rg.assert_not_called()
+
+    def test_deletes_new_resource_group_when_graph_fails(self):
+        """Test że przy błędzie utworzenia grupy w Graph nowo utworzona RG jest usuwana i znika z cache."""
+        from identity.rg_cache import RESOURCE_GROUP_CACHE
+
+        graph = Mock()
+        graph.post.return_value.raise_for_status.side_effect = requests.HTTPError("400 error")
+        manager = AzureGroupManager(graph_client=graph)
+        resource_client = Mock()
+        RESOURCE_GROUP_CACHE.set("rg-AI-2024L", True)
+
+        with patch.object(manager, "_create_resource_group_for_group", return_value=("rg-AI-2024L", True)), \
+                patch("identity.group_manager.get_resource_client", return_value=resource_client):
+            with pytest.raises(requests.HTTPError):
+                manager.create_group("AI 2024L")
+
+        resource_client.resource_groups.begin_delete.assert_called_once_with("rg-AI-2024L")
+        assert RESOURCE_GROUP_CACHE.get("rg-AI-2024L") is None
+
+    def test_keeps_pre_existing_resource_group_when_graph_fails(self):
+        """Test że istniejąca wcześniej RG nie jest usuwana przy błędzie Graph."""
+        graph = Mock()
+        graph.post.return_value.raise_for_status.side_effect = requests.HTTPError("400 error")
+        manager = AzureGroupManager(graph_client=graph)
+        resource_client = Mock()
+
+        with patch.object(manager, "_create_resource_group_for_group", return_value=("rg-AI-2024L", False)), \
+                patch("identity.group_manager.get_resource_client", return_value=resource_client):
+            with pytest.raises(requests.HTTPError):
+                manager.create_group("AI 2024L")
+
+        resource_client.resource_groups.begin_delete.assert_not_called()
+
+
+class TestGetGroupByName:
+    """Testy wyszukiwania grupy po nazwie."""
+
+    def test_escapes_quotes_in_filter(self):
+        """Test że apostrof w nazwie jest escapowany zgodnie z OData."""
+        graph = Mock()
+        graph.get.return_value.json.return_value = {"value": [{"id": "g1", "displayName": "O'Brien-Team"}]}
+        manager = AzureGroupManager(graph_client=graph)
+
+        assert manager.get_group_by_name("O'Brien Team") == {"id": "g1", "displayName": "O'Brien-Team"}
+        params = graph.get.call_args.kwargs["params"]
+        assert params["$filter"] == "displayName eq 'O''Brien-Team'"
+        assert params["$select"] == "id,displayName"
+
+
+class TestResourceGroupCache:
+    """Testy cache istnienia Resource Group."""
+
+    def setup_method(self):
+        from identity.rg_cache import RESOURCE_GROUP_CACHE
+
+        RESOURCE_GROUP_CACHE.clear()
+
+    def test_second_create_skips_arm_calls(self):
+        """Test że po utworzeniu RG kolejne wywołanie nie odpytuje ARM."""
+        from azure.core.exceptions import HttpResponseError
+
+        not_found = HttpResponseError("ResourceGroupNotFound")
+        not_found.status_code = 404
+        resource_client = Mock()
+        resource_client.resource_groups.get.side_effect = not_found
+        resource_client.resource_groups.create_or_update.return_value = (Mock(), 201)
+        manager = AzureGroupManager(graph_client=Mock())
+
+        with patch("identity.group_manager.get_resource_client", return_value=resource_client) as factory:
+            assert manager._create_resource_group_for_group("test-group") == ("rg-test-group", True)
+            assert manager._create_resource_group_for_group("test-group") == ("rg-test-group", False)
+
+        factory.assert_called_once()
+        resource_client.resource_groups.get.assert_called_once_with("rg-test-group")
+        resource_client.resource_groups.create_or_update.assert_called_once()
+
+    def test_existing_resource_group_keeps_its_tags(self):
+        """Test że istniejąca RG (także w innym regionie) zachowuje tagi, a tag Group jest dokładany."""
+        existing = Mock(location="northeurope", tags={"CostCenter": "42"})
+        resource_client = Mock()
+        resource_client.resource_groups.get.return_value = existing
+        manager = AzureGroupManager(graph_client=Mock())
+
+        with patch("identity.group_manager.get_resource_client", return_value=resource_client):
+            assert manager._create_resource_group_for_group("test-group") == ("rg-test-group", False)
+
+        resource_client.resource_groups.create_or_update.assert_called_once_with(
+            "rg-test-group",
+            {"location": "northeurope", "tags": {"CostCenter": "42", "Group": "test-group"}},
+        )
+
+    def test_existing_tagged_resource_group_is_not_updated(self):
+        """Test że RG z poprawnym tagiem Group nie jest ponownie zapisywana."""
+        existing = Mock(location="westeurope", tags={"Group": "test-group"})
+        resource_client = Mock()
+        resource_client.resource_groups.get.return_value = existing
+        manager = AzureGroupManager(graph_client=Mock())
+
+        with patch("identity.group_manager.get_resource_client", return_value=resource_client):
+            assert manager._create_resource_group_for_group("test-group") == ("rg-test-group", False)
+
+        resource_client.resource_groups.create_or_update.assert_not_called()
+
+
+class TestListUserMembers:
+    """Testy list_user_members."""
+
+    def test_uses_type_cast_endpoint_first(self):
+        """Test że użytkownicy są filtrowani po stronie serwera (rzutowanie na microsoft.graph.user)."""
+        graph = Mock()
+        graph.get.return_value = _page([{"id": "u1", "userPrincipalName": "a@example.com"}])
+        manager = AzureGroupManager(graph_client=graph)
+
+        assert manager.list_user_members("g1") == [{"id": "u1", "userPrincipalName": "a@example.com"}]
+        graph.get.assert_called_once()
+        assert graph.get.call_args.args[0] == "/groups/g1/members/microsoft.graph.user"
+
+    def test_falls_back_to_client_side_filter_on_http_error(self):
+        """Test że przy błędzie rzutowania członkowie są filtrowani po @odata.type."""
+        rejected = Mock()
+        rejected.raise_for_status.side_effect = requests.HTTPError("400 error")
+        graph = Mock()
+        graph.get.side_effect = [
+            rejected,
+            _page([
+                {"@odata.type": "#microsoft.graph.user", "id": "u1", "userPrincipalName": "a@example.com"},
+                {"@odata.type": "#microsoft.graph.group", "id": "g2"},
+            ]),
+        ]
+        manager = AzureGroupManager(graph_client=graph)
+
+        assert manager.list_user_members("g1") == [{"id": "u1", "userPrincipalName": "a@example.com"}]
+        assert graph.get.call_args.args[0] == "/groups/g1/members"
+
+
+class TestListOwners:
+    """Testy listowania właścicieli grupy."""
+
+    def test_list_owners_uses_user_cast_and_follows_pages(self):
+        """Test że list_owners zwraca id właścicieli-użytkowników ze wszystkich stron."""
+        graph = Mock()
+        graph.get.side_effect = [
+            _page([{"id": "u1"}], "https://graph.microsoft.com/v1.0/groups/g1/owners/microsoft.graph.user?$skiptoken=abc"),
+            _page([{"id": "u2"}]),
+        ]
+        manager = AzureGroupManager(graph_client=graph)
+
+        assert manager.list_owners("g1") == ["u1", "u2"]
+        first = graph.get.call_args_list[0]
+        assert first.args[0] == "/groups/g1/owners/microsoft.graph.user"
+        assert first.kwargs["params"] == {"$select": "id", "$top": 999}
@@ -12,50 +12,6 @@ from azure.mgmt.authorization.models import RoleAssignment
 class TestRBACIdempotency:
     """Testy idempotency dla RBAC role assignments."""
     
-    @patch('identity.rbac_manager.AuthorizationManagementClient')
-    def test_find_existing_role_assignment_finds_existing(self, mock_auth_client_class):
-        """Test że _find_existing_role_assignment znajduje istniejący assignment."""
-        from identity.rbac_manager import AzureRBACManager
-        
-        # Mock existing assignment
-        mock_assignment = Mock()
-        mock_assignment.principal_id = "group-123"
-        mock_assignment.role_definition_id = "role-def-456"
-        mock_assignment.name = "assignment-789"
-        
-        mock_auth_client = Mock()
-        mock_auth_client.role_assignments.list_for_scope.return_value = [mock_assignment]
-        mock_auth_client_class.return_value = mock_auth_client
-        
-        manager = AzureRBACManager()
-        result = manager._find_existing_role_assignment(
-            scope="/subscriptions/sub-123",
-            principal_id="group-123",
-            role_definition_id="role-def-456"
-        )
-        
-        assert result is not None
-        assert result.name == "assignment-789"
-        mock_auth_client.role_assignments.list_for_scope.assert_called_once()
-    
-    @patch('identity.rbac_manager.AuthorizationManagementClient')
-    def test_find_existing_role_assignment_not_found(self, mock_auth_client_class):
-        """Test że _find_existing_role_assignment zwraca None gdy nie ma assignment."""
-        from identity.rbac_manager import AzureRBACManager
-        
-        mock_auth_client = Mock()
-        mock_auth_client.role_assignments.list_for_scope.return_value = []
-        mock_auth_client_class.return_value = mock_auth_client
-        
-        manager = AzureRBACManager()
-        result = manager._find_existing_role_assignment(
-            scope="/subscriptions/sub-123",
-            principal_id="group-123",
-            role_definition_id="role-def-456"
-        )
-        
-        assert result is None
-    
     @patch('identity.rbac_manager.AuthorizationManagementClient')
     def test_verify_role_assignment_exists_success(self, mock_auth_client_class):
         """Test że _verify_role_assignment_exists zwraca True gdy assignment istnieje."""
@@ -154,3 +110,314 @@ class TestRBACIdempotency:
         )
         
         assert success is True  # Powinno być traktowane jako success
+
+    
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    @patch('identity.rbac_manager.time.sleep')
+    def test_assign_role_to_group_uses_deterministic_name(self, mock_sleep, mock_auth_client_class):
+        """Test że nazwa przypisania jest deterministyczna i nie ma listowania scope przed PUT."""
+        from identity.rbac_manager import AzureRBACManager
+        
+        mock_auth_client = Mock()
+        mock_auth_client.role_definitions.list.return_value = [Mock(id="role-def-456")]
+        mock_auth_client_class.return_value = mock_auth_client
+        
+        manager = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+        assert manager.assign_role_to_group(resource_type="vm", group_id="group-123") == (True, "")
+        assert manager.assign_role_to_group(resource_type="vm", group_id="group-123") == (True, "")
+        
+        mock_auth_client.role_assignments.list_for_scope.assert_not_called()
+        names = [
+            c.kwargs["role_assignment_name"]
+            for c in mock_auth_client.role_assignments.create.call_args_list
+        ]
+        assert len(names) == 2
+        assert names[0] == names[1]
+
+    
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    @patch('identity.rbac_manager.random.uniform', return_value=0.0)
+    @patch('identity.rbac_manager.time.sleep')
+    def test_principal_not_found_backs_off_exponentially(self, mock_sleep, mock_uniform, mock_auth_client_class):
+        """Test że PrincipalNotFound jest ponawiane z wykładniczo rosnącym opóźnieniem."""
+        from identity.rbac_manager import AzureRBACManager
+        
+        mock_auth_client = Mock()
+        mock_auth_client.role_definitions.list.return_value = [Mock(id="role-def-456")]
+        mock_auth_client.role_assignments.create.side_effect = [
+            Exception("PrincipalNotFound"),
+            Exception("PrincipalNotFound"),
+            Exception("PrincipalNotFound"),
+            Mock(),
+        ]
+        mock_auth_client_class.return_value = mock_auth_client
+        
+        manager = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+        assert manager.assign_role_to_group(
+            resource_type="vm", group_id="group-123", expect_replication_delay=True
+        ) == (True, "")
+        
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [0.5, 1.0, 2.0]
+    
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    @patch('identity.rbac_manager.random.uniform', return_value=0.0)
+    @patch('identity.rbac_manager.time.sleep')
+    def test_principal_not_found_waits_full_replication_window(
+        self, mock_sleep, mock_uniform, mock_auth_client_class
+    ):
+        """Test że przy ciągłym PrincipalNotFound wykorzystywane są wszystkie opóźnienia (~15 s)."""
+        from identity.rbac_manager import AzureRBACManager
+        
+        mock_auth_client = Mock()
+        mock_auth_client.role_definitions.list.return_value = [Mock(id="role-def-456")]
+        mock_auth_client.role_assignments.create.side_effect = Exception("PrincipalNotFound")
+        mock_auth_client_class.return_value = mock_auth_client
+        
+        manager = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+        success, _ = manager.assign_role_to_group(
+            resource_type="vm", group_id="group-123", expect_replication_delay=True
+        )
+        
+        assert success is False
+        delays = [c.args[0] for c in mock_sleep.call_args_list]
+        assert delays == [0.5, 1.0, 2.0, 4.0, 8.0]
+        assert sum(delays) >= 15.0
+    
+    @patch('identity.rbac_manager.get_graph_client')
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    @patch('identity.rbac_manager.time.sleep')
+    def test_principal_not_found_fails_fast_for_missing_group(
+        self, mock_sleep, mock_auth_client_class, mock_get_graph_client
+    ):
+        """Test że PrincipalNotFound dla grupy trwale nieobecnej w Graph kończy się przed wyczerpaniem ponowień."""
+        from identity.rbac_manager import AzureRBACManager
+        
+        mock_get_graph_client.return_value.get.return_value = Mock(status_code=404, ok=False)
+        mock_auth_client = Mock()
+        mock_auth_client.role_definitions.list.return_value = [Mock(id="role-def-456")]
+        mock_auth_client.role_assignments.create.side_effect = Exception("PrincipalNotFound")
+        mock_auth_client_class.return_value = mock_auth_client
+        
+        manager = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+        success, reason = manager.assign_role_to_group(resource_type="vm", group_id="group-123")
+        
+        assert success is False
+        assert "does not exist" in reason
+        # Cztery kolejne 404 rozdzielone backoffem, zamiast sześciu prób i pełnego okna ~15 s
+        assert mock_auth_client.role_assignments.create.call_count == 4
+        assert mock_get_graph_client.return_value.get.call_count == 4
+        assert mock_sleep.call_count == 3
+    
+    @patch('identity.rbac_manager.get_graph_client')
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    @patch('identity.rbac_manager.time.sleep')
+    def test_principal_not_found_tolerates_graph_replication_lag(
+        self, mock_sleep, mock_auth_client_class, mock_get_graph_client
+    ):
+        """Test że chwilowe 404 z Graph (replikacja nowej grupy) nie kończy przypisania błędem."""
+        from identity.rbac_manager import AzureRBACManager
+        
+        mock_get_graph_client.return_value.get.side_effect = [
+            Mock(status_code=404, ok=False),
+            Mock(status_code=404, ok=False),
+            Mock(status_code=200, ok=True),
+        ]
+        mock_auth_client = Mock()
+        mock_auth_client.role_definitions.list.return_value = [Mock(id="role-def-456")]
+        mock_auth_client.role_assignments.create.side_effect = [
+            Exception("PrincipalNotFound"),
+            Exception("PrincipalNotFound"),
+            Exception("PrincipalNotFound"),
+            Exception("PrincipalNotFound"),
+            Mock(),
+        ]
+        mock_auth_client_class.return_value = mock_auth_client
+        
+        manager = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+        assert manager.assign_role_to_group(resource_type="vm", group_id="group-123") == (True, "")
+        
+        # Po potwierdzeniu istnienia grupy Graph nie jest już odpytywany
+        assert mock_get_graph_client.return_value.get.call_count == 3
+    
+    @patch('identity.rbac_manager.get_graph_client')
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    @patch('identity.rbac_manager.time.sleep')
+    def test_principal_not_found_retries_for_existing_group(
+        self, mock_sleep, mock_auth_client_class, mock_get_graph_client
+    ):
+        """Test że grupa istniejąca w Graph jest sprawdzana raz, a PrincipalNotFound dalej ponawiane."""
+        from identity.rbac_manager import AzureRBACManager
+        
+        mock_get_graph_client.return_value.get.return_value = Mock(status_code=200, ok=True)
+        mock_auth_client = Mock()
+        mock_auth_client.role_definitions.list.return_value = [Mock(id="role-def-456")]
+        mock_auth_client.role_assignments.create.side_effect = [
+            Exception("PrincipalNotFound"),
+            Exception("PrincipalNotFound"),
+            Mock(),
+        ]
+        mock_auth_client_class.return_value = mock_auth_client
+        
+        manager = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+        assert manager.assign_role_to_group(resource_type="vm", group_id="group-123") == (True, "")
+        
+        mock_get_graph_client.return_value.get.assert_called_once()
+        assert mock_sleep.call_count == 2
+
+    
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    @patch('identity.rbac_manager.time.sleep')
+    def test_verification_polls_get_before_recreating(self, mock_sleep, mock_auth_client_class):
+        """Test że po PUT weryfikacja ponawia tylko GET, bez ponownego tworzenia przypisania."""
+        from identity.rbac_manager import AzureRBACManager
+        
+        mock_auth_client = Mock()
+        mock_auth_client.role_definitions.list.return_value = [Mock(id="role-def-456")]
+        mock_auth_client.role_assignments.get.side_effect = [
+            Exception("404 NotFound"),
+            Exception("404 NotFound"),
+            Mock(),
+        ]
+        mock_auth_client_class.return_value = mock_auth_client
+        
+        manager = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+        assert manager.assign_role_to_group(
+            resource_type="vm", group_id="group-123", verify=True
+        ) == (True, "")
+        
+        mock_auth_client.role_assignments.create.assert_called_once()
+        assert mock_auth_client.role_assignments.get.call_count == 3
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [0.5, 0.5]
+
+    
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    @patch('identity.rbac_manager.time.sleep')
+    def test_assign_role_to_group_uses_sdk_error_code(self, mock_sleep, mock_auth_client_class):
+        """Test że kod błędu z SDK (error.code) wystarcza do rozpoznania istniejącego przypisania."""
+        from identity.rbac_manager import AzureRBACManager
+        
+        error = Exception("Operation returned an invalid status 'Bad Request'")
+        error.error = Mock(code="RoleAssignmentExists")
+        
+        mock_auth_client = Mock()
+        mock_auth_client.role_definitions.list.return_value = [Mock(id="role-def-456")]
+        mock_auth_client.role_assignments.create.side_effect = error
+        mock_auth_client_class.return_value = mock_auth_client
+        
+        manager = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+        assert manager.assign_role_to_group(resource_type="vm", group_id="group-123") == (True, "")
+        mock_auth_client.role_assignments.create.assert_called_once()
+
+    
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    def test_assign_role_to_group_trusts_put_response(self, mock_auth_client_class):
+        """Test że udany PUT z id przypisania nie jest dodatkowo weryfikowany przez GET."""
+        from identity.rbac_manager import AzureRBACManager
+        
+        mock_auth_client = Mock()
+        mock_auth_client.role_definitions.list.return_value = [Mock(id="role-def-456")]
+        mock_auth_client.role_assignments.create.return_value = Mock(id="/subscriptions/sub-123/ra-1")
+        mock_auth_client_class.return_value = mock_auth_client
+        
+        manager = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+        assert manager.assign_role_to_group(resource_type="vm", group_id="group-123") == (True, "")
+        
+        mock_auth_client.role_assignments.get.assert_not_called()
+
+
+class TestRoleDefinitionCache:
+    """Testy cache ID definicji ról."""
+
+    def setup_method(self):
+        from identity.rbac_manager import AzureRBACManager
+
+        AzureRBACManager._ROLE_DEFINITION_CACHE.clear()
+
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    def test_role_definition_is_listed_once_per_role(self, mock_auth_client_class):
+        """Test że każda definicja roli jest pobierana z ARM tylko raz, także przez nową instancję."""
+        from identity.rbac_manager import AzureRBACManager
+
+        mock_auth_client = Mock()
+        mock_auth_client.role_definitions.list.return_value = [Mock(id="role-def-456")]
+        mock_auth_client_class.return_value = mock_auth_client
+
+        first = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+        second = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+
+        assert first._get_role_definition_id("Virtual Machine Contributor") == "role-def-456"
+        assert second._get_role_definition_id("Virtual Machine Contributor") == "role-def-456"
+        assert second._get_role_definition_id("Storage Account Contributor") == "role-def-456"
+
+        # Pierwsze chybienie rozwiązuje wszystkie skonfigurowane role naraz
+        filters = sorted(c.kwargs["filter"] for c in mock_auth_client.role_definitions.list.call_args_list)
+        assert filters == sorted(
+            f"roleName eq '{role}'" for role in AzureRBACManager.RESOURCE_TYPE_ROLES.values()
+        )
+
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    def test_prewarm_resolves_all_roles(self, mock_auth_client_class):
+        """Test że prewarm pobiera wszystkie role, a późniejsze przypisanie nie odpytuje ARM o definicję."""
+        from identity.rbac_manager import AzureRBACManager
+
+        mock_auth_client = Mock()
+        mock_auth_client.role_definitions.list.return_value = [Mock(id="role-def-456")]
+        mock_auth_client_class.return_value = mock_auth_client
+
+        manager = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+        manager.prewarm_role_definitions()
+        listed = mock_auth_client.role_definitions.list.call_count
+
+        assert listed == len(AzureRBACManager.RESOURCE_TYPE_ROLES)
+        assert manager._get_role_definition_id("Network Contributor") == "role-def-456"
+        assert mock_auth_client.role_definitions.list.call_count == listed
+
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    def test_role_cached_concurrently_after_miss(self, mock_auth_client_class):
+        """Test że rola zapisana do cache przez inny wątek po chybieniu nie powoduje KeyError."""
+        from identity.rbac_manager import AzureRBACManager, _MISSING
+
+        mock_auth_client = Mock()
+        mock_auth_client.role_definitions.list.return_value = [Mock(id="role-def-456")]
+        mock_auth_client_class.return_value = mock_auth_client
+
+        manager = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+        cache = AzureRBACManager._ROLE_DEFINITION_CACHE
+        real_get = cache.get
+        calls = []
+
+        def racing_get(key, default=None):
+            # Pierwsze odczytanie to chybienie, potem wszystkie role są już w cache (inny wątek)
+            calls.append(key)
+            if len(calls) == 1:
+                for role in AzureRBACManager.RESOURCE_TYPE_ROLES.values():
+                    cache.set(("sub-123", role), "role-def-other")
+                return _MISSING
+            return real_get(key, default)
+
+        with patch.object(cache, "get", side_effect=racing_get):
+            assert manager._get_role_definition_id("Network Contributor") == "role-def-456"
+
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    def test_errors_are_not_cached(self, mock_auth_client_class):
+        """Test że błąd ARM nie jest zapamiętywany i kolejne wywołanie ponawia zapytanie."""
+        from identity.rbac_manager import AzureRBACManager
+
+        mock_auth_client = Mock()
+        responses = iter([Exception("ARM error"), [Mock(id="role-def-456")]])
+
+        def list_role_definitions(scope, filter):
+            if filter != "roleName eq 'Network Contributor'":
+                return [Mock(id="other-role")]
+            response = next(responses)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        mock_auth_client.role_definitions.list.side_effect = list_role_definitions
+        mock_auth_client_class.return_value = mock_auth_client
+
+        manager = AzureRBACManager(credential=Mock(), subscription_id="sub-123")
+
+        assert manager._get_role_definition_id("Network Contributor") is None
+        assert manager._get_role_definition_id("Network Contributor") == "role-def-456"
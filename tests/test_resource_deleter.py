@@ -0,0 +1,148 @@
+# tests/test_resource_deleter.py
+
+"""
+Testy jednostkowe dla ResourceDeleter.
+"""
+
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from clean_resources.resource_deleter import ResourceDeleter, exclude_resource_group
+
+
+def _resource(name, rtype, service):
+    return {
+        "id": f"/subscriptions/sub/resourceGroups/rg-test/providers/{rtype}/{name}",
+        "name": name,
+        "type": rtype,
+        "service": service,
+        "resource_group": "rg-test",
+    }
+
+
+def _make_deleter():
+    with patch("clean_resources.resource_deleter.ComputeManagementClient"), \
+            patch("clean_resources.resource_deleter.NetworkManagementClient"), \
+            patch("clean_resources.resource_deleter.ResourceManagementClient"), \
+            patch("clean_resources.resource_deleter.StorageManagementClient"):
+        return ResourceDeleter(cred=Mock(), sub_id="00000000-0000-0000-0000-000000000000")
+
+
+class TestDeleteResources:
+    """Testy równoległego usuwania zasobów."""
+
+    def test_deletes_in_dependency_waves(self):
+        """Test że VM są usuwane przed NIC, NIC przed VNet, a VNet przed NSG/Public IP."""
+        deleter = _make_deleter()
+        vnet = _resource("vnet1", "Microsoft.Network/virtualNetworks", "network")
+        nic = _resource("nic1", "Microsoft.Network/networkInterfaces", "network")
+        vm = _resource("vm1", "Microsoft.Compute/virtualMachines", "vm")
+        pip = _resource("pip1", "Microsoft.Network/publicIPAddresses", "network")
+        nsg = _resource("nsg1", "Microsoft.Network/networkSecurityGroups", "network")
+
+        order = []
+        deleter.delete_resource = Mock(side_effect=lambda r: order.append(r["name"]) or f"Deleted {r['name']}")
+
+        results = deleter.delete_resources([nsg, vnet, nic, vm, pip], max_workers=1)
+
+        assert order.index("vm1") < order.index("nic1") < order.index("vnet1")
+        assert order.index("vnet1") < min(order.index("nsg1"), order.index("pip1"))
+        assert [msg for _, msg in results] == [f"Deleted {name}" for name in order]
+
+    def test_deletes_wave_concurrently(self):
+        """Test że zasoby z jednej fali są usuwane równolegle."""
+        deleter = _make_deleter()
+        resources = [_resource(f"sa{i}", "Microsoft.Storage/storageAccounts", "storage") for i in range(4)]
+
+        lock = threading.Lock()
+        state = {"current": 0, "peak": 0}
+
+        def delete_resource(resource):
+            with lock:
+                state["current"] += 1
+                state["peak"] = max(state["peak"], state["current"])
+            time.sleep(0.02)
+            with lock:
+                state["current"] -= 1
+            return f"Deleted Storage Account: {resource['name']}"
+
+        deleter.delete_resource = Mock(side_effect=delete_resource)
+
+        results = deleter.delete_resources(resources, max_workers=4)
+
+        assert state["peak"] > 1
+        assert len(results) == 4
+
+
+class TestDeleteRateLimit:
+    """Testy limitu usunięć per (resource provider, region)."""
+
+    def test_token_bucket_waits_after_burst_per_key(self):
+        """Test że po wyczerpaniu serii kolejne pobranie czeka, a inny klucz nie."""
+        from clean_resources.rate_limiter import KeyedTokenBucket
+
+        limiter = KeyedTokenBucket(rate_per_hour=3600, burst=2)
+        with patch("clean_resources.rate_limiter.time.sleep") as mock_sleep:
+            assert limiter.acquire(("microsoft.compute", "westeurope")) == 0.0
+            assert limiter.acquire(("microsoft.compute", "westeurope")) == 0.0
+            assert limiter.acquire(("microsoft.storage", "westeurope")) == 0.0
+            mock_sleep.assert_not_called()
+
+            limiter.acquire(("microsoft.compute", "westeurope"))
+
+        assert mock_sleep.called
+        assert 0 < mock_sleep.call_args_list[0].args[0] <= 1.0
+
+    def test_deletions_acquire_token_for_provider_and_region(self):
+        """Test że każde usunięcie pobiera token dla swojego providera i regionu."""
+        deleter = _make_deleter()
+        vm = dict(_resource("vm1", "Microsoft.Compute/virtualMachines", "vm"), location="WestEurope")
+        deleter.delete_resource = Mock(return_value="Deleted VM: vm1")
+
+        with patch("clean_resources.resource_deleter._DELETE_LIMITER") as limiter:
+            limiter.acquire.return_value = 0.0
+            deleter.delete_resources([vm])
+
+        limiter.acquire.assert_called_once_with(("microsoft.compute", "westeurope"))
+
+
+class TestBeginDeleteResourceGroup:
+    """Testy wspólnego usuwania Resource Group (CleanupGroupResources i RemoveGroup)."""
+
+    def setup_method(self):
+        from identity.rg_cache import RESOURCE_GROUP_CACHE
+
+        RESOURCE_GROUP_CACHE.clear()
+
+    def test_existing_resource_group_deletion_is_not_awaited(self):
+        """Test że usunięcie RG jest zlecane bez czekania, a wpis w cache jest usuwany."""
+        from identity.rg_cache import RESOURCE_GROUP_CACHE
+
+        deleter = _make_deleter()
+        RESOURCE_GROUP_CACHE.set("rg-AI-2024L", True)
+
+        assert deleter.begin_delete_resource_group("rg-AI-2024L") is True
+
+        resource_groups = deleter._resource_client.resource_groups
+        resource_groups.check_existence.assert_not_called()
+        resource_groups.begin_delete.assert_called_once_with("rg-AI-2024L")
+        resource_groups.begin_delete.return_value.wait.assert_not_called()
+        assert RESOURCE_GROUP_CACHE.get("rg-AI-2024L") is None
+
+    def test_missing_resource_group_is_not_deleted(self):
+        """Test że brak RG zwraca False bez wywołania begin_delete."""
+        deleter = _make_deleter()
+        deleter._resource_client.resource_groups.check_existence.return_value = False
+
+        assert deleter.begin_delete_resource_group("rg-AI-2024L") is False
+
+        deleter._resource_client.resource_groups.begin_delete.assert_not_called()
+
+    def test_exclude_resource_group_ignores_case(self):
+        """Test że zasoby z usuwanej RG są pomijane niezależnie od wielkości liter."""
+        inside = _resource("vm1", "Microsoft.Compute/virtualMachines", "vm")
+        inside["resource_group"] = "RG-AI-2024L"
+        outside = _resource("sa1", "Microsoft.Storage/storageAccounts", "storage")
+
+        assert exclude_resource_group([inside, outside], "rg-AI-2024L") == [outside]
@@ -0,0 +1,61 @@
+# tests/test_resource_finder.py
+
+"""
+Testy jednostkowe dla ResourceFinder.
+"""
+
+from unittest.mock import Mock
+
+from clean_resources.resource_finder import ResourceFinder
+
+
+def _resource(name, rtype, tags):
+    resource = Mock()
+    resource.id = f"/subscriptions/sub/resourceGroups/rg-test/providers/{rtype}/{name}"
+    resource.name = name
+    resource.type = rtype
+    resource.tags = tags
+    return resource
+
+
+def _make_finder(resources):
+    finder = ResourceFinder(cred=Mock(), sub_id="00000000-0000-0000-0000-000000000000")
+    finder._rm = Mock()
+    finder._rm.resources.list.return_value = resources
+    return finder
+
+
+class TestCountResourcesByTags:
+    """Testy zliczania zasobów po tagach."""
+
+    def test_counts_only_matching_group_and_service(self):
+        """Test że liczone są tylko zasoby z pasującym tagiem i typem usługi."""
+        finder = _make_finder([
+            _resource("vm1", "Microsoft.Compute/virtualMachines", {"Group": "AI-2024L"}),
+            _resource("vm2", "Microsoft.Compute/virtualMachines", {"Group": "AI 2024L"}),
+            _resource("sa1", "Microsoft.Storage/storageAccounts", {"Group": "AI-2024L"}),
+            _resource("vm3", "Microsoft.Compute/virtualMachines", {"Group": "Other"}),
+            _resource("vm4", "Microsoft.Compute/virtualMachines", None),
+        ])
+
+        assert finder.count_resources_by_tags({"Group": "AI-2024L"}, service="vm") == 2
+        assert finder.count_resources_by_tags({"Group": "AI-2024L"}) == 3
+
+    def test_returns_zero_on_listing_error(self):
+        """Test że błąd listowania zasobów daje 0 zamiast wyjątku."""
+        finder = _make_finder([])
+        finder._rm.resources.list.side_effect = Exception("ARM error")
+
+        assert finder.count_resources_by_tags({"Group": "AI-2024L"}, service="vm") == 0
+
+    def test_service_name_is_classified_once_per_resource_type(self):
+        """Test że typ zasobu jest klasyfikowany raz, a nie dla każdego zasobu."""
+        ResourceFinder._extract_service_name.cache_clear()
+        finder = _make_finder([
+            _resource(f"vm{i}", "Microsoft.Compute/virtualMachines", {"Group": "AI-2024L"})
+            for i in range(10)
+        ])
+
+        assert finder.count_resources_by_tags({"Group": "AI-2024L"}, service="vm") == 10
+        info = ResourceFinder._extract_service_name.cache_info()
+        assert (info.misses, info.hits) == (1, 9)
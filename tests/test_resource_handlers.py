@@ -0,0 +1,90 @@
+# tests/test_resource_handlers.py
+
+"""
+Testy jednostkowe dla ResourceHandlers w Azure adapterze.
+"""
+
+from unittest.mock import Mock
+
+
+class TestGetAvailableServices:
+    """Testy GetAvailableServices."""
+
+    def test_returns_configured_resource_types_as_independent_copies(self, make_resource_handler):
+        """Test że każda odpowiedź zawiera typy zasobów i jest niezależną kopią."""
+        from protos import adapter_interface_pb2 as pb2
+
+        handler = make_resource_handler()
+        context = Mock()
+
+        first = handler.get_available_services(pb2.GetAvailableServicesRequest(), context)
+        first.services.append("modified")
+        second = handler.get_available_services(pb2.GetAvailableServicesRequest(), context)
+
+        assert list(second.services) == ["vm", "storage", "network"]
+        context.set_code.assert_not_called()
+
+
+class TestGetResourceCount:
+    """Testy GetResourceCount."""
+
+    def test_counts_via_resource_finder(self, make_resource_handler):
+        """Test że zliczanie odbywa się w ResourceFinder z przekazaniem typu zasobu."""
+        from protos import adapter_interface_pb2 as pb2
+
+        resource_finder = Mock()
+        resource_finder.count_resources_by_tags.return_value = 4
+        handler = make_resource_handler(resource_finder=resource_finder)
+
+        request = pb2.ResourceCountRequest(groupName="AI-2024L", resourceType=" VM ")
+        response = handler.get_resource_count(request, Mock())
+
+        assert response.count == 4
+        resource_finder.count_resources_by_tags.assert_called_once_with({"Group": "AI-2024L"}, service="vm")
+        resource_finder.find_resources_by_tags.assert_not_called()
+
+
+class TestCleanupGroupResources:
+    """Testy CleanupGroupResources."""
+
+    def test_existing_resource_group_is_deleted_with_outside_tagged_resources(self, make_resource_handler):
+        """Test że RG jest usuwana bez czekania, a po tagach usuwane są tylko zasoby spoza tej RG."""
+        from protos import adapter_interface_pb2 as pb2
+
+        inside = {"name": "vm1", "type": "Microsoft.Compute/virtualMachines", "resource_group": "RG-AI-2024L"}
+        outside = {"name": "sa1", "type": "Microsoft.Storage/storageAccounts", "resource_group": "rg-shared"}
+        resource_finder = Mock()
+        resource_finder.find_resources_by_tags.return_value = [inside, outside]
+        resource_deleter = Mock()
+        resource_deleter.begin_delete_resource_group.return_value = True
+        resource_deleter.delete_resources.return_value = [(outside, "Deleted Storage Account: sa1")]
+        handler = make_resource_handler(resource_finder=resource_finder, resource_deleter=resource_deleter)
+
+        response = handler.cleanup_group_resources(pb2.CleanupGroupRequest(groupName="AI 2024L"), Mock())
+
+        assert response.success
+        assert list(response.deletedResources) == [
+            "Deleted Resource Group: rg-AI-2024L",
+            "Deleted Storage Account: sa1",
+        ]
+        resource_deleter.begin_delete_resource_group.assert_called_once_with("rg-AI-2024L")
+        resource_finder.find_resources_by_tags.assert_called_once_with({"Group": "AI-2024L"})
+        resource_deleter.delete_resources.assert_called_once_with([outside])
+
+    def test_falls_back_to_tag_scan_when_resource_group_is_missing(self, make_resource_handler):
+        """Test że bez Resource Group zasoby są wyszukiwane i usuwane po tagach."""
+        from protos import adapter_interface_pb2 as pb2
+
+        resource = {"name": "vm1", "type": "Microsoft.Compute/virtualMachines"}
+        resource_finder = Mock()
+        resource_finder.find_resources_by_tags.return_value = [resource]
+        resource_deleter = Mock()
+        resource_deleter.begin_delete_resource_group.return_value = False
+        resource_deleter.delete_resources.return_value = [(resource, "Deleted VM: vm1")]
+        handler = make_resource_handler(resource_finder=resource_finder, resource_deleter=resource_deleter)
+
+        response = handler.cleanup_group_resources(pb2.CleanupGroupRequest(groupName="AI 2024L"), Mock())
+
+        assert list(response.deletedResources) == ["Deleted VM: vm1"]
+        resource_finder.find_resources_by_tags.assert_called_once_with({"Group": "AI-2024L"})
+        resource_deleter.delete_resources.assert_called_once_with([resource])
@@ -161,3 +161,89 @@ class TestTeardownFlow:
         assert removed_count == 1
         # Sprawdź że sleep był wywołany (exponential backoff)
         assert mock_sleep.called
+    
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    def test_remove_role_assignments_for_group_deletes_all(self, mock_auth_client_class):
+        """Test że wszystkie przypisania grupy są usuwane (równolegle) i zliczane."""
+        from identity.rbac_manager import AzureRBACManager
+        
+        def make_assignment(name, principal_type="Group"):
+            assignment = Mock()
+            assignment.name = name
+            assignment.principal_id = "group-123"
+            assignment.principal_type = principal_type
+            return assignment
+        
+        mock_auth_client = Mock()
+        mock_auth_client.role_assignments.list_for_scope.return_value = [
+            make_assignment(f"a{i}") for i in range(5)
+        ] + [make_assignment("u1", principal_type="User")]
+        mock_auth_client_class.return_value = mock_auth_client
+        
+        manager = AzureRBACManager()
+        removed_count = manager.remove_role_assignments_for_group("group-123")
+        
+        assert removed_count == 5
+        deleted_names = {
+            c.kwargs["role_assignment_name"]
+            for c in mock_auth_client.role_assignments.delete.call_args_list
+        }
+        assert deleted_names == {f"a{i}" for i in range(5)}
+    
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    @patch('identity.rbac_manager.time.sleep')
+    def test_remove_role_assignments_for_users_single_listing(self, mock_sleep, mock_auth_client_class):
+        """Test że usuwanie przypisań dla wielu użytkowników listuje assignments tylko raz."""
+        from identity.rbac_manager import AzureRBACManager
+        
+        def make_assignment(name, principal_id, principal_type="User"):
+            assignment = Mock()
+            assignment.name = name
+            assignment.principal_id = principal_id
+            assignment.principal_type = principal_type
+            assignment.role_definition_id = "role-def-456"
+            return assignment
+        
+        mock_auth_client = Mock()
+        mock_auth_client.role_assignments.list_for_scope.return_value = [
+            make_assignment("a1", "user-1"),
+            make_assignment("a2", "user-1"),
+            make_assignment("a3", "user-2"),
+            make_assignment("a4", "user-3"),
+            make_assignment("a5", "user-1", principal_type="Group"),
+        ]
+        mock_auth_client_class.return_value = mock_auth_client
+        
+        manager = AzureRBACManager()
+        removed_counts = manager.remove_role_assignments_for_users(["user-1", "user-2", "user-9"])
+        
+        assert removed_counts == {"user-1": 2, "user-2": 1, "user-9": 0}
+        mock_auth_client.role_assignments.list_for_scope.assert_called_once()
+        deleted_names = {
+            c.kwargs["role_assignment_name"]
+            for c in mock_auth_client.role_assignments.delete.call_args_list
+        }
+        assert deleted_names == {"a1", "a2", "a3"}
+    
+    @patch('identity.rbac_manager.AuthorizationManagementClient')
+    def test_remove_role_assignments_for_users_deletes_while_listing(self, mock_auth_client_class):
+        """Test że przypisania z już pobranych stron są usuwane, nawet gdy kolejna strona zawiedzie."""
+        from identity.rbac_manager import AzureRBACManager
+        
+        def pages():
+            assignment = Mock()
+            assignment.name = "a1"
+            assignment.principal_id = "user-1"
+            assignment.principal_type = "User"
+            yield assignment
+            raise Exception("ARM paging error")
+        
+        mock_auth_client = Mock()
+        mock_auth_client.role_assignments.list_for_scope.return_value = pages()
+        mock_auth_client_class.return_value = mock_auth_client
+        
+        manager = AzureRBACManager()
+        removed_counts = manager.remove_role_assignments_for_users(["user-1"])
+        
+        assert removed_counts == {"user-1": 1}
+        mock_auth_client.role_assignments.delete.assert_called_once()
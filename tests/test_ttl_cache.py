@@ -0,0 +1,55 @@
+# tests/test_ttl_cache.py
+
+"""
+Testy jednostkowe dla TTLCache oraz cache'owania wyszukiwania grup.
+"""
+
+from unittest.mock import Mock, patch
+
+from identity.ttl_cache import TTLCache
+
+
+class TestTTLCache:
+    """Testy TTLCache."""
+
+    def test_returns_value_until_expired(self):
+        """Test że wpis wygasa po upływie TTL."""
+        cache = TTLCache(maxsize=10, ttl=60)
+        with patch("identity.ttl_cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("identity.ttl_cache.time.monotonic", return_value=159.0):
+            assert cache.get("a") == 1
+        with patch("identity.ttl_cache.time.monotonic", return_value=161.0):
+            assert cache.get("a") is None
+
+    def test_evicts_least_recently_used(self):
+        """Test że po przekroczeniu maxsize usuwany jest najdawniej używany wpis."""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+
+class TestGroupLookupCache:
+    """Testy cache'owania get_group_by_name w IdentityHandlers."""
+
+    def test_group_exists_uses_cache_and_skips_misses(self):
+        """Test że znaleziona grupa jest cache'owana, a brak grupy nie."""
+        from handlers.identity_handlers import IdentityHandlers
+        from protos import adapter_interface_pb2 as pb2
+
+        group_manager = Mock()
+        group_manager.get_group_by_name.side_effect = [None, {"id": "group-123"}]
+        handler = IdentityHandlers(
+            user_manager=Mock(), group_manager=group_manager, rbac_manager=Mock()
+        )
+        request = pb2.GroupExistsRequest(groupName="test-group")
+
+        assert handler.group_exists(request, Mock()).exists is False
+        assert handler.group_exists(request, Mock()).exists is True
+        assert handler.group_exists(request, Mock()).exists is True
+        assert group_manager.get_group_by_name.call_count == 2
@@ -0,0 +1,90 @@
+# tests/test_update_group_leaders.py
+
+"""
+Testy jednostkowe dla UpdateGroupLeaders w Azure adapterze.
+"""
+
+from unittest.mock import Mock, patch
+
+
+class TestUpdateGroupLeaders:
+    """Testy dodawania nowych liderów do istniejącej grupy."""
+
+    def test_adds_all_new_leaders_even_if_one_fails(self, make_identity_handler, context):
+        """Test że błąd jednego lidera nie przerywa dodawania pozostałych."""
+        from protos import adapter_interface_pb2 as pb2
+
+        group_manager = Mock()
+        group_manager.get_group_by_name.return_value = {"id": "group-123"}
+        group_manager.list_owner_users.return_value = []
+
+        user_manager = Mock()
+        user_manager.get_user.return_value = None
+
+        def create_user(login, display_name, group_name):
+            if login == "bad":
+                raise Exception("Graph error")
+            return f"id-{login}"
+
+        user_manager.create_user.side_effect = create_user
+
+        handler = make_identity_handler(group_manager, user_manager=user_manager)
+
+        request = pb2.CreateGroupWithLeadersRequest()
+        request.groupName = "test-group"
+        request.leaders.extend(["alice", "bad", "bob"])
+
+        response = handler.update_group_leaders(request, context)
+
+        assert response.groupName == "test-group"
+        added_owner_ids = {c.args[1] for c in group_manager.add_owner.call_args_list}
+        assert added_owner_ids == {"id-alice", "id-bob"}
+
+    def test_assigns_rbac_role_once_for_many_leaders(self, make_identity_handler, context, rbac_manager):
+        """Test że rola RBAC jest przypisywana grupie jeden raz, niezależnie od liczby liderów."""
+        from protos import adapter_interface_pb2 as pb2
+
+        group_manager = Mock()
+        group_manager.get_group_by_name.return_value = {"id": "group-123"}
+        group_manager.list_owner_users.return_value = []
+
+        user_manager = Mock()
+        user_manager.get_user.return_value = {"id": "user-id"}
+
+        handler = make_identity_handler(group_manager, user_manager=user_manager)
+
+        request = pb2.CreateGroupWithLeadersRequest()
+        request.groupName = "test-group"
+        request.resourceTypes.append("vm")
+        request.leaders.extend(["alice", "bob", "carol"])
+
+        handler.update_group_leaders(request, context)
+
+        assert group_manager.add_owner.call_count == 3
+        rbac_manager.assign_role_to_group.assert_called_once_with(resource_type="vm", group_id="group-123")
+
+    def test_uses_owner_upn_from_listing_without_extra_lookups(self, make_identity_handler, context, rbac_manager):
+        """Test że UPN z listy ownerów wystarcza do wyliczenia diffu (bez GET /users/{id})."""
+        from protos import adapter_interface_pb2 as pb2
+
+        group_manager = Mock()
+        group_manager.get_group_by_name.return_value = {"id": "group-123"}
+        group_manager.list_owner_users.return_value = [
+            {"id": "owner-1", "userPrincipalName": "alice-test-group@example.com"},
+            {"id": "owner-2", "userPrincipalName": "bob-test-group@example.com"},
+        ]
+
+        rbac_manager.remove_role_assignments_for_users.return_value = {}
+
+        handler = make_identity_handler(group_manager)
+
+        request = pb2.CreateGroupWithLeadersRequest()
+        request.groupName = "test-group"
+        request.leaders.extend(["alice"])
+
+        with patch("handlers.identity_handlers.get_graph_client") as mock_get_graph_client:
+            handler.update_group_leaders(request, context)
+
+        mock_get_graph_client.assert_not_called()
+        group_manager.remove_owner.assert_called_once_with("group-123", "owner-2")
+        group_manager.add_owner.assert_not_called()
@@ -0,0 +1,122 @@
+# tests/test_user_manager_batch.py
+
+"""
+Testy jednostkowe dla operacji hurtowych (Graph $batch) w AzureUserManager.
+"""
+
+from unittest.mock import Mock, patch
+
+
+def _batch_response(responses):
+    resp = Mock()
+    resp.raise_for_status.return_value = None
+    resp.json.return_value = {"responses": responses}
+    return resp
+
+
+class TestDeleteUsersBatch:
+    """Testy AzureUserManager.delete_users."""
+
+    def test_deletes_users_in_single_batch(self):
+        """Test że każdy użytkownik to jedno pod-żądanie DELETE, a 404 liczy się jako usunięty."""
+        from identity.user_manager import AzureUserManager
+
+        graph = Mock()
+        graph.post.return_value = _batch_response([
+            {"id": "0", "status": 204},
+            {"id": "1", "status": 404},
+        ])
+        user_mgr = AzureUserManager(graph)
+
+        deleted = user_mgr.delete_users(
+            [("id-a", "a@example.com"), ("id-b", "b@example.com")],
+        )
+
+        assert deleted == ["a@example.com", "b@example.com"]
+        graph.post.assert_called_once()
+        args, kwargs = graph.post.call_args
+        assert args[0] == "/$batch"
+        assert kwargs["json"]["requests"] == [
+            {"id": "0", "method": "DELETE", "url": "/users/a@example.com"},
+            {"id": "1", "method": "DELETE", "url": "/users/b@example.com"},
+        ]
+
+    @patch("identity.user_manager.time.sleep")
+    def test_requeues_only_failed_users(self, mock_sleep):
+        """Test że w kolejnej rundzie ponawiane są tylko nieudane usunięcia."""
+        from identity.user_manager import AzureUserManager
+
+        graph = Mock()
+        graph.post.side_effect = [
+            _batch_response([
+                {"id": "0", "status": 204},
+                {"id": "1", "status": 503},
+            ]),
+            _batch_response([
+                {"id": "0", "status": 204},
+            ]),
+        ]
+        user_mgr = AzureUserManager(graph)
+
+        deleted = user_mgr.delete_users(
+            [("id-a", "a@example.com"), ("id-b", "b@example.com")],
+        )
+
+        assert deleted == ["a@example.com", "b@example.com"]
+        assert graph.post.call_count == 2
+        retry_requests = graph.post.call_args_list[1].kwargs["json"]["requests"]
+        assert retry_requests == [
+            {"id": "0", "method": "DELETE", "url": "/users/b@example.com"}
+        ]
+
+
+class TestFindUsers:
+    """Testy AzureUserManager.find_users."""
+
+    def test_looks_up_users_with_in_filter_batches(self):
+        """Test że wyszukiwanie istniejących kont używa filtrów `in` po max 15 UPN."""
+        from identity.user_manager import AzureUserManager
+
+        graph = Mock()
+        graph.post.return_value = _batch_response([
+            {"id": "0", "status": 200, "body": {"value": [
+                {"id": "id-3", "userPrincipalName": "User3@example.com"},
+            ]}},
+            {"id": "1", "status": 200, "body": {"value": []}},
+        ])
+        user_mgr = AzureUserManager(graph)
+
+        logins = [f"user{i}@example.com" for i in range(20)]
+        found = user_mgr.find_users(logins)
+
+        assert found == {"user3@example.com": "id-3"}
+        graph.post.assert_called_once()
+        requests = graph.post.call_args.kwargs["json"]["requests"]
+        assert len(requests) == 2
+        assert requests[0]["method"] == "GET"
+        assert requests[0]["url"].startswith("/users?$filter=userPrincipalName%20in%20")
+
+
+class TestDeleteUsersConcurrency:
+    """Testy równoległego wysyłania paczek $batch."""
+
+    def test_large_group_is_split_into_batches_of_twenty_users(self):
+        """Test że 45 użytkowników trafia do 3 paczek (po max 20 pod-żądań)."""
+        from identity.user_manager import AzureUserManager
+
+        def post(url, json):
+            return _batch_response([
+                {"id": r["id"], "status": 204} for r in json["requests"]
+            ])
+
+        graph = Mock()
+        graph.post.side_effect = post
+        user_mgr = AzureUserManager(graph)
+
+        users = [(f"id-{i}", f"user{i}@example.com") for i in range(45)]
+        deleted = user_mgr.delete_users(users)
+
+        assert deleted == [upn for _, upn in users]
+        assert graph.post.call_count == 3
+        sizes = sorted(len(c.kwargs["json"]["requests"]) for c in graph.post.call_args_list)
+        assert sizes == [5, 20, 20]